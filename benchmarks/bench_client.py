@@ -0,0 +1,228 @@
+"""
+Benchmarks of BigDataCorpAPI client overhead against the local mock server.
+
+Run from the repository root:
+    python benchmarks/bench_client.py --output bench.json
+
+Results are written as JSON so runs of different releases can be compared,
+all times are in seconds.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import platform
+import statistics
+import subprocess
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from bigdatacorp_api import decode  # noqa: E402
+from bigdatacorp_api.data import BigDataCorpAPI  # noqa: E402
+from bigdatacorp_api.mock_server import MockBigDataServer  # noqa: E402
+
+
+def make_cpf(rng: random.Random) -> str:
+    """Return a random CPF with valid check digits."""
+    digits = [rng.randint(0, 9) for _ in range(9)]
+    for size in (9, 10):
+        total = sum(d * w for d, w in zip(digits, range(size + 1, 1, -1)))
+        digits.append((total * 10 % 11) % 10)
+    return "".join(str(d) for d in digits)
+
+
+def percentiles(samples: list) -> dict:
+    """Return summary statistics of latency samples."""
+    samples = sorted(samples)
+
+    def pct(p):
+        return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+    return {
+        "n": len(samples), "mean": statistics.mean(samples),
+        "p50": pct(0.50), "p90": pct(0.90), "p99": pct(0.99),
+        "max": samples[-1]}
+
+
+def bench_single(server, iterations: int) -> dict:
+    """Latency percentiles of `get_cpf_dataset`."""
+    rng = random.Random(0)
+    with BigDataCorpAPI("token", registry=server.registry()) as api:
+        api.get_cpf_dataset(make_cpf(rng), "basic_data")
+        samples = []
+        for _ in range(iterations):
+            cpf = make_cpf(rng)
+            start = time.perf_counter()
+            api.get_cpf_dataset(cpf, "basic_data")
+            samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def bench_multi(server, dataset_counts: list, iterations: int) -> list:
+    """Wall time of `get_cpf_datasets` as the number of datasets grows."""
+    rng = random.Random(1)
+    datasets = BigDataCorpAPI.registry.datasets("cpf")
+    results = []
+    with BigDataCorpAPI("token", registry=server.registry()) as api:
+        for n_datasets in dataset_counts:
+            for single_request in (False, True):
+                samples = []
+                for _ in range(iterations):
+                    cpf = make_cpf(rng)
+                    start = time.perf_counter()
+                    api.get_cpf_datasets(
+                        cpf, datasets[:n_datasets],
+                        single_request=single_request)
+                    samples.append(time.perf_counter() - start)
+                result = percentiles(samples)
+                result.update({
+                    "datasets": n_datasets,
+                    "single_request": single_request})
+                results.append(result)
+    return results
+
+
+def bench_bulk(server, concurrencies: list, n_documents: int) -> list:
+    """Documents per second of bulk fetch at different concurrency."""
+    rng = random.Random(2)
+    results = []
+    for max_workers in concurrencies:
+        cpfs = [make_cpf(rng) for _ in range(n_documents)]
+        with BigDataCorpAPI(
+                "token", registry=server.registry(),
+                pool_maxsize=max_workers) as api:
+            start = time.perf_counter()
+            n_errors = sum(
+                isinstance(result, Exception)
+                for _, _, result in api.bulk_get_cpf_datasets(
+                    cpfs, ["basic_data"], max_workers=max_workers))
+            elapsed = time.perf_counter() - start
+        results.append({
+            "max_workers": max_workers, "documents": n_documents,
+            "errors": n_errors, "elapsed": elapsed,
+            "documents_per_second": n_documents / elapsed})
+    return results
+
+
+def bench_decode(server, payload_items: list, iterations: int) -> list:
+    """Decode cost of `processes` responses with many lawsuits."""
+    decoders = {"json": decode.json_loads}
+    if decode.orjson is not None:
+        decoders["orjson"] = decode.orjson_loads
+
+    results = []
+    original_items = server.payload_items
+    try:
+        for n_items in payload_items:
+            server.payload_items = n_items
+            _, _, body = server.query_response(
+                "/peoplev2",
+                {"Datasets": "processes", "q": "doc{52998224725}"})
+            raw = decode.json_dumps(body)
+            for name, loads in decoders.items():
+                samples = []
+                for _ in range(iterations):
+                    start = time.perf_counter()
+                    loads(raw)
+                    samples.append(time.perf_counter() - start)
+                result = percentiles(samples)
+                result.update({
+                    "decoder": name, "lawsuits": n_items,
+                    "bytes": len(raw),
+                    "mb_per_second": len(raw) / result["p50"] / 1e6})
+                results.append(result)
+    finally:
+        server.payload_items = original_items
+    return results
+
+
+def bench_memory(server, max_workers: int, n_documents: int) -> dict:
+    """Peak memory allocated by the client per in-flight request."""
+    rng = random.Random(3)
+    cpfs = [make_cpf(rng) for _ in range(n_documents)]
+    with BigDataCorpAPI(
+            "token", registry=server.registry(),
+            pool_maxsize=max_workers) as api:
+        api.get_cpf_dataset(make_cpf(rng), "processes")
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        for _ in api.bulk_get_cpf_datasets(
+                cpfs, ["processes"], max_workers=max_workers):
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    in_flight = 2 * max_workers
+    return {
+        "max_workers": max_workers, "max_in_flight": in_flight,
+        "lawsuits": server.payload_items,
+        "peak_bytes": peak - baseline,
+        "bytes_per_in_flight_request": (peak - baseline) / in_flight}
+
+
+def get_meta() -> dict:
+    """Return information about the run."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+            text=True, check=True).stdout.strip()
+    except Exception:
+        commit = None
+    with open(os.path.join(ROOT, "VERSION")) as file:
+        version = file.read().strip()
+    return {
+        "version": version, "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "orjson": decode.orjson is not None,
+        "timestamp": datetime.datetime.now(
+            datetime.timezone.utc).isoformat()}
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--output", help="JSON output file, default to stdout.")
+    parser.add_argument(
+        "--latency", type=float, default=0.002,
+        help="Latency of the mock server in seconds.")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--documents", type=int, default=500)
+    parser.add_argument(
+        "--only", choices=["single", "multi", "bulk", "decode", "memory"],
+        action="append", help="Run only some benchmarks.")
+    args = parser.parse_args(argv)
+    only = set(args.only or [
+        "single", "multi", "bulk", "decode", "memory"])
+
+    results = {"meta": get_meta(), "config": vars(args)}
+    with MockBigDataServer(
+            latency=args.latency, payload_items=20) as server:
+        if "single" in only:
+            results["single"] = bench_single(server, args.iterations)
+        if "multi" in only:
+            results["multi"] = bench_multi(
+                server, [1, 2, 4, 8, 16], max(args.iterations // 10, 5))
+        if "bulk" in only:
+            results["bulk"] = bench_bulk(
+                server, [1, 4, 8, 16, 32], args.documents)
+        if "decode" in only:
+            results["decode"] = bench_decode(
+                server, [10, 100, 1000], max(args.iterations // 10, 5))
+        if "memory" in only:
+            results["memory"] = bench_memory(server, 8, args.documents)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
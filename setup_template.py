@@ -40,6 +40,19 @@ setuptools.setup(
     ],
     package_dir={"": "src"},
     install_requires=requirements,
+    extras_require={
+        "async": ["aiohttp"],
+        "fast": ["orjson"],
+        "export": ["pyarrow"],
+        "otel": ["opentelemetry-api"],
+        "validation": ["numpy"],
+        "stream": ["ijson"],
+    },
+    entry_points={
+        "console_scripts": [
+            "bigdatacorp-enrich=bigdatacorp_api.cli:main",
+        ],
+    },
     packages=setuptools.find_packages(where="src"),
-    python_requires=">=3.6",
+    python_requires=">=3.8",
 )
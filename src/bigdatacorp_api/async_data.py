@@ -0,0 +1,563 @@
+"""BigDataCorp Python API for asyncio."""
+import time
+import asyncio
+import functools
+from bigdatacorp_api.data import BigDataCorpAPIBase
+from bigdatacorp_api.ratelimit import (
+    EndpointRateLimiter, TokenBucketRateLimiter)
+from bigdatacorp_api.retry import RetryPolicy
+from bigdatacorp_api.decode import get_json_decoder
+from bigdatacorp_api.deadline import Deadline
+from bigdatacorp_api.registry import DatasetRegistry
+from bigdatacorp_api.instrumentation import Instrumentation
+from bigdatacorp_api.circuit import CircuitBreakerRegistry
+from bigdatacorp_api.exceptions import (
+    BigDataCorpAPIException, BigDataCorpAPITimeoutException,
+    BigDataCorpAPIInvalidDocumentException)
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+
+class AsyncBigDataCorpAPI(BigDataCorpAPIBase):
+    """
+    Asyncio client for BigData API.
+
+    Mirror `BigDataCorpAPI` methods as coroutines, all requests share one
+    `aiohttp` connection pool and at most `max_concurrency` requests run at
+    the same time.
+    """
+
+    def __init__(self, bigdata_auth_token: str, max_concurrency: int = 10,
+                 pool_maxsize: int = 100, keep_alive: bool = True,
+                 session=None, rate_limiter: EndpointRateLimiter = None,
+                 retry_policy: RetryPolicy = None,
+                 circuit_breaker: CircuitBreakerRegistry = None,
+                 json_decoder="auto", lazy_results: bool = False,
+                 registry: DatasetRegistry = None,
+                 instrumentation: Instrumentation = None,
+                 connect_timeout: float = 10.0, read_timeout: float = 120.0,
+                 deadline: float = None, validate_documents: bool = True):
+        """
+        __init__.
+
+        Args:
+            bigdata_auth_token [str]: Authentication token for BigData API.
+        Kwargs:
+            max_concurrency [int]: Maximum number of concurrent requests.
+            pool_maxsize [int]: Maximum number of connections on the pool.
+            keep_alive [bool]: If set false, connections are closed after
+                each request.
+            session [aiohttp.ClientSession]: Session to be used on requests,
+                if passed pool arguments are ignored. It will not be closed
+                by `close`.
+            rate_limiter [EndpointRateLimiter]: Limit requests to each
+                end-point, calls await until a token is avaiable.
+            retry_policy [RetryPolicy]: Define which errors are retried and
+                backoff between attempts, default to `RetryPolicy()`.
+            circuit_breaker [CircuitBreakerRegistry]: Circuit breakers of
+                end-points, requests fail fast with
+                `BigDataCorpAPICircuitOpenException` when open.
+            json_decoder [str | callable]: Decoder of response bodies,
+                `auto` use orjson if installed, see `get_json_decoder`.
+            lazy_results [bool]: If set true, responses are returned as
+                `DatasetResult` objects that keep sections encoded until
+                accessed.
+            registry [DatasetRegistry]: Datasets and end-points used by the
+                client, default to the class `registry`.
+            instrumentation [Instrumentation]: Hooks called with latency,
+                retries, status classes and bytes received of requests.
+            connect_timeout [float]: Seconds to wait for a connection, None
+                to wait forever.
+            read_timeout [float]: Seconds to wait for data from the server
+                on each attempt, None to wait forever.
+            deadline [float]: Default time budget in seconds of each call,
+                shared by its retries and datasets. None for no limit.
+            validate_documents [bool]: If set true, check digits of
+                documents are checked before requests.
+        """
+        if aiohttp is None:
+            raise ImportError(
+                "aiohttp must be installed to use AsyncBigDataCorpAPI, "
+                "`pip install aiohttp`")
+        if registry is not None:
+            self.registry = registry
+        self._instrumentation = instrumentation
+        self._bigdata_auth_token = bigdata_auth_token
+        self.max_concurrency = max_concurrency
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+        self._owns_session = session is None
+        self._session = session
+        self._semaphore = None
+        self._rate_limiter = rate_limiter
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._circuit_breaker = circuit_breaker
+        self._json_decoder = get_json_decoder(json_decoder)
+        self._lazy_results = lazy_results
+        self._connect_timeout = connect_timeout
+        self._read_timeout = read_timeout
+        self._deadline = deadline
+        self._validate_documents = validate_documents
+
+    def _get_session(self):
+        """Return the shared session, creating it on the running loop."""
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_maxsize, force_close=not self.keep_alive)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Return the semaphore limiting concurrent requests."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _acquire(self, url: str, datasets: list = (),
+                       deadline: Deadline = None):
+        """
+        Await a rate limit token of the end-point.
+
+        Limiters other than `TokenBucketRateLimiter` may block on shared
+        state, ex.: the SQLite database, so they are reserved on the loop
+        executor.
+
+        Args:
+            url [str]: End-point url.
+        Kwargs:
+            datasets [list[str]]: Datasets of the request.
+            deadline [Deadline]: Deadline of the call.
+        Raise:
+            BigDataCorpAPITimeoutException: If the token is avaiable only
+                after the deadline, the token is not taken.
+        """
+        if self._rate_limiter is None:
+            return
+        limiter = self._rate_limiter.get_limiter(url)
+        if limiter is None:
+            return
+        max_wait = None if deadline is None else deadline.remaining()
+        if isinstance(limiter, TokenBucketRateLimiter):
+            wait = limiter.reserve(max_wait=max_wait)
+        else:
+            wait = await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(limiter.reserve, max_wait=max_wait))
+        if wait is None:
+            raise deadline.exception(url, datasets)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def _client_timeout(self, deadline: Deadline = None):
+        """Return the `aiohttp.ClientTimeout` of an attempt."""
+        connect, read = self._request_timeout(deadline)
+        return aiohttp.ClientTimeout(
+            total=None if deadline is None else deadline.cap(),
+            sock_connect=connect, sock_read=read)
+
+    async def close(self):
+        """Release pooled connections."""
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _post(self, url: str, query: str, datasets: list,
+                    check_minor: bool = False,
+                    deadline: Deadline = None) -> dict:
+        """
+        Post a query for one or more datasets to BigData API.
+
+        Retryable errors are retried according to the retry policy, with
+        exponential backoff. Login and minor document problems are raised
+        without retry, dataset status codes are not checked unless internal
+        problems are retried by the policy.
+
+        Args:
+            url [str]: End-point url.
+            query [str]: BigData query, ex.: `doc{00000000000}`.
+            datasets [list[str]]: Datasets to be fetched on the same request.
+        Kwargs:
+            check_minor [bool]: If set true, raise if document belongs to a
+                minor.
+            deadline [Deadline]: Deadline of the call, attempts time out
+                with the time left and are not retried after it.
+        Return [dict]:
+            Decoded BigData response.
+        Raise:
+            BigDataCorpAPITimeoutException: If the deadline is reached.
+            BigDataCorpAPIException: Raise if errors in API occour.
+        """
+        payload = {
+            "Datasets": ",".join(datasets),
+            "q": query,
+            "Limit": 1}
+        headers = self._headers()
+        session = self._get_session()
+
+        policy = self._retry_policy
+        error_msgs = []
+        for attempt in range(policy.max_attempts):
+            if deadline is not None and deadline.expired:
+                raise deadline.exception(url, datasets, error_msgs)
+            started = time.perf_counter()
+            try:
+                with self._span(url, datasets, attempt):
+                    self._before_request(url)
+                    try:
+                        # Rate limit waits do not hold a concurrency slot
+                        await self._acquire(url, datasets, deadline)
+                        async with self._get_semaphore():
+                            async with session.post(
+                                    url, json=payload, headers=headers,
+                                    timeout=self._client_timeout(
+                                        deadline)) as response:
+                                response.raise_for_status()
+                                raw = await response.read()
+                    except (BigDataCorpAPITimeoutException,
+                            asyncio.CancelledError):
+                        self._release_request(url)
+                        raise
+                    response_json = self._decode_response(
+                        raw=raw, datasets=datasets, check_minor=check_minor)
+                self._record_request(url, response_json=response_json)
+                self._instrument_request(
+                    url, datasets, attempt, started, raw=raw,
+                    response_json=response_json)
+                return response_json
+
+            except BigDataCorpAPITimeoutException:
+                raise
+            except Exception as e:
+                self._record_request(url, exception=e)
+                self._instrument_request(
+                    url, datasets, attempt, started, exception=e)
+                self._register_error(exception=e, error_msgs=error_msgs)
+                if attempt + 1 < policy.max_attempts:
+                    delay = policy.get_delay(attempt, e)
+                    self._retry_timeout(
+                        url, datasets, delay, error_msgs, deadline)
+                    self._instrument_retry(url, attempt, e, delay)
+                    await asyncio.sleep(delay)
+
+        if deadline is not None and deadline.expired:
+            raise deadline.exception(url, datasets, error_msgs)
+        raise self._max_retry_exception(error_msgs)
+
+    async def _fetch_datasets(self, entity: str, document: str,
+                              datasets: list, raise_errors: bool = True,
+                              deadline: Deadline = None) -> dict:
+        """
+        Fetch datasets that share an end-point using a single request.
+
+        Args:
+            entity [str]: One of `cpf`, `cnpj` or `process`.
+            document [str]: Document to be queried.
+            datasets [list[str]]: Datasets to be fetched, all of them must
+                use the same end-point.
+        Kwargs:
+            raise_errors [bool]: If set false, errors are returned as values
+                of the dictionary instead of being raised.
+            deadline [Deadline]: Deadline of the call.
+        Return [dict]:
+            Dictionary with dataset as keys and responses as values.
+        """
+        url = self._dataset_url(entity=entity, dataset=datasets[0])
+        query = self._dataset_query(
+            entity=entity, dataset=datasets[0], document=document)
+        try:
+            response_json = await self._post(
+                url=url, query=query, datasets=datasets,
+                check_minor=entity == "cpf", deadline=deadline)
+        except BigDataCorpAPIException as e:
+            if raise_errors:
+                raise e
+            return {dataset: e for dataset in datasets}
+
+        return self._wrap_results(self._check_responses(
+            entity=entity, document=document, datasets=datasets,
+            response_json=response_json, raise_errors=raise_errors))
+
+    async def _get_datasets(self, entity: str, document: str,
+                            datasets: list, verbosity: bool = False,
+                            single_request: bool = False,
+                            raise_errors: bool = True,
+                            deadline=None) -> dict:
+        """
+        Fetch a list of datasets for an entity concurrently.
+
+        All requests share the deadline, datasets that are not fetched in
+        time have a `BigDataCorpAPITimeoutException` as value even if
+        `raise_errors` is set, so the ones fetched in time are not lost.
+
+        Args:
+            entity [str]: One of `cpf`, `cnpj` or `process`.
+            document [str]: Document to be queried.
+            datasets [list[str]]: List of all datasets to be fetched.
+        Kwargs:
+            verbosity [bool]: If set true will print a msg for each request.
+            single_request [bool]: If set true datasets are grouped by
+                end-point and fetched with one request for each group.
+            raise_errors [bool]: If set false, errors are returned as values
+                of the dictionary instead of being raised.
+            deadline [Deadline | float]: Deadline or time budget in seconds
+                of the call, default to the client `deadline`.
+        Return [dict]:
+            Dictionary with dataset as keys and responses as values.
+        """
+        groups = self._group_datasets(
+            entity=entity, datasets=datasets, single_request=single_request)
+        try:
+            document = self._check_document(
+                entity=entity, document=document)
+        except BigDataCorpAPIInvalidDocumentException as e:
+            if raise_errors:
+                raise e
+            return {db: e for db in datasets}
+
+        deadline = self._get_deadline(deadline)
+        if verbosity:
+            for group in groups:
+                print("Fetching dataset:", ", ".join(group))
+
+        async def fetch_group(group):
+            try:
+                return await self._fetch_datasets(
+                    entity=entity, document=document, datasets=group,
+                    raise_errors=raise_errors, deadline=deadline)
+            except BigDataCorpAPITimeoutException as e:
+                return {dataset: e for dataset in group}
+
+        tasks = [asyncio.ensure_future(fetch_group(group)) for group in groups]
+        try:
+            group_results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        response_dict = {}
+        for group_result in group_results:
+            response_dict.update(group_result)
+        return {db: response_dict[db] for db in datasets}
+
+    async def get_cpf_dataset(self, cpf: str, dataset: str,
+                              deadline=None) -> dict:
+        """
+        Call BigData API to fecth a database for a CPF.
+
+        Args:
+            cpf [str]: Person's CPF.
+            dataset [str]: Dataset on BigData that user should be fetched.
+        Kwargs:
+            deadline [Deadline | float]: Deadline or time budget in seconds
+                of the call, default to the client `deadline`.
+        Return [dict]:
+            Information avaiable on BigData.
+        Raise:
+            BigDataCorpAPIInvalidDocumentException: If document check
+                digits are invalid.
+            BigDataCorpAPITimeoutException: If the deadline is reached.
+            BigDataCorpAPIException: Raise if errors in API occour.
+        """
+        self._check_datasets(entity="cpf", datasets=[dataset])
+        cpf = self._check_document(entity="cpf", document=cpf)
+        response_dict = await self._fetch_datasets(
+            entity="cpf", document=cpf, datasets=[dataset],
+            deadline=self._get_deadline(deadline))
+        return response_dict[dataset]
+
+    async def get_cnpj_dataset(self, cnpj: str, dataset: str,
+                               deadline=None) -> dict:
+        """
+        Call BigData API to fecth a database for a CNPJ.
+
+        Args:
+            cnpj [str]: Company CNPJ.
+            dataset [str]: Dataset on BigData that user should be fetched.
+        Kwargs:
+            deadline [Deadline | float]: Deadline or time budget in seconds
+                of the call, default to the client `deadline`.
+        Return [dict]:
+            Information avaiable on BigData.
+        Raise:
+            BigDataCorpAPIInvalidDocumentException: If document check
+                digits are invalid.
+            BigDataCorpAPITimeoutException: If the deadline is reached.
+            BigDataCorpAPIException: Raise if errors in API occour.
+        """
+        self._check_datasets(entity="cnpj", datasets=[dataset])
+        cnpj = self._check_document(entity="cnpj", document=cnpj)
+        response_dict = await self._fetch_datasets(
+            entity="cnpj", document=cnpj, datasets=[dataset],
+            deadline=self._get_deadline(deadline))
+        return response_dict[dataset]
+
+    async def get_process_dataset(self, process: str, dataset: str,
+                                  deadline=None) -> dict:
+        """
+        Call BigData API to fecth a database for a process.
+
+        Args:
+            process [str]: process number.
+            dataset [str]: Dataset on BigData that user should be fetched.
+        Kwargs:
+            deadline [Deadline | float]: Deadline or time budget in seconds
+                of the call, default to the client `deadline`.
+        Return [dict]:
+            Information avaiable on BigData.
+        Raise:
+            BigDataCorpAPIInvalidDocumentException: If document check
+                digits are invalid.
+            BigDataCorpAPITimeoutException: If the deadline is reached.
+            BigDataCorpAPIException: Raise if errors in API occour.
+        """
+        self._check_datasets(entity="process", datasets=[dataset])
+        process = self._check_document(
+            entity="process", document=process)
+        response_dict = await self._fetch_datasets(
+            entity="process", document=process, datasets=[dataset],
+            deadline=self._get_deadline(deadline))
+        return response_dict[dataset]
+
+    async def get_cpf_datasets(self, cpf: str, datasets: list,
+                               verbosity: bool = False,
+                               single_request: bool = False,
+                               raise_errors: bool = True,
+                               deadline=None) -> dict:
+        """
+        Fetch a list of datasets concurrently for a CPF.
+
+        Args:
+            cpf [str]: Person's CPF.
+            datasets [list[str]]: List of all datasets to be fetched.
+        Kwargs:
+            verbosity [bool]: If set true will print a msg for each dataset
+                fetch.
+            single_request [bool]: If set true all datasets are fetched
+                with a single request.
+            raise_errors [bool]: If set false, dataset errors are returned
+                as exception objects on the dictionary instead of raised.
+            deadline [Deadline | float]: Deadline or time budget in seconds
+                shared by all datasets, default to the client `deadline`.
+                Datasets not fetched in time have a
+                `BigDataCorpAPITimeoutException` as value.
+        Returns [dict]:
+            Return a dictionary with all dataset information, with keys
+            corresponding to dataset name.
+        """
+        return await self._get_datasets(
+            entity="cpf", document=cpf, datasets=datasets,
+            verbosity=verbosity, single_request=single_request,
+            raise_errors=raise_errors, deadline=deadline)
+
+    async def get_cnpj_datasets(self, cnpj: str, datasets: list,
+                                verbosity: bool = False,
+                                single_request: bool = False,
+                                raise_errors: bool = True,
+                                deadline=None) -> dict:
+        """
+        Fetch a list of datasets concurrently for a CNPJ.
+
+        Args:
+            cnpj [str]: Company cnpj.
+            datasets [list[str]]: List of all datasets to be fetched.
+        Kwargs:
+            verbosity [bool]: If set true will print a msg for each dataset
+                fetch.
+            single_request [bool]: If set true datasets are grouped by
+                end-point (companies and marketplace) and fetched with one
+                request for each group.
+            raise_errors [bool]: If set false, dataset errors are returned
+                as exception objects on the dictionary instead of raised.
+            deadline [Deadline | float]: Deadline or time budget in seconds
+                shared by all datasets, default to the client `deadline`.
+                Datasets not fetched in time have a
+                `BigDataCorpAPITimeoutException` as value.
+        Returns [dict]:
+            Return a dictionary with all dataset information, with keys
+            corresponding to dataset name.
+        """
+        return await self._get_datasets(
+            entity="cnpj", document=cnpj, datasets=datasets,
+            verbosity=verbosity, single_request=single_request,
+            raise_errors=raise_errors, deadline=deadline)
+
+    async def get_process_datasets(self, process: str, datasets: list,
+                                   verbosity: bool = False,
+                                   single_request: bool = False,
+                                   raise_errors: bool = True,
+                                   deadline=None) -> dict:
+        """
+        Fetch a list of datasets concurrently for a process.
+
+        Args:
+            process [str]: process number.
+            datasets [list[str]]: List of all datasets to be fetched.
+        Kwargs:
+            verbosity [bool]: If set true will print a msg for each dataset
+                fetch.
+            single_request [bool]: If set true all datasets are fetched
+                with a single request.
+            raise_errors [bool]: If set false, dataset errors are returned
+                as exception objects on the dictionary instead of raised.
+            deadline [Deadline | float]: Deadline or time budget in seconds
+                shared by all datasets, default to the client `deadline`.
+                Datasets not fetched in time have a
+                `BigDataCorpAPITimeoutException` as value.
+        Returns [dict]:
+            Return a dictionary with all dataset information, with keys
+            corresponding to dataset name.
+        """
+        return await self._get_datasets(
+            entity="process", document=process, datasets=datasets,
+            verbosity=verbosity, single_request=single_request,
+            raise_errors=raise_errors, deadline=deadline)
+
+    async def _get_dataset_usage(self, payload: dict) -> dict:
+        """Fetch usage of one dataset, errors are returned as results."""
+        url = self.registry.get_endpoint("usage")
+        headers = self._headers()
+        try:
+            await self._acquire(url)
+            async with self._get_semaphore():
+                async with self._get_session().post(
+                        url, headers=headers, json=payload,
+                        timeout=self._client_timeout()) as response:
+                    if response.status == 500:
+                        response.raise_for_status()
+                    response_json = self._json_decoder(
+                        await response.read())
+                    if response.status != 200:
+                        raise BigDataCorpAPIException(
+                            response_json['Status']['Message'])
+            return self._usage_result(
+                payload=payload, response_json=response_json)
+
+        except Exception as err:
+            return self._usage_error(payload=payload, error=err)
+
+    async def get_usage(self, initial_date: str, final_date: str) -> list:
+        """
+        Retrieve usage data for a specified date range concurrently.
+
+        Args:
+            initial_date [str]: The initial date of the range in the format
+                'yyyy-MM-dd'.
+            final_date [str]: The final date of the range in the format
+                'yyyy-MM-dd'.
+        Return [list[dict]]:
+            Usage data for each API and end-point, datasets that failed
+            have an `error` key, see `BigDataCorpAPI.get_usage`.
+        """
+        payloads = self._usage_payloads(
+            initial_date=initial_date, final_date=final_date)
+        return await asyncio.gather(*[
+            self._get_dataset_usage(payload) for payload in payloads])
@@ -0,0 +1,80 @@
+"""Bounded concurrent execution for bulk BigDataCorpAPI queries."""
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+def iter_bulk(func, items, max_workers: int = 8, max_pending: int = None,
+              key=None, executor: ThreadPoolExecutor = None):
+    """
+    Apply a function to items on a thread pool yielding results as completed.
+
+    Items are consumed lazily from the iterable, at most `max_pending`
+    items are submitted and not yet yielded at any time, so memory does not
+    grow with the size of the input.
+
+    Args:
+        func [callable]: Function called with each item.
+        items [iterable]: Items to be processed.
+    Kwargs:
+        max_workers [int]: Number of worker threads.
+        max_pending [int]: Maximum number of items submitted and not yet
+            yielded, default to `2 * max_workers`.
+        key [callable]: Function returning the key of an item. Items with
+            the same key as an item still running are not submitted, they
+            are yielded with the result of the running one.
+        executor [ThreadPoolExecutor]: Executor used to run the items, it
+            is not shut down at the end. Default to a new executor with
+            `max_workers` threads.
+    Return [generator]:
+        Yield `(item, result)` tuples in completion order, if `func` raises
+        the exception object is yielded as result.
+    """
+    if max_pending is None:
+        max_pending = 2 * max_workers
+    max_pending = max(max_pending, max_workers)
+
+    items = iter(items)
+    pending = {}
+    running = {}
+    n_pending = 0
+    exhausted = False
+    owns_executor = executor is None
+    if owns_executor:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while True:
+            while not exhausted and n_pending < max_pending:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                n_pending += 1
+                item_key = None if key is None else key(item)
+                future = running.get(item_key)
+                if future is not None:
+                    pending[future][1].append(item)
+                    continue
+                future = executor.submit(func, item)
+                pending[future] = (item_key, [item])
+                if key is not None:
+                    running[item_key] = future
+
+            if not pending:
+                return
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item_key, future_items = pending.pop(future)
+                running.pop(item_key, None)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = e
+                for item in future_items:
+                    n_pending -= 1
+                    yield item, result
+    finally:
+        for future in pending:
+            future.cancel()
+        if owns_executor:
+            executor.shutdown(wait=True)
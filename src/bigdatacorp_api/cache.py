@@ -0,0 +1,441 @@
+"""Response caches for BigDataCorpAPI."""
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from bigdatacorp_api.decode import loads, dumps
+
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+class SQLiteResponseCache:
+    """
+    Persistent cache of BigData responses backed by SQLite.
+
+    Responses are keyed by (end-point, document, dataset) and expire after
+    the time to live of the dataset, taken from the client registry (see
+    `DatasetSpec.ttl`) unless set on `dataset_ttls`. When `max_entries` is
+    reached expired entries are removed first and then the least recently
+    used ones. The number of entries is kept on a counter table updated by
+    triggers, so the limit is checked without scanning the table. The
+    database can be shared by many processes on the same host.
+    """
+
+    def __init__(self, path: str, default_ttl: float = DAY,
+                 dataset_ttls: dict = None, max_entries: int = None):
+        """
+        __init__.
+
+        Args:
+            path [str]: Path of the SQLite database file, use `:memory:` for
+                a non-persistent cache.
+        Kwargs:
+            default_ttl [float]: Time to live in seconds for datasets
+                without a specific TTL.
+            dataset_ttls [dict]: Time to live in seconds for each dataset,
+                overrides the registry TTL. Use 0 to not cache a dataset.
+            max_entries [int]: Maximum number of cached responses, None for
+                unbounded.
+        """
+        self.path = path
+        self.default_ttl = default_ttl
+        self.dataset_ttls = dict(dataset_ttls or {})
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None,
+            timeout=30)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bigdata_response ("
+            " endpoint TEXT NOT NULL,"
+            " document TEXT NOT NULL,"
+            " dataset TEXT NOT NULL,"
+            " response TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (endpoint, document, dataset))")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS bigdata_response__accessed_at "
+            "ON bigdata_response (accessed_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bigdata_response_count ("
+            " id INTEGER PRIMARY KEY CHECK (id = 0),"
+            " entries INTEGER NOT NULL)")
+        self._conn.execute(
+            "INSERT OR IGNORE INTO bigdata_response_count (id, entries) "
+            "SELECT 0, COUNT(*) FROM bigdata_response")
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS bigdata_response__insert "
+            "AFTER INSERT ON bigdata_response BEGIN "
+            " UPDATE bigdata_response_count SET entries = entries + 1; "
+            "END")
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS bigdata_response__delete "
+            "AFTER DELETE ON bigdata_response BEGIN "
+            " UPDATE bigdata_response_count SET entries = entries - 1; "
+            "END")
+
+    def get_ttl(self, dataset: str, ttl: float = None) -> float:
+        """
+        Return the time to live in seconds of a dataset.
+
+        Args:
+            dataset [str]: Dataset name.
+        Kwargs:
+            ttl [float]: Time to live of the dataset on the registry, used
+                if not set on `dataset_ttls`.
+        Return [float]:
+            Time to live in seconds, `default_ttl` if not set.
+        """
+        if dataset in self.dataset_ttls:
+            return self.dataset_ttls[dataset]
+        return self.default_ttl if ttl is None else ttl
+
+    def get(self, endpoint: str, document: str, dataset: str):
+        """
+        Return a cached response.
+
+        Args:
+            endpoint [str]: End-point url.
+            document [str]: Normalized document.
+            dataset [str]: Dataset name.
+        Return [dict | None]:
+            Cached response or None if not cached or expired.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM bigdata_response "
+                "WHERE endpoint = ? AND document = ? AND dataset = ? "
+                "AND expires_at > ?",
+                (endpoint, document, dataset, now)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE bigdata_response SET accessed_at = ? "
+                "WHERE endpoint = ? AND document = ? AND dataset = ?",
+                (now, endpoint, document, dataset))
+        return loads(row[0])
+
+    def contains(self, endpoint: str, document: str, dataset: str) -> bool:
+        """
+        Return True if a response is cached and not expired.
+
+        Unlike `get`, counters and access time are not changed.
+
+        Args:
+            endpoint [str]: End-point url.
+            document [str]: Normalized document.
+            dataset [str]: Dataset name.
+        Return [bool]:
+            True if the response is cached.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM bigdata_response "
+                "WHERE endpoint = ? AND document = ? AND dataset = ? "
+                "AND expires_at > ?",
+                (endpoint, document, dataset, time.time())).fetchone()
+        return row is not None
+
+    def set(self, endpoint: str, document: str, dataset: str,
+            response: dict, ttl: float = None):
+        """
+        Store a response on cache.
+
+        Args:
+            endpoint [str]: End-point url.
+            document [str]: Normalized document.
+            dataset [str]: Dataset name.
+            response [dict]: BigData response.
+        Kwargs:
+            ttl [float]: Time to live of the dataset on the registry, see
+                `get_ttl`.
+        """
+        ttl = self.get_ttl(dataset, ttl=ttl)
+        if not ttl:
+            return
+        now = time.time()
+        data = dumps(response)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Update and insert instead of replace, so only new rows
+                # change the counter
+                updated = self._conn.execute(
+                    "UPDATE bigdata_response SET response = ?, "
+                    "expires_at = ?, accessed_at = ? "
+                    "WHERE endpoint = ? AND document = ? AND dataset = ?",
+                    (data, now + ttl, now, endpoint, document,
+                     dataset)).rowcount
+                if not updated:
+                    self._conn.execute(
+                        "INSERT INTO bigdata_response "
+                        "(endpoint, document, dataset, response, "
+                        " expires_at, accessed_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (endpoint, document, dataset, data, now + ttl,
+                         now))
+                    if self.max_entries is not None:
+                        self._evict(now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _count(self) -> int:
+        """Return the number of entries from the counter table."""
+        return self._conn.execute(
+            "SELECT entries FROM bigdata_response_count").fetchone()[0]
+
+    def _evict(self, now: float):
+        """Remove expired and least recently used entries over the limit."""
+        if self._count() <= self.max_entries:
+            return
+        self._conn.execute(
+            "DELETE FROM bigdata_response WHERE expires_at <= ?", (now, ))
+        count = self._count()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM bigdata_response WHERE rowid IN ("
+                " SELECT rowid FROM bigdata_response "
+                " ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries, ))
+
+    def clear(self):
+        """Remove all cached responses."""
+        with self._lock:
+            self._conn.execute("DELETE FROM bigdata_response")
+
+    def stats(self) -> dict:
+        """
+        Return cache statistics.
+
+        Return [dict]:
+            Dictionary with `hits`, `misses`, `hit_rate` and `entries`.
+        """
+        with self._lock:
+            entries = self._count()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries}
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class MemoryResponseCache:
+    """
+    In-process LRU cache of BigData responses with time to live.
+
+    Has the same interface as `SQLiteResponseCache` and is usually placed in
+    front of it. It holds at most `max_entries` responses, the least
+    recently used are removed first. Responses are stored encoded, so each
+    `get` returns a new object and changes to it do not leak to other hits.
+    """
+
+    def __init__(self, max_entries: int = 1024, default_ttl: float = 300,
+                 dataset_ttls: dict = None):
+        """
+        __init__.
+
+        Kwargs:
+            max_entries [int]: Maximum number of cached responses.
+            default_ttl [float]: Time to live in seconds for datasets
+                without a specific TTL.
+            dataset_ttls [dict]: Time to live in seconds for each dataset,
+                overrides the registry TTL. Use 0 to not cache a dataset.
+        """
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.dataset_ttls = dict(dataset_ttls or {})
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get_ttl(self, dataset: str, ttl: float = None) -> float:
+        """
+        Return the time to live in seconds of a dataset.
+
+        Args:
+            dataset [str]: Dataset name.
+        Kwargs:
+            ttl [float]: Time to live of the dataset on the registry, used
+                if not set on `dataset_ttls`.
+        Return [float]:
+            Time to live in seconds, `default_ttl` if not set.
+        """
+        if dataset in self.dataset_ttls:
+            return self.dataset_ttls[dataset]
+        return self.default_ttl if ttl is None else ttl
+
+    def get(self, endpoint: str, document: str, dataset: str):
+        """
+        Return a cached response.
+
+        Args:
+            endpoint [str]: End-point url.
+            document [str]: Normalized document.
+            dataset [str]: Dataset name.
+        Return [dict | None]:
+            Cached response or None if not cached or expired.
+        """
+        key = (endpoint, document, dataset)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return loads(entry[1])
+
+    def contains(self, endpoint: str, document: str, dataset: str) -> bool:
+        """
+        Return True if a response is cached and not expired.
+
+        Unlike `get`, counters and recency are not changed.
+
+        Args:
+            endpoint [str]: End-point url.
+            document [str]: Normalized document.
+            dataset [str]: Dataset name.
+        Return [bool]:
+            True if the response is cached.
+        """
+        with self._lock:
+            entry = self._entries.get((endpoint, document, dataset))
+        return entry is not None and entry[0] > time.monotonic()
+
+    def set(self, endpoint: str, document: str, dataset: str,
+            response: dict, ttl: float = None):
+        """
+        Store a response on cache.
+
+        Args:
+            endpoint [str]: End-point url.
+            document [str]: Normalized document.
+            dataset [str]: Dataset name.
+            response [dict]: BigData response.
+        Kwargs:
+            ttl [float]: Time to live of the dataset on the registry, see
+                `get_ttl`.
+        """
+        ttl = self.get_ttl(dataset, ttl=ttl)
+        if not ttl:
+            return
+        key = (endpoint, document, dataset)
+        data = dumps(response)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all cached responses."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Return cache statistics.
+
+        Return [dict]:
+            Dictionary with `hits`, `misses`, `hit_rate` and `entries`.
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries)}
+
+    def close(self):
+        """Remove all cached responses."""
+        self.clear()
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key.
+
+    While a call for a key is running, other threads calling with the same
+    key wait for it and receive its result or exception instead of running
+    the function again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, timeout: float = None):
+        """
+        Run `func` once for concurrent calls with the same key.
+
+        Args:
+            key [hashable]: Key identifying the call.
+            func [callable]: Function without arguments to be called.
+        Kwargs:
+            timeout [float]: Maximum seconds to wait for a running call,
+                None to wait until it ends.
+        Return:
+            Result of `func`.
+        Raise:
+            TimeoutError: If the running call does not end in `timeout`.
+            Exception raised by `func`.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            if not call.event.wait(timeout):
+                raise TimeoutError(
+                    "timeout waiting for concurrent call [{}]".format(key))
+            if call.exception is not None:
+                raise call.exception
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.exception = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+class _Call:
+    """Result of a call shared by `SingleFlight` waiters."""
+
+    __slots__ = ("event", "result", "exception")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.exception = None
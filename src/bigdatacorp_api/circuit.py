@@ -0,0 +1,211 @@
+"""Circuit breakers for BigDataCorp end-points."""
+import time
+import threading
+from collections import deque
+from bigdatacorp_api.exceptions import BigDataCorpAPICircuitOpenException
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of one end-point.
+
+    The circuit opens after `failure_threshold` consecutive failures or when
+    the failure rate of the last `window_size` calls reaches
+    `failure_rate`. While open, calls fail fast with
+    `BigDataCorpAPICircuitOpenException`. After `recovery_timeout` seconds
+    the circuit is half-open and lets `half_open_max_calls` probe requests
+    through, it closes if they succeed and opens again if one fails.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, failure_rate: float = None,
+                 window_size: int = 20, min_calls: int = 10,
+                 recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1, name: str = None):
+        """
+        __init__.
+
+        Kwargs:
+            failure_threshold [int]: Consecutive failures that open the
+                circuit, None to disable.
+            failure_rate [float]: Rate of failures (0 to 1) on the window
+                that opens the circuit, None to disable.
+            window_size [int]: Number of last calls used to compute the
+                failure rate.
+            min_calls [int]: Minimum number of calls on the window before
+                the failure rate is checked.
+            recovery_timeout [float]: Seconds the circuit stays open before
+                probe requests are allowed.
+            half_open_max_calls [int]: Number of concurrent probe requests
+                on half-open state.
+            name [str]: Name of the circuit, usually the end-point url.
+        """
+        self.failure_threshold = failure_threshold
+        self.failure_rate = failure_rate
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._window = deque(maxlen=window_size)
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._half_open_calls = 0
+        self._open_count = 0
+
+    @property
+    def state(self) -> str:
+        """Return current state: `closed`, `open` or `half_open`."""
+        with self._lock:
+            self._update_state()
+            return self._state
+
+    def _update_state(self):
+        """Move from open to half-open after recovery timeout."""
+        if self._state == self.OPEN and \
+                time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._open_count += 1
+        self._half_open_calls = 0
+
+    def before_call(self):
+        """
+        Check if a request can be sent.
+
+        Raise:
+            BigDataCorpAPICircuitOpenException: If circuit is open or all
+                half-open probe requests are in progress.
+        """
+        with self._lock:
+            self._update_state()
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.HALF_OPEN and \
+                    self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return
+            retry_in = 0.0
+            if self._opened_at is not None:
+                retry_in = max(
+                    self.recovery_timeout -
+                    (time.monotonic() - self._opened_at), 0.0)
+            raise BigDataCorpAPICircuitOpenException(
+                message="circuit is open for end-point",
+                payload={
+                    "endpoint": self.name, "state": self._state,
+                    "retry_in": retry_in})
+
+    def release(self):
+        """Release the probe slot of a call that was not sent."""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_success(self):
+        """Register a successful request."""
+        with self._lock:
+            self._window.append(False)
+            self._consecutive_failures = 0
+            if self._state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._window.clear()
+
+    def record_failure(self):
+        """Register a failed request."""
+        with self._lock:
+            self._window.append(True)
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN:
+                self._open()
+                return
+            if self._state == self.OPEN:
+                return
+
+            if self.failure_threshold is not None and \
+                    self._consecutive_failures >= self.failure_threshold:
+                self._open()
+            elif self.failure_rate is not None and \
+                    len(self._window) >= self.min_calls:
+                rate = sum(self._window) / len(self._window)
+                if rate >= self.failure_rate:
+                    self._open()
+
+    def reset(self):
+        """Close the circuit and clear statistics."""
+        with self._lock:
+            self._state = self.CLOSED
+            self._window.clear()
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._half_open_calls = 0
+
+    def get_status(self) -> dict:
+        """
+        Return circuit status for health checks.
+
+        Return [dict]:
+            Dictionary with `state`, `consecutive_failures`,
+            `failure_rate` on the window, `calls` on the window and
+            `open_count`.
+        """
+        with self._lock:
+            self._update_state()
+            calls = len(self._window)
+            return {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_rate": sum(self._window) / calls if calls else 0.0,
+                "calls": calls,
+                "open_count": self._open_count}
+
+
+class CircuitBreakerRegistry:
+    """
+    Circuit breakers for each end-point url.
+
+    Breakers are created on first use with the arguments passed to the
+    registry.
+    """
+
+    def __init__(self, **breaker_kwargs):
+        """
+        __init__.
+
+        Kwargs:
+            **breaker_kwargs: Arguments used to create each
+                `CircuitBreaker`.
+        """
+        self.breaker_kwargs = breaker_kwargs
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str) -> CircuitBreaker:
+        """Return the circuit breaker of an end-point."""
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(endpoint)
+                if breaker is None:
+                    breaker = CircuitBreaker(
+                        name=endpoint, **self.breaker_kwargs)
+                    self._breakers[endpoint] = breaker
+        return breaker
+
+    def get_status(self) -> dict:
+        """Return status of each end-point circuit, see `CircuitBreaker`."""
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {
+            endpoint: breaker.get_status()
+            for endpoint, breaker in breakers.items()}
@@ -0,0 +1,89 @@
+"""Command line interface of BigDataCorpAPI."""
+import os
+import sys
+import argparse
+from bigdatacorp_api.data import BigDataCorpAPI
+from bigdatacorp_api.cache import SQLiteResponseCache
+from bigdatacorp_api.pipeline import EnrichmentPipeline, read_documents
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the argument parser of `bigdatacorp-enrich`."""
+    parser = argparse.ArgumentParser(
+        prog="bigdatacorp-enrich",
+        description=(
+            "Enrich documents from a CSV or NDJSON file with BigDataCorp "
+            "datasets, writing results to NDJSON. Reruns with the same "
+            "checkpoint resume where the last run stopped."))
+    parser.add_argument("input", help="CSV or NDJSON file with documents.")
+    parser.add_argument(
+        "-o", "--output", required=True, help="Output NDJSON file.")
+    parser.add_argument(
+        "-e", "--entity", default="cpf", choices=["cpf", "cnpj", "process"],
+        help="Type of the documents.")
+    parser.add_argument(
+        "-d", "--datasets", required=True,
+        help="Comma separated list of datasets.")
+    parser.add_argument(
+        "-c", "--column", default="document",
+        help="CSV column or NDJSON key with the documents.")
+    parser.add_argument(
+        "--format", dest="file_format", choices=["csv", "ndjson"],
+        help="Input format, inferred from the extension by default.")
+    parser.add_argument(
+        "--checkpoint", help="Checkpoint file, default to OUTPUT.checkpoint.")
+    parser.add_argument(
+        "--workers", type=int, default=8,
+        help="Number of concurrent documents.")
+    parser.add_argument(
+        "--single-request", action="store_true",
+        help="Group datasets by end-point on a single request.")
+    parser.add_argument(
+        "--cache", help="SQLite response cache file.")
+    parser.add_argument(
+        "--token", default=os.getenv("BIGDATA_AUTH_TOKEN"),
+        help="BigData token, default to BIGDATA_AUTH_TOKEN env variable.")
+    return parser
+
+
+def main(argv: list = None) -> int:
+    """
+    Run `bigdatacorp-enrich`.
+
+    Kwargs:
+        argv [list[str]]: Command line arguments, default to `sys.argv`.
+    Return [int]:
+        Exit code, 1 if any dataset failed.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.token:
+        parser.error(
+            "BigData token must be set with --token or BIGDATA_AUTH_TOKEN")
+
+    datasets = [db.strip() for db in args.datasets.split(",") if db.strip()]
+    cache = SQLiteResponseCache(args.cache) if args.cache else None
+    bigdata_api = BigDataCorpAPI(
+        bigdata_auth_token=args.token, pool_maxsize=max(args.workers, 10),
+        cache=cache)
+    try:
+        pipeline = EnrichmentPipeline(
+            bigdata_api, entity=args.entity, datasets=datasets,
+            output_path=args.output, checkpoint_path=args.checkpoint,
+            max_workers=args.workers, single_request=args.single_request)
+        stats = pipeline.run(read_documents(
+            args.input, column=args.column, file_format=args.file_format))
+    finally:
+        bigdata_api.close()
+        if cache is not None:
+            cache.close()
+
+    print(
+        "documents: {documents}, skipped: {skipped}, "
+        "succeeded: {succeeded}, failed: {failed}".format(**stats),
+        file=sys.stderr)
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
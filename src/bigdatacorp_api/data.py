@@ -1,10 +1,29 @@
 """BigDataCorp Python API."""
-import os
-import time
-import json
 import time
 import datetime
-import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from bigdatacorp_api.transport import HTTPTransport
+from bigdatacorp_api.decode import get_json_decoder, dumps
+from bigdatacorp_api.bulk import iter_bulk
+from bigdatacorp_api.dedup import Deduplicator
+from bigdatacorp_api.deadline import Deadline, get_deadline
+from bigdatacorp_api.validation import normalize_document, validate_document
+from bigdatacorp_api.streaming import get_stream_list, iter_body, parse_stream
+from bigdatacorp_api.result import DatasetResult
+from bigdatacorp_api.registry import DatasetRegistry
+from bigdatacorp_api.instrumentation import (
+    Instrumentation, logger, _NULL_SPAN)
+from bigdatacorp_api.usage import UsageStore, date_range, sum_usage
+from bigdatacorp_api.ratelimit import EndpointRateLimiter
+from bigdatacorp_api.cache import (
+    SQLiteResponseCache, MemoryResponseCache, SingleFlight)
+from bigdatacorp_api.retry import (
+    RetryPolicy, get_http_status, is_server_error)
+from bigdatacorp_api.circuit import CircuitBreakerRegistry
+from bigdatacorp_api.status import (
+    check_login_status, check_minor_status, check_dataset_status,
+    check_problem_status)
 from bigdatacorp_api.exceptions import (
     BigDataCorpAPIException, BigDataCorpAPIInvalidDocumentException,
     BigDataCorpAPIMinorDocumentException,
@@ -16,10 +35,22 @@ from bigdatacorp_api.exceptions import (
     BigDataCorpAPIOnDemandQueriesException,
     BigDataCorpAPIMonitoringAPIException,
     BigDataCorpAPIUnmappedErrorException,
-    BigDataCorpAPIEmptyEnrichedProcessException)
+    BigDataCorpAPIEmptyEnrichedProcessException,
+    BigDataCorpAPIRequestException,
+    BigDataCorpAPICircuitOpenException,
+    BigDataCorpAPITimeoutException)
+
+
+class BigDataCorpAPIBase:
+    """Datasets, end-points and response checks shared by API clients."""
 
+    _lazy_results = False
+    _instrumentation = None
+    _connect_timeout = None
+    _read_timeout = None
+    _deadline = None
+    _validate_documents = True
 
-class BigDataCorpAPI:
     CPF_DATABASES = [
         "government_debtors",
         "election_candidate_data",
@@ -131,14 +162,31 @@ class BigDataCorpAPI:
         'cade_processes_data'
     ]
 
-    def __init__(self, bigdata_auth_token: str):
-        """
-        __init__.
-
-        Args:
-            bigdata_auth_token [str]: Authentication token for BigData API.
-        """
-        self._bigdata_auth_token = bigdata_auth_token
+    PEOPLE_URL = "https://bigboost.bigdatacorp.com.br/peoplev2"
+    COMPANIES_URL = "https://bigboost.bigdatacorp.com.br/companies"
+    MARKETPLACE_URL = "https://plataforma.bigdatacorp.com.br/marketplace"
+    PROCESS_URL = "https://plataforma.bigdatacorp.com.br/processos"
+    USAGE_URL = "https://plataforma.bigdatacorp.com.br/usage"
+
+    # Routing of all clients that are not created with their own registry,
+    # datasets registered on it are avaiable to those clients
+    registry = DatasetRegistry.from_lists(
+        cpf_datasets=CPF_DATABASES, cnpj_datasets=CNPJ_DATABASES,
+        process_datasets=PROCESS_DATABASES,
+        marketplace_datasets=MARKETPLACE_DATABASES,
+        endpoints={
+            "people": PEOPLE_URL, "companies": COMPANIES_URL,
+            "marketplace": MARKETPLACE_URL, "processes": PROCESS_URL,
+            "usage": USAGE_URL})
+
+    # Payload fields of paginated list datasets, pages start at FIRST_PAGE
+    PAGE_FIELD = "Page"
+    PAGE_SIZE_FIELD = "PageSize"
+    FIRST_PAGE = 1
+
+    _ENTITY_LABELS = {"cpf": "CPF", "cnpj": "CNPJ", "process": "process"}
+    _ENTITY_PAYLOAD_KEYS = {
+        "cpf": "cpf", "cnpj": "cnpj", "process": "process_number"}
 
     def list_cpf_dataset(self) -> list:
         """
@@ -151,7 +199,7 @@ class BigDataCorpAPI:
         Return:
             Return a list with avaiable datasets.
         """
-        return self.CPF_DATABASES
+        return self.registry.datasets("cpf")
 
     def list_cnpj_dataset(self) -> list:
         """
@@ -164,7 +212,7 @@ class BigDataCorpAPI:
         Return:
             Return a list with avaiable datasets.
         """
-        return self.CNPJ_DATABASES
+        return self.registry.datasets("cnpj")
 
     def list_process_dataset(self) -> list:
         """
@@ -177,387 +225,1113 @@ class BigDataCorpAPI:
         Return:
             Return a list with avaiable datasets.
         """
-        return self.PROCESS_DATABASES
+        return self.registry.datasets("process")
 
-    def get_cpf_dataset(self, cpf: str, dataset: str) -> dict:
+    def _check_datasets(self, entity: str, datasets: list):
         """
-        Call BigData API to fecth a database for a CPF.
+        Check if datasets are avaiable for an entity.
 
-        Retry for 5 times sleeping 1 second when errors are raised.
+        Args:
+            entity [str]: One of `cpf`, `cnpj` or `process`.
+            datasets [list[str]]: Datasets to be checked.
+        Raise:
+            BigDataCorpAPIException: Raise if a dataset is not avaiable.
+        """
+        for dataset in datasets:
+            if not self.registry.has(entity, dataset):
+                msg = (
+                    "dataset [{dataset}] not avaiable on bigboost for "
+                    "{label}, avaiable datasets:\n{datasets}").format(
+                    dataset=dataset,
+                    label=self._ENTITY_LABELS.get(entity, entity),
+                    datasets=", ".join(self.registry.datasets(entity)))
+                raise BigDataCorpAPIException(msg)
+
+    @staticmethod
+    def _normalize_document(entity: str, document: str) -> str:
+        """Remove punctuation and pad documents with leading zeros."""
+        return normalize_document(entity, document)
+
+    def _check_document(self, entity: str, document: str) -> str:
+        """
+        Normalize a document and check its digits before any request.
 
         Args:
-            cpf [str]: Person's CPF.
-            dataset [str]: Dataset on BigData that user should be fetched.
-        Return [dict]:
-            Information avaiable on BigData.
+            entity [str]: One of `cpf`, `cnpj` or `process`.
+            document [str]: Document as received.
+        Return [str]:
+            Normalized document.
         Raise:
-            BigDataCorpAPIException: Raise if errors in API occour.
+            BigDataCorpAPIInvalidDocumentException: If document validation
+                is set and check digits are invalid.
         """
-        if dataset not in self.CPF_DATABASES:
-            msg = (
-                "dataset [{dataset}] not avaiable on bigboost for CPF, "
-                "avaiable datasets:\n{datasets}").format(
-                dataset=dataset, datasets=", ".join(self.CPF_DATABASES))
-            raise BigDataCorpAPIException(msg)
+        if self._validate_documents:
+            return validate_document(entity, document)
+        return normalize_document(entity, document)
 
-        url = "https://bigboost.bigdatacorp.com.br/peoplev2"
-        payload = {
-            "Datasets": dataset,
-            "q": "doc{" + cpf + "}",
-            "Limit": 1}
-        headers = {
+    @staticmethod
+    def _document_key(entity: str, document: str) -> str:
+        """
+        Return the canonical key of a document.
+
+        All spellings of a document (with or without punctuation or
+        leading zeros) have the same key, it is used on caches, bulk
+        deduplication, query plans and pipeline checkpoints.
+        """
+        return normalize_document(entity, document)
+
+    def _dataset_url(self, entity: str, dataset: str) -> str:
+        """Return the end-point url used to fetch an entity dataset."""
+        return self.registry.get_url(entity, dataset)
+
+    def _dataset_query(self, entity: str, dataset: str,
+                       document: str) -> str:
+        """Return the BigData query of a document for a dataset."""
+        return self.registry.get(entity, dataset).format_query(document)
+
+    def _get_deadline(self, deadline=None):
+        """
+        Return the deadline of a call.
+
+        Kwargs:
+            deadline [Deadline | float]: Deadline or budget in seconds of
+                the call, None to use the client default.
+        Return [Deadline | None]:
+            Deadline or None if the call has no time limit.
+        """
+        return get_deadline(deadline, default=self._deadline)
+
+    def _request_timeout(self, deadline: Deadline = None) -> tuple:
+        """
+        Return connect and read timeouts of an attempt.
+
+        Kwargs:
+            deadline [Deadline]: Deadline of the call, timeouts are capped
+                at the time left.
+        Return [tuple[float, float]]:
+            Connect and read timeouts in seconds.
+        """
+        if deadline is None:
+            return self._connect_timeout, self._read_timeout
+        return (
+            deadline.cap(self._connect_timeout),
+            deadline.cap(self._read_timeout))
+
+    def _retry_timeout(self, url: str, datasets: list, delay: float,
+                       error_msgs: list, deadline: Deadline = None):
+        """
+        Raise if the next attempt would start after the deadline.
+
+        Args:
+            url [str]: End-point url.
+            datasets [list[str]]: Datasets of the request.
+            delay [float]: Backoff before the next attempt.
+            error_msgs [list[str]]: Errors of previous attempts.
+        Kwargs:
+            deadline [Deadline]: Deadline of the call.
+        Raise:
+            BigDataCorpAPITimeoutException: If the backoff ends after the
+                deadline.
+        """
+        if deadline is not None and delay >= deadline.remaining():
+            raise deadline.exception(url, datasets, error_msgs)
+
+    def _headers(self) -> dict:
+        """Return headers used on BigData requests."""
+        return {
             "accept": "application/json",
             "content-type": "application/json",
             "AccessToken": self._bigdata_auth_token}
 
-        error_msgs = []
-        for i in range(5):
-            try:
-                response = requests.post(url, json=payload, headers=headers)
-                response.raise_for_status()
-                response_json = response.json()
-                status_data = response_json['Status']
-
-                # Treat minor validation error
-                birth_validation = status_data.get('date_of_birth_validation')
-                if birth_validation is not None:
-                    raise BigDataCorpAPIMinorDocumentException(
-                        message="this cpf belongs to a minor",
-                        payload=birth_validation[0])
-
-                login_entry = status_data.get("login")
-                if login_entry is not None:
-                    login_return = login_entry[0]
-                    if login_return["Code"] == -101:
-                        msg = "BigBoost user has expired"
-                        raise BigDataCorpAPILoginProblemException(msg)
-
-                # Check if the CPF has a match
-                status = status_data[dataset][0]
-                if status['Code'] == 0:
-                    return response.json()
-
-                elif status['Code'] >= -202 and status['Code'] <= -100:
-                    raise BigDataCorpAPIInvalidInputException(
-                        message="error related to input data",
-                        payload={
-                            'bigdata_status': status,
-                            'cpf': cpf,
-                            'dataset': dataset})
-
-                elif status['Code'] >= -1002 and status['Code'] <= -1000:
-                    raise BigDataCorpAPILoginProblemException(
-                        message="error related to login problem",
-                        payload={
-                            'bigdata_status': status,
-                            'cpf': cpf,
-                            'dataset': dataset
-                        })
-                elif status['Code'] >= -2999 and status['Code'] <= -2000:
-                    raise BigDataCorpAPIProblemAPIException(
-                        message="error related to internal problems in APIs "
-                                "or services",
-                        payload={
-                            'bigdata_status': status,
-                            'cpf': cpf,
-                            'dataset': dataset
-                        })
-                elif status['Code'] >= -1999 and status['Code'] <= -1200:
-                    raise BigDataCorpAPIOnDemandQueriesException(
-                        message="error related to on-demand queries",
-                        payload={
-                            'bigdata_status': status,
-                            'cpf': cpf,
-                            'dataset': dataset
-                        })
-                elif status['Code'] <= -3000:
-                    raise BigDataCorpAPIMonitoringAPIException(
-                        message="error related to problems in the Monitoring "
-                                "API or Asynchronous Calls",
-                        payload={
-                            'bigdata_status': status,
-                            'cpf': cpf,
-                            'dataset': dataset
-                        })
-                else:
-                    raise BigDataCorpAPIUnmappedErrorException(
-                        message="unmapped error",
-                        payload={
-                            'bigdata_status': status,
-                            'cpf': cpf,
-                            'dataset': dataset
-                        })
-
-            # Raise if document is invalid
-            except BigDataCorpAPIException as e:
-                raise e
+    @staticmethod
+    def _split_response(response_json: dict, datasets: list) -> dict:
+        """
+        Split a multi-dataset response in one response for each dataset.
 
-            # Raise if document is invalid
-            except BigDataCorpAPILoginProblemException as e:
-                raise e
+        `Result` is shared by all datasets, `Status` keeps only the entry of
+        the dataset and entries that are not related to a dataset (login).
 
-            # Raise if document is from an under age (age < 18)
-            except BigDataCorpAPIMinorDocumentException as e:
-                raise e
+        Args:
+            response_json [dict]: Decoded BigData response.
+            datasets [list[str]]: Datasets fetched on the request.
+        Return [dict]:
+            Dictionary with dataset as keys and responses as values.
+        """
+        status_data = response_json['Status']
+        response_dict = {}
+        for dataset in datasets:
+            dataset_response = dict(response_json)
+            dataset_response['Status'] = {
+                key: value for key, value in status_data.items()
+                if key == dataset or key not in datasets}
+            response_dict[dataset] = dataset_response
+        return response_dict
 
-            except Exception as e:
-                error_msgs.append(str(e))
-                print("!!Error fetching BigData API:", str(e))
+    def _check_response(self, entity: str, document: str, dataset: str,
+                        response_json: dict):
+        """
+        Raise the exception corresponding to a dataset status.
+
+        Args:
+            entity [str]: One of `cpf`, `cnpj` or `process`.
+            document [str]: Document that was queried.
+            dataset [str]: Dataset that was fetched.
+            response_json [dict]: Decoded BigData response.
+        Raise:
+            BigDataCorpAPIException: If dataset status is an error.
+        """
+        status = response_json['Status'][dataset][0]
+        payload = {
+            self._ENTITY_PAYLOAD_KEYS.get(entity, entity): document,
+            'dataset': dataset}
+        if entity == "process":
+            # Check if the process has a match
+            result_data = response_json.\
+                get('Result', [{}])[0].\
+                get('BasicData', {})
+            if status['Code'] == 0 and result_data:
+                return
+            elif not result_data:
+                exception_payload = {'bigdata_status': status}
+                exception_payload.update(payload)
+                raise BigDataCorpAPIEmptyEnrichedProcessException(
+                    message="no process data returned",
+                    payload=exception_payload)
+        check_dataset_status(status=status, payload=payload)
+
+    def _decode_response(self, raw: bytes, datasets: list,
+                         check_minor: bool = False) -> dict:
+        """
+        Decode a response body once and check status that stop retries.
+
+        Args:
+            raw [bytes]: Response body.
+            datasets [list[str]]: Datasets fetched on the request.
+        Kwargs:
+            check_minor [bool]: If set true, raise if document belongs to a
+                minor.
+        Return [dict]:
+            Decoded BigData response.
+        Raise:
+            BigDataCorpAPIException: See `_check_post_status`.
+        """
+        response_json = self._json_decoder(raw)
+        self._check_post_status(
+            response_json=response_json, datasets=datasets,
+            check_minor=check_minor)
+        return response_json
+
+    def _check_post_status(self, response_json: dict, datasets: list,
+                           check_minor: bool = False):
+        """
+        Check status of a response that must be raised or retried.
+
+        Args:
+            response_json [dict]: Decoded BigData response.
+            datasets [list[str]]: Datasets fetched on the request.
+        Kwargs:
+            check_minor [bool]: If set true, raise if document belongs to a
+                minor.
+        Raise:
+            BigDataCorpAPIException: Login, minor document and, if retried
+                by the policy, internal problem errors.
+            KeyError: If a dataset status is missing.
+        """
+        status_data = response_json['Status']
+
+        # Treat minor validation error
+        if check_minor:
+            check_minor_status(status_data)
+        check_login_status(status_data)
+
+        if self._retry_policy.retry_problem_api:
+            check_problem_status(status_data=status_data, datasets=datasets)
+        else:
+            # Check if all datasets have a status
+            for dataset in datasets:
+                status_data[dataset][0]
+
+    def _before_request(self, url: str):
+        """
+        Check the circuit breaker of the end-point.
+
+        Args:
+            url [str]: End-point url.
+        Raise:
+            BigDataCorpAPICircuitOpenException: If the circuit is open.
+        """
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.get(url).before_call()
+
+    def _release_request(self, url: str):
+        """
+        Release the circuit breaker probe of a request that was not sent.
+
+        Args:
+            url [str]: End-point url.
+        """
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.get(url).release()
+
+    def _record_request(self, url: str, exception: Exception = None,
+                        response_json: dict = None):
+        """
+        Register the result of a request on the end-point circuit breaker.
+
+        Transport errors, HTTP 5xx, malformed responses and internal
+        problem status (-2000 to -2999) are failures.
 
+        Args:
+            url [str]: End-point url.
+        Kwargs:
+            exception [Exception]: Error raised by the request.
+            response_json [dict]: Decoded response if no error was raised.
+        """
+        if self._circuit_breaker is None or isinstance(
+                exception, BigDataCorpAPICircuitOpenException):
+            return
+
+        if exception is not None:
+            failed = isinstance(
+                exception, BigDataCorpAPIProblemAPIException) or \
+                is_server_error(exception)
+        else:
+            failed = False
+            for entries in response_json['Status'].values():
+                code = entries[0].get('Code', 0)
+                if code >= -2999 and code <= -2000:
+                    failed = True
+                    break
+
+        breaker = self._circuit_breaker.get(url)
+        if failed:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    def _span(self, url: str, datasets: list, attempt: int):
+        """Return the instrumentation span of a request attempt."""
+        if self._instrumentation is None:
+            return _NULL_SPAN
+        return self._instrumentation.span("bigdatacorp.request", {
+            "bigdatacorp.endpoint": url,
+            "bigdatacorp.datasets": ",".join(datasets),
+            "bigdatacorp.attempt": attempt + 1})
+
+    def _instrument_request(self, url: str, datasets: list, attempt: int,
+                            started: float, raw: bytes = None,
+                            response_json: dict = None,
+                            exception: Exception = None,
+                            bytes_received: int = 0):
+        """
+        Call instrumentation hook of a request attempt.
+
+        Args:
+            url [str]: End-point url.
+            datasets [list[str]]: Datasets of the request.
+            attempt [int]: Attempt number, starting at 0.
+            started [float]: `time.perf_counter` at the attempt start.
+        Kwargs:
+            raw [bytes]: Response body.
+            response_json [dict]: Decoded response.
+            exception [Exception]: Error raised by the attempt.
+            bytes_received [int]: Size of the body if `raw` is not kept,
+                ex.: streamed responses.
+        """
+        instrumentation = self._instrumentation
+        if instrumentation is None:
+            return
+        status_codes = None
+        if response_json is not None:
+            status_data = response_json.get('Status', {})
+            status_codes = {
+                db: status_data[db][0].get('Code', 0)
+                for db in datasets if status_data.get(db)}
+        instrumentation.on_request(
+            endpoint=url, datasets=datasets, attempt=attempt + 1,
+            elapsed=time.perf_counter() - started,
+            bytes_received=len(raw) if raw else bytes_received,
+            status_codes=status_codes, exception=exception)
+
+    def _instrument_retry(self, url: str, attempt: int,
+                          exception: Exception, delay: float):
+        """Call instrumentation hook of a retry."""
+        if self._instrumentation is not None:
+            self._instrumentation.on_retry(
+                endpoint=url, attempt=attempt + 1, exception=exception,
+                delay=delay)
+
+    def get_circuit_breaker_status(self) -> dict:
+        """
+        Return circuit breaker status of each end-point for health checks.
+
+        Return [dict]:
+            Dictionary with end-point urls as keys and status as values,
+            see `CircuitBreaker.get_status`. Empty if no circuit breaker is
+            configured.
+        """
+        if self._circuit_breaker is None:
+            return {}
+        return self._circuit_breaker.get_status()
+
+    def _register_error(self, exception: Exception, error_msgs: list):
+        """
+        Register a failed attempt or raise if it should not be retried.
+
+        Args:
+            exception [Exception]: Error raised by the attempt.
+            error_msgs [list[str]]: Messages of previous errors, the message
+                of the error is appended.
+        Raise:
+            BigDataCorpAPIException: If error is not retryable, BigData
+                errors are raised as they are and others are raised as
+                `BigDataCorpAPIRequestException`.
+        """
+        error_msgs.append(str(exception))
+        if not self._retry_policy.is_retryable(exception):
+            if isinstance(exception, BigDataCorpAPIException):
+                raise exception
+            raise BigDataCorpAPIRequestException(
+                message="non retryable error on API: {}".format(exception),
+                payload={
+                    "errors": error_msgs,
+                    "status_code": get_http_status(exception)})
+        logger.warning("error fetching BigData API: %s", exception)
+
+    def _max_retry_exception(self, error_msgs: list):
+        """Return the exception raised when all attempts failed."""
         msg = (
-            "Untreated error on API with max 5 retries:{}\n".format(
-                "\n".join(error_msgs)))
-        raise BigDataCorpAPIMaxRetryException(
+            "Untreated error on API with max {} retries:{}\n".format(
+                self._retry_policy.max_attempts, "\n".join(error_msgs)))
+        return BigDataCorpAPIMaxRetryException(
             message=msg, payload={"errors": error_msgs})
 
-    def get_cnpj_dataset(self, cnpj: str, dataset: str) -> dict:
+    def _check_responses(self, entity: str, document: str, datasets: list,
+                         response_json: dict,
+                         raise_errors: bool = True) -> dict:
         """
-        Call BigData API to fecth a database for a CNPJ.
+        Split a response by dataset and check the status of each dataset.
 
-        Retry for 5 times sleeping 1 second when errors are raised.
+        Args:
+            entity [str]: One of `cpf`, `cnpj` or `process`.
+            document [str]: Document that was queried.
+            datasets [list[str]]: Datasets fetched on the request.
+            response_json [dict]: Decoded BigData response.
+        Kwargs:
+            raise_errors [bool]: If set false, errors are returned as values
+                of the dictionary instead of being raised.
+        Return [dict]:
+            Dictionary with dataset as keys and responses as values.
+        """
+        if len(datasets) == 1:
+            response_dict = {datasets[0]: response_json}
+        else:
+            response_dict = self._split_response(
+                response_json=response_json, datasets=datasets)
+        for dataset, dataset_response in response_dict.items():
+            try:
+                self._check_response(
+                    entity=entity, document=document, dataset=dataset,
+                    response_json=dataset_response)
+            except BigDataCorpAPIException as e:
+                if raise_errors:
+                    raise e
+                response_dict[dataset] = e
+        return response_dict
+
+    def _wrap_results(self, response_dict: dict) -> dict:
+        """
+        Convert responses to `DatasetResult` if lazy results are set.
 
         Args:
-            cnpj [str]: Company CNPJ.
-            dataset [str]: Dataset on BigData that user should be fetched.
+            response_dict [dict]: Dictionary with dataset as keys and
+                responses, exceptions or (response, raw) tuples as values.
         Return [dict]:
-            Information avaiable on BigData.
+            Dictionary with responses converted.
+        """
+        if not self._lazy_results:
+            return response_dict
+        # Datasets fetched on the same request share their encoded sections
+        encoded = {}
+        for dataset, response in response_dict.items():
+            if isinstance(response, tuple):
+                response_dict[dataset] = (DatasetResult.from_response(
+                    dataset, response[0], encoded=encoded), response[1])
+            elif not isinstance(response, Exception):
+                response_dict[dataset] = DatasetResult.from_response(
+                    dataset, response, encoded=encoded)
+        return response_dict
+
+    def _usage_payloads(self, initial_date: str, final_date: str) -> list:
+        """
+        Return payloads used to query usage of each dataset.
+
+        Args:
+            initial_date [str]: Initial date in the format 'yyyy-MM-dd'.
+            final_date [str]: Final date in the format 'yyyy-MM-dd'.
+        Return [list[dict]]:
+            One `/usage` payload for each registered dataset with an usage
+            `Api`.
+        """
+        payloads = []
+        for spec in self.registry.specs():
+            if spec.usage_api is None:
+                continue
+            payloads.append({
+                "InitialReferenceDate": initial_date,
+                "FinalReferenceDate": final_date,
+                "DateFormat": "yyyy-MM-dd",
+                "Api": spec.usage_api,
+                "Datasets": spec.dataset})
+        return payloads
+
+    @staticmethod
+    def _usage_result(payload: dict, response_json: dict) -> dict:
+        """
+        Build usage result from a `/usage` response.
+
+        Args:
+            payload [dict]: Payload used on the request.
+            response_json [dict]: Decoded `/usage` response.
+        Return [dict]:
+            Usage of the dataset, see `get_usage`.
+        """
+        usage_data = response_json["UsageData"]
+        return {
+            'api_type': payload["Api"],
+            'end_point': payload["Datasets"],
+            "successful_requests": usage_data["TotalSuccessfulRequests"],
+            "requests_with_error": usage_data["TotalRequestsWithError"],
+            "queries_charged": usage_data["TotalQueriesCharged"],
+            "queries_not_charged": usage_data["TotalQueriesNotCharged"],
+            "estimated_price": usage_data["TotalEstimatedPrice"]}
+
+    @staticmethod
+    def _usage_error(payload: dict, error: Exception) -> dict:
+        """Return the usage result of a dataset that failed."""
+        return {
+            'api_type': payload["Api"],
+            'end_point': payload["Datasets"],
+            'error': str(error)}
+
+    def _group_datasets(self, entity: str, datasets: list,
+                        single_request: bool = False) -> list:
+        """
+        Check datasets and group them by request.
+
+        Args:
+            entity [str]: One of `cpf`, `cnpj` or `process`.
+            datasets [list[str]]: List of all datasets to be fetched.
+        Kwargs:
+            single_request [bool]: If set true datasets are grouped by
+                end-point, else each dataset has its own group.
+        Return [list[list[str]]]:
+            Groups of datasets, each one fetched with one request.
+        """
+        self._check_datasets(entity=entity, datasets=datasets)
+        if not single_request:
+            return [[db] for db in datasets]
+
+        groups = {}
+        for db in datasets:
+            url = self._dataset_url(entity=entity, dataset=db)
+            groups.setdefault(url, []).append(db)
+        return list(groups.values())
+
+
+class BigDataCorpAPI(BigDataCorpAPIBase):
+    def __init__(self, bigdata_auth_token: str, pool_connections: int = 4,
+                 pool_maxsize: int = 10, pool_block: bool = False,
+                 keep_alive: bool = True, transport: HTTPTransport = None,
+                 cache: SQLiteResponseCache = None,
+                 memory_cache: MemoryResponseCache = None,
+                 rate_limiter: EndpointRateLimiter = None,
+                 retry_policy: RetryPolicy = None,
+                 circuit_breaker: CircuitBreakerRegistry = None,
+                 json_decoder="auto", lazy_results: bool = False,
+                 registry: DatasetRegistry = None,
+                 instrumentation: Instrumentation = None,
+                 connect_timeout: float = 10.0, read_timeout: float = 120.0,
+                 deadline: float = None, fanout_workers: int = 8,
+                 validate_documents: bool = True):
+        """
+        __init__.
+
+        Connections are pooled and kept alive across calls, the object can
+        be shared between threads. Use `close` or a `with` block to release
+        the connections.
+
+        Args:
+            bigdata_auth_token [str]: Authentication token for BigData API.
+        Kwargs:
+            pool_connections [int]: Number of host pools to keep cached.
+            pool_maxsize [int]: Maximum number of connections kept alive for
+                each host.
+            pool_block [bool]: If set true, block when all `pool_maxsize`
+                connections of a host are in use.
+            keep_alive [bool]: If set false, connections are closed after
+                each request.
+            transport [HTTPTransport]: Transport to be used on requests, if
+                passed pool arguments are ignored. It will not be closed
+                by `close`.
+            cache [SQLiteResponseCache]: Cache consulted before requests,
+                successful responses are stored on it.
+            memory_cache [MemoryResponseCache]: In-process cache consulted
+                before `cache`. When set, concurrent identical requests are
+                coalesced and all callers share the same response.
+            rate_limiter [EndpointRateLimiter]: Limit requests to each
+                end-point, calls block until a token is avaiable.
+            retry_policy [RetryPolicy]: Define which errors are retried and
+                backoff between attempts, default to `RetryPolicy()`.
+            circuit_breaker [CircuitBreakerRegistry]: Circuit breakers of
+                end-points, requests fail fast with
+                `BigDataCorpAPICircuitOpenException` when open.
+            json_decoder [str | callable]: Decoder of response bodies,
+                `auto` use orjson if installed, see `get_json_decoder`.
+            lazy_results [bool]: If set true, responses are returned as
+                `DatasetResult` objects that keep sections encoded until
+                accessed, lowering memory of results held for long.
+            registry [DatasetRegistry]: Datasets and end-points used by the
+                client, default to the class `registry`.
+            instrumentation [Instrumentation]: Hooks called with latency,
+                retries, status classes, cache lookups and bytes received
+                of requests, see `PrometheusInstrumentation`.
+            connect_timeout [float]: Seconds to wait for a connection, None
+                to wait forever.
+            read_timeout [float]: Seconds to wait for data from the server
+                on each attempt, None to wait forever.
+            deadline [float]: Default time budget in seconds of each call,
+                shared by its retries and datasets. None for no limit.
+            fanout_workers [int]: Number of concurrent requests used to
+                fetch datasets of a call with deadline, so a slow dataset
+                does not consume the budget of the others.
+            validate_documents [bool]: If set true, check digits of CPF,
+                CNPJ and CNJ process numbers are checked before requests
+                and invalid documents raise
+                `BigDataCorpAPIInvalidDocumentException` without cost.
+        """
+        if registry is not None:
+            self.registry = registry
+        self._instrumentation = instrumentation
+        self._bigdata_auth_token = bigdata_auth_token
+        self._json_decoder = get_json_decoder(json_decoder)
+        self._lazy_results = lazy_results
+        self._connect_timeout = connect_timeout
+        self._read_timeout = read_timeout
+        self._deadline = deadline
+        self.fanout_workers = fanout_workers
+        self._fanout_executor = None
+        self._fanout_lock = threading.Lock()
+        self._validate_documents = validate_documents
+        self._circuit_breaker = circuit_breaker
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._rate_limiter = rate_limiter
+        self._caches = [c for c in (memory_cache, cache) if c is not None]
+        self._single_flight = None
+        if memory_cache is not None:
+            self._single_flight = SingleFlight()
+        self._owns_transport = transport is None
+        if transport is None:
+            transport = HTTPTransport(
+                pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                pool_block=pool_block, keep_alive=keep_alive)
+        self._transport = transport
+
+    def _acquire(self, url: str, datasets: list = (),
+                 deadline: Deadline = None):
+        """
+        Wait for a rate limit token of the end-point.
+
+        Args:
+            url [str]: End-point url.
+        Kwargs:
+            datasets [list[str]]: Datasets of the request.
+            deadline [Deadline]: Deadline of the call.
         Raise:
-            BigDataCorpAPIException: Raise if errors in API occour.
+            BigDataCorpAPITimeoutException: If the token is avaiable only
+                after the deadline, the token is not taken.
         """
-        if dataset not in self.CNPJ_DATABASES:
-            msg = (
-                "dataset [{dataset}] not avaiable on bigboost for CNPJ, "
-                "avaiable datasets:\n{datasets}").format(
-                dataset=dataset, datasets=", ".join(self.CNPJ_DATABASES))
-            raise BigDataCorpAPIException(msg)
+        if self._rate_limiter is None:
+            return
+        wait = self._rate_limiter.reserve(
+            url, max_wait=None if deadline is None else deadline.remaining())
+        if wait is None:
+            raise deadline.exception(url, datasets)
+        if wait > 0:
+            time.sleep(wait)
+
+    def _get_fanout_executor(self) -> ThreadPoolExecutor:
+        """Return the executor of deadline fan-outs, creating if needed."""
+        with self._fanout_lock:
+            if self._fanout_executor is None:
+                self._fanout_executor = ThreadPoolExecutor(
+                    max_workers=self.fanout_workers)
+            return self._fanout_executor
+
+    def close(self):
+        """Release pooled connections and fan-out threads."""
+        with self._fanout_lock:
+            executor, self._fanout_executor = self._fanout_executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        if self._owns_transport:
+            self._transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _post(self, url: str, query: str, datasets: list,
+              check_minor: bool = False, deadline: Deadline = None,
+              payload_fields: dict = None) -> tuple:
+        """
+        Post a query for one or more datasets to BigData API.
 
-        if dataset in self.MARKETPLACE_DATABASES:
-            url = "https://plataforma.bigdatacorp.com.br/marketplace"
-        else:
-            url = "https://bigboost.bigdatacorp.com.br/companies"
+        Retryable errors are retried according to the retry policy, with
+        exponential backoff. Login and minor document problems are raised
+        without retry, dataset status codes are not checked unless internal
+        problems are retried by the policy.
 
+        Args:
+            url [str]: End-point url.
+            query [str]: BigData query, ex.: `doc{00000000000}`.
+            datasets [list[str]]: Datasets to be fetched on the same request.
+        Kwargs:
+            check_minor [bool]: If set true, raise if document belongs to a
+                minor.
+            deadline [Deadline]: Deadline of the call, attempts time out
+                with the time left and are not retried after it.
+            payload_fields [dict]: Fields added to the payload, ex.: page
+                of paginated datasets.
+        Return [tuple[dict, bytes]]:
+            Decoded BigData response and raw response body.
+        Raise:
+            BigDataCorpAPITimeoutException: If the deadline is reached.
+            BigDataCorpAPIException: Raise if errors in API occour.
+        """
         payload = {
-            "Datasets": dataset,
-            "q": "doc{" + cnpj + "}",
+            "Datasets": ",".join(datasets),
+            "q": query,
             "Limit": 1}
-        headers = {
-            "accept": "application/json",
-            "content-type": "application/json",
-            "AccessToken": self._bigdata_auth_token}
+        if payload_fields:
+            payload.update(payload_fields)
+        headers = self._headers()
 
+        policy = self._retry_policy
         error_msgs = []
-        for i in range(5):
+        for attempt in range(policy.max_attempts):
+            if deadline is not None and deadline.expired:
+                raise deadline.exception(url, datasets, error_msgs)
+            started = time.perf_counter()
             try:
-                response = requests.post(url, json=payload, headers=headers)
-                response.raise_for_status()
-                response_json = response.json()
-                status_data = response_json['Status']
-
-                login_entry = status_data.get("login")
-                if login_entry is not None:
-                    login_return = login_entry[0]
-                    if login_return["Code"] == -101:
-                        msg = "BigBoost user has expired"
-                        raise BigDataCorpAPILoginProblemException(msg)
-
-                # Check if the CNPJ has a match
-                status = status_data[dataset][0]
-                if status['Code'] == 0:
-                    return response.json()
-                elif status['Code'] >= -202 and status['Code'] <= -100:
-                    raise BigDataCorpAPIInvalidInputException(
-                        message="error related to input data",
-                        payload={
-                            'bigdata_status': status,
-                            'cnpj': cnpj,
-                            'dataset': dataset
-                        })
-                elif status['Code'] >= -1002 and status['Code'] <= -1000:
-                    raise BigDataCorpAPILoginProblemException(
-                        message="error related to login problem",
-                        payload={
-                            'bigdata_status': status,
-                            'cnpj': cnpj,
-                            'dataset': dataset
-                        })
-                elif status['Code'] >= -2999 and status['Code'] <= -2000:
-                    raise BigDataCorpAPIProblemAPIException(
-                        message="error related to internal problems in APIs "
-                                "or services",
-                        payload={
-                            'bigdata_status': status,
-                            'cnpj': cnpj,
-                            'dataset': dataset
-                        })
-                elif status['Code'] >= -1999 and status['Code'] <= -1200:
-                    raise BigDataCorpAPIOnDemandQueriesException(
-                        message="error related to on-demand queries",
-                        payload={
-                            'bigdata_status': status,
-                            'cnpj': cnpj,
-                            'dataset': dataset
-                        })
-                elif status['Code'] <= -3000:
-                    raise BigDataCorpAPIMonitoringAPIException(
-                        message="error related to problems in the Monitoring "
-                                "API or Asynchronous Calls",
-                        payload={
-                            'bigdata_status': status,
-                            'cnpj': cnpj,
-                            'dataset': dataset
-                        })
-                else:
-                    raise BigDataCorpAPIUnmappedErrorException(
-                        message="unmapped error",
-                        payload={
-                            'bigdata_status': status,
-                            'cnpj': cnpj,
-                            'dataset': dataset
-                        })
-
-            # Raise if document is invalid
-            except BigDataCorpAPIException as e:
+                with self._span(url, datasets, attempt):
+                    self._before_request(url)
+                    try:
+                        self._acquire(url, datasets, deadline)
+                    except BigDataCorpAPITimeoutException:
+                        self._release_request(url)
+                        raise
+                    response = self._transport.post(
+                        url, json=payload, headers=headers,
+                        timeout=self._request_timeout(deadline))
+                    response.raise_for_status()
+                    raw = response.content
+                    response_json = self._decode_response(
+                        raw=raw, datasets=datasets, check_minor=check_minor)
+                self._record_request(url, response_json=response_json)
+                self._instrument_request(
+                    url, datasets, attempt, started, raw=raw,
+                    response_json=response_json)
+                return response_json, raw
+
+            except BigDataCorpAPITimeoutException:
+                raise
+            except Exception as e:
+                self._record_request(url, exception=e)
+                self._instrument_request(
+                    url, datasets, attempt, started, exception=e)
+                self._register_error(exception=e, error_msgs=error_msgs)
+                if attempt + 1 < policy.max_attempts:
+                    delay = policy.get_delay(attempt, e)
+                    self._retry_timeout(
+                        url, datasets, delay, error_msgs, deadline)
+                    self._instrument_retry(url, attempt, e, delay)
+                    time.sleep(delay)
+
+        if deadline is not None and deadline.expired:
+            raise deadline.exception(url, datasets, error_msgs)
+        raise self._max_retry_exception(error_msgs)
+
+    def _cache_ttl(self, entity: str, dataset: str) -> float:
+        """Return the registry cache time to live of a dataset or None."""
+        if not self.registry.has(entity, dataset):
+            return None
+        return self.registry.get(entity, dataset).ttl
+
+    def _set_cached(self, entity: str, endpoint: str, document: str,
+                    dataset: str, response: dict, caches: list = None):
+        """
+        Store a response on caches with the registry time to live.
+
+        Args:
+            entity [str]: One of `cpf`, `cnpj` or `process`.
+            endpoint [str]: End-point url.
+            document [str]: Normalized document.
+            dataset [str]: Dataset name.
+            response [dict]: BigData response.
+        Kwargs:
+            caches [list]: Caches to be filled, default to all caches.
+        """
+        ttl = self._cache_ttl(entity, dataset)
+        for cache in self._caches if caches is None else caches:
+            cache.set(
+                endpoint=endpoint, document=document, dataset=dataset,
+                response=response, ttl=ttl)
+
+    def _get_cached(self, entity: str, endpoint: str, document: str,
+                    dataset: str):
+        """
+        Return a response from the first cache that has it.
+
+        Caches before the one that had the response are filled with it.
+
+        Args:
+            entity [str]: One of `cpf`, `cnpj` or `process`.
+            endpoint [str]: End-point url.
+            document [str]: Normalized document.
+            dataset [str]: Dataset name.
+        Return [dict | None]:
+            Cached response or None if no cache has it.
+        """
+        for i, cache in enumerate(self._caches):
+            cached = cache.get(
+                endpoint=endpoint, document=document, dataset=dataset)
+            if cached is not None:
+                self._set_cached(
+                    entity=entity, endpoint=endpoint, document=document,
+                    dataset=dataset, response=cached,
+                    caches=self._caches[:i])
+                if self._instrumentation is not None:
+                    self._instrumentation.on_cache(dataset=dataset, hit=True)
+                return cached
+        if self._instrumentation is not None:
+            self._instrumentation.on_cache(dataset=dataset, hit=False)
+        return None
+
+    def _post_datasets(self, entity: str, document: str, datasets: list,
+                       url: str, query: str, cache_document: str,
+                       deadline: Deadline = None) -> tuple:
+        """
+        Post a query for datasets and store successful responses on caches.
+
+        Caches are written before returning, so with single-flight a call
+        arriving after the in-flight request is released finds them cached.
+
+        Args:
+            entity [str]: One of `cpf`, `cnpj` or `process`.
+            document [str]: Document to be queried.
+            datasets [list[str]]: Datasets that share the end-point.
+            url [str]: End-point url.
+            query [str]: Query of the document.
+            cache_document [str]: Document key of the caches.
+        Kwargs:
+            deadline [Deadline]: Deadline of the call.
+        Return [tuple[dict, bytes]]:
+            Dictionary with dataset as keys and responses or exceptions as
+            values, and the raw response body.
+        """
+        response_json, raw = self._post(
+            url=url, query=query, datasets=datasets,
+            check_minor=entity == "cpf", deadline=deadline)
+        response_dict = self._check_responses(
+            entity=entity, document=document, datasets=datasets,
+            response_json=response_json, raise_errors=False)
+        for dataset, response in response_dict.items():
+            if not isinstance(response, Exception):
+                self._set_cached(
+                    entity=entity, endpoint=url, document=cache_document,
+                    dataset=dataset, response=response)
+        return response_dict, raw
+
+    def _fetch_datasets(self, entity: str, document: str, datasets: list,
+                        raise_errors: bool = True, return_raw: bool = False,
+                        deadline: Deadline = None) -> dict:
+        """
+        Fetch datasets that share an end-point using a single request.
+
+        Args:
+            entity [str]: One of `cpf`, `cnpj` or `process`.
+            document [str]: Document to be queried.
+            datasets [list[str]]: Datasets to be fetched, all of them must
+                use the same end-point.
+        Kwargs:
+            raise_errors [bool]: If set false, errors are returned as values
+                of the dictionary instead of being raised.
+            return_raw [bool]: If set true, values are tuples with the
+                response and the raw response body. Cached responses are
+                encoded again.
+            deadline [Deadline]: Deadline of the call, cached responses are
+                returned even if it is expired.
+        Return [dict]:
+            Dictionary with dataset as keys and responses as values.
+        """
+        url = self._dataset_url(entity=entity, dataset=datasets[0])
+        cache_document = self._document_key(entity, document)
+        cached_dict = {}
+        if self._caches:
+            for dataset in datasets:
+                cached = self._get_cached(
+                    entity=entity, endpoint=url, document=cache_document,
+                    dataset=dataset)
+                if cached is not None:
+                    cached_dict[dataset] = cached
+            if return_raw:
+                cached_dict = {
+                    dataset: (cached, dumps(cached))
+                    for dataset, cached in cached_dict.items()}
+            if len(cached_dict) == len(datasets):
+                return self._wrap_results(cached_dict)
+            datasets = [db for db in datasets if db not in cached_dict]
+
+        query = self._dataset_query(
+            entity=entity, dataset=datasets[0], document=document)
+        led = []
+
+        def post():
+            led.append(True)
+            return self._post_datasets(
+                entity=entity, document=document, datasets=datasets,
+                url=url, query=query, cache_document=cache_document,
+                deadline=deadline)
+
+        try:
+            if self._single_flight is None:
+                response_dict, raw = post()
+            else:
+                response_dict, raw = self._single_flight.do(
+                    (url, cache_document, tuple(datasets)), post,
+                    timeout=None if deadline is None else
+                    deadline.remaining())
+                if not led:
+                    # Responses of the leader are not shared with waiters
+                    response_dict = self._check_responses(
+                        entity=entity, document=document, datasets=datasets,
+                        response_json=self._json_decoder(raw),
+                        raise_errors=False)
+        except (BigDataCorpAPIException, TimeoutError) as e:
+            if isinstance(e, TimeoutError):
+                # Deadline reached waiting for a concurrent identical request
+                e = deadline.exception(url, datasets)
+            if raise_errors:
                 raise e
+            response_dict = {dataset: e for dataset in datasets}
+            response_dict.update(cached_dict)
+            return self._wrap_results(response_dict)
+
+        response_dict = dict(response_dict)
+        for dataset, response in response_dict.items():
+            if isinstance(response, Exception):
+                if raise_errors:
+                    raise response
+            elif return_raw:
+                response_dict[dataset] = (response, raw)
+        response_dict.update(cached_dict)
+        return self._wrap_results(response_dict)
+
+    def _fetch_group(self, entity: str, document: str, datasets: list,
+                     raise_errors: bool = True,
+                     deadline: Deadline = None) -> dict:
+        """
+        Fetch a group of datasets returning timeout errors as results.
 
-            except Exception as e:
-                error_msgs.append(str(e))
-                print("!!Error fetching BigData API:", str(e))
+        Args:
+            entity [str]: One of `cpf`, `cnpj` or `process`.
+            document [str]: Document to be queried.
+            datasets [list[str]]: Datasets that share an end-point.
+        Kwargs:
+            raise_errors [bool]: If set false, errors are returned as values
+                of the dictionary instead of being raised.
+            deadline [Deadline]: Deadline of the call.
+        Return [dict]:
+            Dictionary with dataset as keys and responses as values.
+        """
+        try:
+            return self._fetch_datasets(
+                entity=entity, document=document, datasets=datasets,
+                raise_errors=raise_errors, deadline=deadline)
+        except BigDataCorpAPITimeoutException as e:
+            return {dataset: e for dataset in datasets}
+
+    def _get_datasets(self, entity: str, document: str, datasets: list,
+                      verbosity: bool = False, single_request: bool = False,
+                      raise_errors: bool = True, deadline=None) -> dict:
+        """
+        Fetch a list of datasets for an entity.
 
-        msg = (
-            "Untreated error on API with max 5 retries:{}\n".format(
-                "\n".join(error_msgs)))
-        raise BigDataCorpAPIMaxRetryException(
-            message=msg, payload={"errors": error_msgs})
+        Without deadline groups are fetched one after the other. With a
+        deadline they are fetched concurrently by the `fanout_workers`
+        threads of the client sharing the same budget, datasets that are
+        not fetched in time have a `BigDataCorpAPITimeoutException` as
+        value even if `raise_errors` is set, so the ones fetched in time
+        are not lost.
 
+        Args:
+            entity [str]: One of `cpf`, `cnpj` or `process`.
+            document [str]: Document to be queried.
+            datasets [list[str]]: List of all datasets to be fetched.
+        Kwargs:
+            verbosity [bool]: If set true will print a msg for each request.
+            single_request [bool]: If set true datasets are grouped by
+                end-point and fetched with one request for each group.
+            raise_errors [bool]: If set false, errors are returned as values
+                of the dictionary instead of being raised.
+            deadline [Deadline | float]: Deadline or time budget in seconds
+                of the call, default to the client `deadline`.
+        Return [dict]:
+            Dictionary with dataset as keys and responses as values.
+        """
+        groups = self._group_datasets(
+            entity=entity, datasets=datasets, single_request=single_request)
+        try:
+            document = self._check_document(
+                entity=entity, document=document)
+        except BigDataCorpAPIInvalidDocumentException as e:
+            if raise_errors:
+                raise e
+            return {db: e for db in datasets}
 
-    def get_process_dataset(self, process: str, dataset: str) -> dict:
-        """Call BigData API to fecth a database for a process.
+        deadline = self._get_deadline(deadline)
+        response_dict = {}
+        if deadline is None or len(groups) == 1 or self.fanout_workers <= 1:
+            for group in groups:
+                if verbosity:
+                    print("Fetching dataset:", ", ".join(group))
+                response_dict.update(self._fetch_group(
+                    entity=entity, document=document, datasets=group,
+                    raise_errors=raise_errors, deadline=deadline))
+            return {db: response_dict[db] for db in datasets}
+
+        if verbosity:
+            for group in groups:
+                print("Fetching dataset:", ", ".join(group))
+        results = iter_bulk(
+            lambda group: self._fetch_group(
+                entity=entity, document=document, datasets=group,
+                raise_errors=raise_errors, deadline=deadline),
+            groups, max_workers=min(self.fanout_workers, len(groups)),
+            executor=self._get_fanout_executor())
+        error = None
+        for group, result in results:
+            if isinstance(result, Exception):
+                error = error or result
+                continue
+            response_dict.update(result)
+        if error is not None:
+            raise error
+        return {db: response_dict[db] for db in datasets}
+
+    def get_cpf_dataset(self, cpf: str, dataset: str,
+                        return_raw: bool = False, deadline=None) -> dict:
+        """
+        Call BigData API to fecth a database for a CPF.
 
-        Retry for 5 times sleeping 1 second when errors are raised.
+        Transient errors are retried with exponential backoff according
+        to the client `RetryPolicy`.
 
         Args:
-            process [str]: process number.
+            cpf [str]: Person's CPF.
             dataset [str]: Dataset on BigData that user should be fetched.
+        Kwargs:
+            return_raw [bool]: If set true, return a tuple with the
+                information and the raw response body, avoiding encode it
+                again to persist.
+            deadline [Deadline | float]: Deadline or time budget in seconds
+                of the call, default to the client `deadline`.
         Return [dict]:
             Information avaiable on BigData.
         Raise:
+            BigDataCorpAPIInvalidDocumentException: If document check
+                digits are invalid.
+            BigDataCorpAPITimeoutException: If the deadline is reached.
             BigDataCorpAPIException: Raise if errors in API occour.
         """
-        if dataset not in self.PROCESS_DATABASES:
-            msg = (
-                "dataset [{dataset}] not avaiable on bigboost for process, "
-                "avaiable datasets:\n{datasets}").format(
-                dataset=dataset, datasets=", ".join(self.PROCESS_DATABASES))
-            raise BigDataCorpAPIException(msg)
+        self._check_datasets(entity="cpf", datasets=[dataset])
+        cpf = self._check_document(entity="cpf", document=cpf)
+        return self._fetch_datasets(
+            entity="cpf", document=cpf, datasets=[dataset],
+            return_raw=return_raw,
+            deadline=self._get_deadline(deadline))[dataset]
+
+    def get_cnpj_dataset(self, cnpj: str, dataset: str,
+                        return_raw: bool = False, deadline=None) -> dict:
+        """
+        Call BigData API to fecth a database for a CNPJ.
 
-        url = "https://plataforma.bigdatacorp.com.br/processos"
+        Transient errors are retried with exponential backoff according
+        to the client `RetryPolicy`.
 
-        payload = {
-            "Datasets": dataset,
-            "q": "processnumber{" + process + "}",
-            "Limit": 1}
-        headers = {
-            "accept": "application/json",
-            "content-type": "application/json",
-            "AccessToken": self._bigdata_auth_token}
-
-        error_msgs = []
-        for i in range(5):
-            try:
-                response = requests.post(url, json=payload, headers=headers)
-                response.raise_for_status()
-                response_json = response.json()
-                status_data = response_json['Status']
-                result_data = response_json.\
-                    get('Result', [{}])[0].\
-                    get('BasicData', {})
-
-                login_entry = status_data.get("login")
-                if login_entry is not None:
-                    login_return = login_entry[0]
-                    if login_return["Code"] == -101:
-                        msg = "BigBoost user has expired"
-                        raise BigDataCorpAPILoginProblemException(msg)
-
-                # Check if the process has a match
-                status = status_data[dataset][0]
-                if status['Code'] == 0 and result_data:
-                    return response.json()
-                elif not result_data:
-                    raise BigDataCorpAPIEmptyEnrichedProcessException(
-                        message="no process data returned",
-                        payload={
-                            'bigdata_status': status,
-                            'process_number': process,
-                            'dataset': dataset
-                        })
-                elif status['Code'] >= -202 and status['Code'] <= -100:
-                    raise BigDataCorpAPIInvalidInputException(
-                        message="error related to input data",
-                        payload={
-                            'bigdata_status': status,
-                            'process_number': process,
-                            'dataset': dataset
-                        })
-                elif status['Code'] >= -1002 and status['Code'] <= -1000:
-                    raise BigDataCorpAPILoginProblemException(
-                        message="error related to login problem",
-                        payload={
-                            'bigdata_status': status,
-                            'process_number': process,
-                            'dataset': dataset
-                        })
-                elif status['Code'] >= -2999 and status['Code'] <= -2000:
-                    raise BigDataCorpAPIProblemAPIException(
-                        message="error related to internal problems in APIs "
-                                "or services",
-                        payload={
-                            'bigdata_status': status,
-                            'process_number': process,
-                            'dataset': dataset
-                        })
-                elif status['Code'] >= -1999 and status['Code'] <= -1200:
-                    raise BigDataCorpAPIOnDemandQueriesException(
-                        message="error related to on-demand queries",
-                        payload={
-                            'bigdata_status': status,
-                            'process_number': process,
-                            'dataset': dataset
-                        })
-                elif status['Code'] <= -3000:
-                    raise BigDataCorpAPIMonitoringAPIException(
-                        message="error related to problems in the Monitoring "
-                                "API or Asynchronous Calls",
-                        payload={
-                            'bigdata_status': status,
-                            'process_number': process,
-                            'dataset': dataset
-                        })
-                else:
-                    raise BigDataCorpAPIUnmappedErrorException(
-                        message="unmapped error",
-                        payload={
-                            'bigdata_status': status,
-                            'process_number': process,
-                            'dataset': dataset
-                        })
-
-            # Raise if document is invalid
-            except BigDataCorpAPIException as e:
-                raise e
+        Args:
+            cnpj [str]: Company CNPJ.
+            dataset [str]: Dataset on BigData that user should be fetched.
+        Kwargs:
+            return_raw [bool]: If set true, return a tuple with the
+                information and the raw response body, avoiding encode it
+                again to persist.
+            deadline [Deadline | float]: Deadline or time budget in seconds
+                of the call, default to the client `deadline`.
+        Return [dict]:
+            Information avaiable on BigData.
+        Raise:
+            BigDataCorpAPIInvalidDocumentException: If document check
+                digits are invalid.
+            BigDataCorpAPITimeoutException: If the deadline is reached.
+            BigDataCorpAPIException: Raise if errors in API occour.
+        """
+        self._check_datasets(entity="cnpj", datasets=[dataset])
+        cnpj = self._check_document(entity="cnpj", document=cnpj)
+        return self._fetch_datasets(
+            entity="cnpj", document=cnpj, datasets=[dataset],
+            return_raw=return_raw,
+            deadline=self._get_deadline(deadline))[dataset]
+
+    def get_process_dataset(self, process: str, dataset: str,
+                            return_raw: bool = False, deadline=None) -> dict:
+        """Call BigData API to fecth a database for a process.
 
-            except Exception as e:
-                error_msgs.append(str(e))
-                print("!!Error fetching BigData API:", str(e))
+        Transient errors are retried with exponential backoff according
+        to the client `RetryPolicy`.
 
-        msg = (
-            "Untreated error on API with max 5 retries:{}\n".format(
-                "\n".join(error_msgs)))
-        raise BigDataCorpAPIMaxRetryException(
-            message=msg, payload={"errors": error_msgs})
+        Args:
+            process [str]: process number.
+            dataset [str]: Dataset on BigData that user should be fetched.
+        Kwargs:
+            return_raw [bool]: If set true, return a tuple with the
+                information and the raw response body, avoiding encode it
+                again to persist.
+            deadline [Deadline | float]: Deadline or time budget in seconds
+                of the call, default to the client `deadline`.
+        Return [dict]:
+            Information avaiable on BigData.
+        Raise:
+            BigDataCorpAPIInvalidDocumentException: If document check
+                digits are invalid.
+            BigDataCorpAPITimeoutException: If the deadline is reached.
+            BigDataCorpAPIException: Raise if errors in API occour.
+        """
+        self._check_datasets(entity="process", datasets=[dataset])
+        process = self._check_document(
+            entity="process", document=process)
+        return self._fetch_datasets(
+            entity="process", document=process, datasets=[dataset],
+            return_raw=return_raw,
+            deadline=self._get_deadline(deadline))[dataset]
 
     def get_cpf_datasets(self, cpf: str, datasets: list,
-                         verbosity: bool = False) -> dict:
+                         verbosity: bool = False,
+                         single_request: bool = False,
+                         raise_errors: bool = True, deadline=None) -> dict:
         """
         Fetch a list of datasets and return a dictionary with all info.
 
@@ -567,20 +1341,29 @@ class BigDataCorpAPI:
         Kwargs:
             verbosity [bool]: If set true will print a msg for each dataset
                 fetch.
+            single_request [bool]: If set true all datasets are fetched
+                with a single request, each dataset response keeps only its
+                own `Status` entry.
+            raise_errors [bool]: If set false, dataset errors are returned
+                as exception objects on the dictionary instead of raised.
+            deadline [Deadline | float]: Deadline or time budget in seconds
+                shared by all datasets, default to the client `deadline`.
+                Datasets not fetched in time have a
+                `BigDataCorpAPITimeoutException` as value.
         Returns [dict]:
             Return a dictionary with all dataset information, with keys
             corresponding to dataset name.
         """
-        response_dict = {}
-        for db in datasets:
-            if verbosity:
-                print("Fetching dataset:", db)
-            response_dict[db] = self.get_cpf_dataset(
-                cpf=cpf, dataset=db)
-        return response_dict
+        return self._get_datasets(
+            entity="cpf", document=cpf, datasets=datasets,
+            verbosity=verbosity, single_request=single_request,
+            raise_errors=raise_errors, deadline=deadline)
 
     def get_cnpj_datasets(self, cnpj: str, datasets: list,
-                          verbosity: bool = False) -> dict:
+                          verbosity: bool = False,
+                          single_request: bool = False,
+                          raise_errors: bool = True,
+                          deadline=None) -> dict:
         """
         Fetch a list of datasets and return a dictionary with all info.
 
@@ -590,22 +1373,29 @@ class BigDataCorpAPI:
         Kwargs:
             verbosity [bool]: If set true will print a msg for each dataset
                 fetch.
+            single_request [bool]: If set true datasets are grouped by
+                end-point (companies and marketplace) and fetched with one
+                request for each group.
+            raise_errors [bool]: If set false, dataset errors are returned
+                as exception objects on the dictionary instead of raised.
+            deadline [Deadline | float]: Deadline or time budget in seconds
+                shared by all datasets, default to the client `deadline`.
+                Datasets not fetched in time have a
+                `BigDataCorpAPITimeoutException` as value.
         Returns [dict]:
             Return a dictionary with all dataset information, with keys
             corresponding to dataset name.
         """
-        cnpj = cnpj.replace(".", "").replace("/", "").replace("-", "")
-        response_dict = {}
-        for db in datasets:
-            if verbosity:
-                print("Fetching dataset:", db)
-            response_dict[db] = self.get_cnpj_dataset(
-                cnpj=cnpj, dataset=db)
-        return response_dict
-
+        return self._get_datasets(
+            entity="cnpj", document=cnpj, datasets=datasets,
+            verbosity=verbosity, single_request=single_request,
+            raise_errors=raise_errors, deadline=deadline)
 
     def get_process_datasets(self, process: str, datasets: list,
-                             verbosity: bool = False) -> dict:
+                             verbosity: bool = False,
+                             single_request: bool = False,
+                             raise_errors: bool = True,
+                             deadline=None) -> dict:
         """Fetch a list of datasets and return a dictionary with all info.
 
         Args:
@@ -614,29 +1404,649 @@ class BigDataCorpAPI:
         Kwargs:
             verbosity [bool]: If set true will print a msg for each dataset
                 fetch.
+            single_request [bool]: If set true all datasets are fetched
+                with a single request.
+            raise_errors [bool]: If set false, dataset errors are returned
+                as exception objects on the dictionary instead of raised.
+            deadline [Deadline | float]: Deadline or time budget in seconds
+                shared by all datasets, default to the client `deadline`.
+                Datasets not fetched in time have a
+                `BigDataCorpAPITimeoutException` as value.
         Returns [dict]:
             Return a dictionary with all dataset information, with keys
             corresponding to dataset name.
         """
-        process = process.replace(".", "").replace("/", "").replace("-", "")
-        response_dict = {}
-        for db in datasets:
-            if verbosity:
-                print("Fetching dataset:", db)
-            response_dict[db] = self.get_process_dataset(
-                process=process, dataset=db)
-        return response_dict
+        return self._get_datasets(
+            entity="process", document=process, datasets=datasets,
+            verbosity=verbosity, single_request=single_request,
+            raise_errors=raise_errors, deadline=deadline)
+
+    def _bulk_get_datasets(self, entity: str, documents, datasets: list,
+                           max_workers: int = 8, max_pending: int = None,
+                           single_request: bool = False, dedup=True):
+        """
+        Fetch datasets for many documents using a bounded worker pool.
+
+        Documents with the same canonical key (see `_document_key`) are
+        queried once, results are yielded for every input document with
+        its original spelling.
 
+        Args:
+            entity [str]: One of `cpf`, `cnpj` or `process`.
+            documents [iterable[str]]: Documents to be queried, consumed
+                lazily.
+            datasets [list[str]]: Datasets to be fetched for each document.
+        Kwargs:
+            max_workers [int]: Number of concurrent requests.
+            max_pending [int]: Maximum number of requests submitted and not
+                yet yielded, default to `2 * max_workers`.
+            single_request [bool]: If set true datasets are grouped by
+                end-point and fetched with one request for each group.
+            dedup [bool | Deduplicator]: If set true repeated documents are
+                not queried again, a `Deduplicator` can be passed to use a
+                `BloomFilter` or to read its stats.
+        Return [generator]:
+            Yield `(document, dataset, result)` as results complete, result
+            is the exception object if an error occoured.
+        """
+        groups = self._group_datasets(
+            entity=entity, datasets=datasets, single_request=single_request)
+        if dedup is True:
+            dedup = Deduplicator()
+        elif dedup is False:
+            dedup = None
+
+        def items():
+            for document in documents:
+                document_key = self._document_key(entity, document)
+                for group in groups:
+                    key = "{}|{}".format(document_key, ",".join(group))
+                    duplicate = dedup is not None and dedup.check(key)
+                    yield document, group, key, duplicate
+
+        def fetch(item):
+            document, group, key, duplicate = item
+            if duplicate:
+                result = dedup.get(key)
+                if result is not None:
+                    return result
+            result = self._fetch_datasets(
+                entity=entity, datasets=group, raise_errors=False,
+                document=self._check_document(
+                    entity=entity, document=document),
+                deadline=self._get_deadline())
+            if dedup is not None and not any(
+                    isinstance(r, Exception) for r in result.values()):
+                dedup.put(key, result)
+            return result
+
+        results = iter_bulk(
+            fetch, items(), max_workers=max_workers, max_pending=max_pending,
+            key=None if dedup is None else lambda item: item[2])
+        for (document, group, _, _), result in results:
+            for dataset in group:
+                if isinstance(result, Exception):
+                    yield document, dataset, result
+                else:
+                    yield document, dataset, result[dataset]
 
-    def get_usage(self, initial_date: str, final_date: str):
+    def bulk_get_cpf_datasets(self, cpfs, datasets: list,
+                              max_workers: int = 8, max_pending: int = None,
+                              single_request: bool = False,
+                              dedup=True):
+        """
+        Fetch a list of datasets for many CPFs concurrently.
+
+        Errors of one document do not stop the batch, they are yielded as
+        results.
+
+        Args:
+            cpfs [iterable[str]]: People's CPF, consumed lazily.
+            datasets [list[str]]: List of all datasets to be fetched.
+        Kwargs:
+            max_workers [int]: Number of concurrent requests.
+            max_pending [int]: Maximum number of requests submitted and not
+                yet yielded, default to `2 * max_workers`.
+            single_request [bool]: If set true all datasets of a CPF are
+                fetched with a single request.
+            dedup [bool | Deduplicator]: If set true repeated CPFs (with
+                any punctuation) are fetched once and their results yielded
+                for every occurrence.
+        Return [generator]:
+            Yield `(cpf, dataset, result)` as results complete, result is
+            the exception object if an error occoured.
+        """
+        return self._bulk_get_datasets(
+            entity="cpf", documents=cpfs, datasets=datasets,
+            max_workers=max_workers, max_pending=max_pending,
+            single_request=single_request, dedup=dedup)
+
+    def bulk_get_cnpj_datasets(self, cnpjs, datasets: list,
+                               max_workers: int = 8, max_pending: int = None,
+                               single_request: bool = False,
+                               dedup=True):
+        """
+        Fetch a list of datasets for many CNPJs concurrently.
+
+        Errors of one document do not stop the batch, they are yielded as
+        results.
+
+        Args:
+            cnpjs [iterable[str]]: Companies CNPJ, consumed lazily.
+            datasets [list[str]]: List of all datasets to be fetched.
+        Kwargs:
+            max_workers [int]: Number of concurrent requests.
+            max_pending [int]: Maximum number of requests submitted and not
+                yet yielded, default to `2 * max_workers`.
+            single_request [bool]: If set true datasets of a CNPJ are
+                grouped by end-point and fetched with one request for each
+                group.
+            dedup [bool | Deduplicator]: If set true repeated CNPJs (with
+                any punctuation) are fetched once and their results yielded
+                for every occurrence.
+        Return [generator]:
+            Yield `(cnpj, dataset, result)` as results complete, result is
+            the exception object if an error occoured.
+        """
+        return self._bulk_get_datasets(
+            entity="cnpj", documents=cnpjs, datasets=datasets,
+            max_workers=max_workers, max_pending=max_pending,
+            single_request=single_request, dedup=dedup)
+
+    def bulk_get_process_datasets(self, processes, datasets: list,
+                                  max_workers: int = 8,
+                                  max_pending: int = None,
+                                  single_request: bool = False,
+                                  dedup=True):
+        """
+        Fetch a list of datasets for many processes concurrently.
+
+        Errors of one process do not stop the batch, they are yielded as
+        results.
+
+        Args:
+            processes [iterable[str]]: Process numbers, consumed lazily.
+            datasets [list[str]]: List of all datasets to be fetched.
+        Kwargs:
+            max_workers [int]: Number of concurrent requests.
+            max_pending [int]: Maximum number of requests submitted and not
+                yet yielded, default to `2 * max_workers`.
+            single_request [bool]: If set true all datasets of a process are
+                fetched with a single request.
+            dedup [bool | Deduplicator]: If set true repeated processes
+                (with any punctuation) are fetched once and their results
+                yielded for every occurrence.
+        Return [generator]:
+            Yield `(process, dataset, result)` as results complete, result
+            is the exception object if an error occoured.
+        """
+        return self._bulk_get_datasets(
+            entity="process", documents=processes, datasets=datasets,
+            max_workers=max_workers, max_pending=max_pending,
+            single_request=single_request, dedup=dedup)
+
+    def _post_stream(self, url: str, query: str, dataset: str,
+                     deadline: Deadline = None):
+        """
+        Post a query and return the response without reading its body.
+
+        Attempts are retried according to the retry policy until a
+        response with a successful HTTP status is received, errors while
+        the body is read are not retried. Failed attempts are recorded and
+        instrumented here, the caller records the successful one once its
+        `Status` is parsed.
+
+        Args:
+            url [str]: End-point url.
+            query [str]: BigData query, ex.: `doc{00000000000}`.
+            dataset [str]: Dataset to be fetched.
+        Kwargs:
+            deadline [Deadline]: Deadline of the call.
+        Return [tuple[requests.Response, int, float]]:
+            Streamed response, it must be closed by the caller, the attempt
+            number and its `time.perf_counter` start.
+        Raise:
+            BigDataCorpAPITimeoutException: If the deadline is reached.
+            BigDataCorpAPIException: Raise if errors in API occour.
+        """
+        payload = {"Datasets": dataset, "q": query, "Limit": 1}
+        policy = self._retry_policy
+        error_msgs = []
+        for attempt in range(policy.max_attempts):
+            if deadline is not None and deadline.expired:
+                raise deadline.exception(url, [dataset], error_msgs)
+            started = time.perf_counter()
+            try:
+                with self._span(url, [dataset], attempt):
+                    self._before_request(url)
+                    try:
+                        self._acquire(url, [dataset], deadline)
+                    except BigDataCorpAPITimeoutException:
+                        self._release_request(url)
+                        raise
+                    response = self._transport.post(
+                        url, json=payload, headers=self._headers(),
+                        timeout=self._request_timeout(deadline),
+                        stream=True)
+                    try:
+                        response.raise_for_status()
+                    except Exception:
+                        response.close()
+                        raise
+                return response, attempt, started
+            except BigDataCorpAPITimeoutException:
+                raise
+            except Exception as e:
+                self._record_request(url, exception=e)
+                self._instrument_request(
+                    url, [dataset], attempt, started, exception=e)
+                self._register_error(exception=e, error_msgs=error_msgs)
+                if attempt + 1 < policy.max_attempts:
+                    delay = policy.get_delay(attempt, e)
+                    self._retry_timeout(
+                        url, [dataset], delay, error_msgs, deadline)
+                    self._instrument_retry(url, attempt, e, delay)
+                    time.sleep(delay)
+
+        if deadline is not None and deadline.expired:
+            raise deadline.exception(url, [dataset], error_msgs)
+        raise self._max_retry_exception(error_msgs)
+
+    def _check_stream_status(self, entity: str, document: str,
+                             dataset: str, status_data: dict):
+        """Check the `Status` block of a streamed response."""
+        if entity == "cpf":
+            check_minor_status(status_data)
+        check_login_status(status_data)
+        status = status_data.get(dataset)
+        if not status:
+            raise BigDataCorpAPIException(
+                "response without status of dataset [{}]".format(dataset))
+        check_dataset_status(status=status[0], payload={
+            self._ENTITY_PAYLOAD_KEYS.get(entity, entity): document,
+            'dataset': dataset})
+
+    def _stream_dataset(self, entity: str, document: str, dataset: str,
+                        list_path: tuple = None, chunk_size: int = 65536,
+                        use_ijson: bool = None, deadline=None):
+        """
+        Fetch a list dataset yielding its records as the body is read.
+
+        The `Status` block is checked as soon as it is parsed. BigData
+        sends it after `Result`, so dataset errors are usually raised
+        after the records of the response, which are empty on errors.
+
+        Args:
+            entity [str]: One of `cpf` or `cnpj`.
+            document [str]: Document to be queried.
+            dataset [str]: Dataset to be fetched.
+        Kwargs:
+            list_path [tuple[str]]: Keys from each `Result` entry to the
+                list of records, default to `STREAM_LISTS`.
+            chunk_size [int]: Bytes read from the connection at a time.
+            use_ijson [bool]: Parse with ijson, default to use it if
+                installed, see `parse_stream`.
+            deadline [Deadline | float]: Time budget in seconds to receive
+                the response headers, the body is bounded by
+                `read_timeout` between chunks.
+        Return [generator]:
+            Yield records as dictionaries, the request is sent on the
+            first iteration.
+        Raise:
+            BigDataCorpAPIException: If API returns an error.
+        """
+        self._check_datasets(entity=entity, datasets=[dataset])
+        if list_path is None:
+            list_path = get_stream_list(dataset)
+        document = self._check_document(entity=entity, document=document)
+        url = self._dataset_url(entity=entity, dataset=dataset)
+        query = self._dataset_query(
+            entity=entity, dataset=dataset, document=document)
+        response, attempt, started = self._post_stream(
+            url=url, query=query, dataset=dataset,
+            deadline=self._get_deadline(deadline))
+        received = [0]
+
+        def iter_chunks():
+            for chunk in iter_body(response, chunk_size=chunk_size):
+                received[0] += len(chunk)
+                yield chunk
+
+        response_json = None
+        error = None
+        try:
+            for kind, value in parse_stream(
+                    iter_chunks(), list_path=list_path,
+                    use_ijson=use_ijson):
+                if kind == "record":
+                    yield value
+                else:
+                    response_json = {"Status": value}
+                    self._record_request(url, response_json=response_json)
+                    self._check_stream_status(
+                        entity=entity, document=document, dataset=dataset,
+                        status_data=value)
+            if response_json is None:
+                raise BigDataCorpAPIException(
+                    "response without `Status` for dataset [{}]".format(
+                        dataset))
+        except Exception as e:
+            if response_json is None:
+                error = e
+                self._record_request(url, exception=e)
+            raise
+        finally:
+            response.close()
+            if response_json is None and error is None:
+                # Closed before the status was read, outcome is unknown
+                self._release_request(url)
+            self._instrument_request(
+                url, [dataset], attempt, started,
+                response_json=response_json, exception=error,
+                bytes_received=received[0])
+
+    def stream_cpf_dataset(self, cpf: str, dataset: str,
+                           list_path: tuple = None, chunk_size: int = 65536,
+                           use_ijson: bool = None, deadline=None):
+        """
+        Fetch a list dataset of a CPF yielding one record at a time.
+
+        The response body is read incrementally and only one record is
+        decoded at a time, so memory is bounded by a record instead of
+        the whole response. Used for large lists as `processes` and
+        `related_people`.
+
+        Args:
+            cpf [str]: People's CPF.
+            dataset [str]: Dataset to be fetched, see `STREAM_LISTS`.
+        Kwargs:
+            list_path [tuple[str]]: Keys from each `Result` entry to the
+                list of records, ex.: `("Processes", "Lawsuits")`.
+            chunk_size [int]: Bytes read from the connection at a time.
+            use_ijson [bool]: Parse with ijson, default to use it if
+                installed.
+            deadline [Deadline | float]: Time budget in seconds to receive
+                the response headers.
+        Return [generator]:
+            Yield records as dictionaries.
+        Raise:
+            BigDataCorpAPIException: If API returns an error.
+        """
+        return self._stream_dataset(
+            entity="cpf", document=cpf, dataset=dataset,
+            list_path=list_path, chunk_size=chunk_size,
+            use_ijson=use_ijson, deadline=deadline)
+
+    def stream_cnpj_dataset(self, cnpj: str, dataset: str,
+                            list_path: tuple = None,
+                            chunk_size: int = 65536, use_ijson: bool = None,
+                            deadline=None):
+        """
+        Fetch a list dataset of a CNPJ yielding one record at a time.
+
+        The response body is read incrementally and only one record is
+        decoded at a time, so memory is bounded by a record instead of
+        the whole response. Used for large lists as `processes`,
+        `owners_lawsuits` and `economic_group_full_extended`.
+
+        Args:
+            cnpj [str]: Company's CNPJ.
+            dataset [str]: Dataset to be fetched, see `STREAM_LISTS`.
+        Kwargs:
+            list_path [tuple[str]]: Keys from each `Result` entry to the
+                list of records, ex.: `("Processes", "Lawsuits")`.
+            chunk_size [int]: Bytes read from the connection at a time.
+            use_ijson [bool]: Parse with ijson, default to use it if
+                installed.
+            deadline [Deadline | float]: Time budget in seconds to receive
+                the response headers.
+        Return [generator]:
+            Yield records as dictionaries.
+        Raise:
+            BigDataCorpAPIException: If API returns an error.
+        """
+        return self._stream_dataset(
+            entity="cnpj", document=cnpj, dataset=dataset,
+            list_path=list_path, chunk_size=chunk_size,
+            use_ijson=use_ijson, deadline=deadline)
+
+    def _fetch_page(self, entity: str, document: str, dataset: str,
+                    page: int, page_size: int, list_path: tuple,
+                    deadline=None) -> list:
+        """
+        Fetch one page of the records of a list dataset.
+
+        Args:
+            entity [str]: One of `cpf` or `cnpj`.
+            document [str]: Normalized document.
+            dataset [str]: Dataset to be fetched.
+            page [int]: Page number, starting at `FIRST_PAGE`.
+            page_size [int]: Number of records of each page.
+            list_path [tuple[str]]: Keys from each `Result` entry to the
+                list of records.
+        Kwargs:
+            deadline [Deadline | float]: Time budget of the page request.
+        Return [list]:
+            Records of the page.
+        Raise:
+            BigDataCorpAPIException: If API returns an error.
+        """
+        url = self._dataset_url(entity=entity, dataset=dataset)
+        query = self._dataset_query(
+            entity=entity, dataset=dataset, document=document)
+        response_json, _ = self._post(
+            url=url, query=query, datasets=[dataset],
+            check_minor=entity == "cpf",
+            deadline=self._get_deadline(deadline),
+            payload_fields={
+                self.PAGE_FIELD: page, self.PAGE_SIZE_FIELD: page_size})
+        self._check_responses(
+            entity=entity, document=document, datasets=[dataset],
+            response_json=response_json)
+        records = []
+        for result in response_json.get("Result") or []:
+            for key in list_path:
+                result = (result or {}).get(key)
+            records.extend(result or [])
+        return records
+
+    def _iter_dataset_pages(self, entity: str, document: str, dataset: str,
+                            page_size: int = 100, prefetch: bool = True,
+                            max_pages: int = 100, list_path: tuple = None,
+                            deadline=None):
+        """
+        Fetch pages of a list dataset lazily.
+
+        The first page is fetched on the first iteration. While a page is
+        consumed the next one is fetched on a background thread if
+        `prefetch` is set. Pages end on the first page with less than
+        `page_size` records, or on a page with the same records as the
+        previous one, returned by servers that ignore the page fields.
+
+        Args:
+            entity [str]: One of `cpf` or `cnpj`.
+            document [str]: Document to be queried.
+            dataset [str]: Dataset to be fetched, see `STREAM_LISTS`.
+        Kwargs:
+            page_size [int]: Number of records of each page.
+            prefetch [bool]: If set true, fetch the next page while the
+                current one is consumed. At most one page that is not
+                consumed is fetched if iteration stops early.
+            max_pages [int]: Maximum number of pages, None for no limit.
+            list_path [tuple[str]]: Keys from each `Result` entry to the
+                list of records, default to `STREAM_LISTS`.
+            deadline [Deadline | float]: Time budget of each page request.
+        Return [generator]:
+            Yield lists of records.
+        Raise:
+            BigDataCorpAPIException: If API returns an error.
+        """
+        if page_size < 1:
+            raise BigDataCorpAPIException("page_size must be at least 1")
+        self._check_datasets(entity=entity, datasets=[dataset])
+        if list_path is None:
+            list_path = get_stream_list(dataset)
+        document = self._check_document(entity=entity, document=document)
+
+        def fetch(page):
+            return self._fetch_page(
+                entity=entity, document=document, dataset=dataset,
+                page=page, page_size=page_size, list_path=list_path,
+                deadline=deadline)
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        future = None
+        try:
+            page = self.FIRST_PAGE
+            records = fetch(page)
+            n_pages = 1
+            previous = None
+            while True:
+                if records and records == previous:
+                    logger.warning(
+                        "page %s of dataset [%s] repeats the previous one, "
+                        "paging is not supported", page, dataset)
+                    return
+                last = len(records) < page_size or (
+                    max_pages is not None and n_pages >= max_pages)
+                if not last and executor is not None:
+                    future = executor.submit(fetch, page + 1)
+                if records or n_pages == 1:
+                    yield records
+                if last:
+                    return
+                previous = records
+                page += 1
+                n_pages += 1
+                if future is not None:
+                    records, future = future.result(), None
+                else:
+                    records = fetch(page)
+        finally:
+            if future is not None:
+                future.cancel()
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    def iter_cpf_dataset(self, cpf: str, dataset: str,
+                         page_size: int = 100, prefetch: bool = True,
+                         max_pages: int = 100, list_path: tuple = None,
+                         deadline=None):
+        """
+        Iterate over all records of a list dataset of a CPF, page by page.
+
+        Pages are fetched lazily, stopping the iteration does not fetch
+        the pages that were not reached. With `prefetch` the next page is
+        fetched while the current one is consumed.
+
+        Args:
+            cpf [str]: People's CPF.
+            dataset [str]: List dataset, ex.: `processes` or
+                `related_people_phones`, see `STREAM_LISTS`.
+        Kwargs:
+            page_size [int]: Number of records of each page request.
+            prefetch [bool]: If set true, fetch the next page on a
+                background thread.
+            max_pages [int]: Maximum number of pages, None for no limit.
+            list_path [tuple[str]]: Keys from each `Result` entry to the
+                list of records, ex.: `("Processes", "Lawsuits")`.
+            deadline [Deadline | float]: Time budget of each page request.
+        Return [generator]:
+            Yield records as dictionaries.
+        Raise:
+            BigDataCorpAPIException: If API returns an error.
+        """
+        pages = self._iter_dataset_pages(
+            entity="cpf", document=cpf, dataset=dataset,
+            page_size=page_size, prefetch=prefetch, max_pages=max_pages,
+            list_path=list_path, deadline=deadline)
+        try:
+            for records in pages:
+                yield from records
+        finally:
+            pages.close()
+
+    def iter_cnpj_dataset(self, cnpj: str, dataset: str,
+                          page_size: int = 100, prefetch: bool = True,
+                          max_pages: int = 100, list_path: tuple = None,
+                          deadline=None):
+        """
+        Iterate over all records of a list dataset of a CNPJ, page by page.
+
+        Pages are fetched lazily, stopping the iteration does not fetch
+        the pages that were not reached. With `prefetch` the next page is
+        fetched while the current one is consumed.
+
+        Args:
+            cnpj [str]: Company's CNPJ.
+            dataset [str]: List dataset, ex.: `processes` or
+                `related_people_phones`, see `STREAM_LISTS`.
+        Kwargs:
+            page_size [int]: Number of records of each page request.
+            prefetch [bool]: If set true, fetch the next page on a
+                background thread.
+            max_pages [int]: Maximum number of pages, None for no limit.
+            list_path [tuple[str]]: Keys from each `Result` entry to the
+                list of records, ex.: `("Processes", "Lawsuits")`.
+            deadline [Deadline | float]: Time budget of each page request.
+        Return [generator]:
+            Yield records as dictionaries.
+        Raise:
+            BigDataCorpAPIException: If API returns an error.
+        """
+        pages = self._iter_dataset_pages(
+            entity="cnpj", document=cnpj, dataset=dataset,
+            page_size=page_size, prefetch=prefetch, max_pages=max_pages,
+            list_path=list_path, deadline=deadline)
+        try:
+            for records in pages:
+                yield from records
+        finally:
+            pages.close()
+
+    def _get_dataset_usage(self, payload: dict) -> dict:
+        """
+        Fetch usage of one dataset.
+
+        Args:
+            payload [dict]: `/usage` payload, see `_usage_payloads`.
+        Return [dict]:
+            Usage of the dataset, see `get_usage`.
+        Raise:
+            BigDataCorpAPIException: If API returns an error.
+        """
+        url = self.registry.get_endpoint("usage")
+        self._acquire(url)
+        response = self._transport.post(
+            url, headers=self._headers(), json=payload,
+            timeout=self._request_timeout())
+        if response.status_code == 500:
+            response.raise_for_status()
+
+        response_json = self._json_decoder(response.content)
+        if response.status_code != 200:
+            raise BigDataCorpAPIException(
+                response_json['Status']['Message'])
+        return self._usage_result(
+            payload=payload, response_json=response_json)
+
+    def get_usage(self, initial_date: str, final_date: str,
+                  max_workers: int = 8, usage_store: UsageStore = None):
         """
         Retrieves usage data for a specified date range.
 
+        Usage of each dataset is fetched concurrently. If `usage_store` is
+        passed usage is fetched day by day and closed days (before today)
+        are stored, next calls only query days that are not stored.
+
         Parameters:
         - initial_date (str): The initial date of the range in the format
             'yyyy-MM-dd'.
         - final_date (str): The final date of the range in the format
             'yyyy-MM-dd'.
+        - max_workers (int): Number of concurrent requests.
+        - usage_store (UsageStore): Local storage of per-day usage, if
+            passed usage is fetched incrementally.
 
         Returns:
         - results (list): A list of dictionaries containing the usage data for
@@ -653,82 +2063,75 @@ class BigDataCorpAPI:
                 not charged.
             - 'estimated_price' (float): The total estimated price
                 for the usage.
+          Datasets that could not be fetched have only 'api_type',
+          'end_point' and 'error' (str) keys.
 
         """
-        results = []
-        url = "https://plataforma.bigdatacorp.com.br/usage"
-
-        headers = {
-            "accept": "application/json",
-            "content-type": "application/json",
-            "AccessToken": self._bigdata_auth_token,
-        }
-
-        payload = {
-            "InitialReferenceDate": initial_date,
-            "FinalReferenceDate": final_date,
-            "DateFormat": "yyyy-MM-dd"
-        }
-
-        for api in self.CPF_DATABASES:
-            payload["Api"] = "people"
-            payload["Datasets"] = api
-            try:
-                response = requests.post(url, headers=headers, json=payload)
-                if response.status_code == 500:
-                    response.raise_for_status()
-
-                if response.status_code != 200:
-                    raise BigDataCorpAPIException(
-                        response.json()['Status']['Message'])
-
-                results.append({
-                    'api_type': "people",
-                    'end_point': api,
-                    "successful_requests": response.json()["UsageData"]
-                                            ["TotalSuccessfulRequests"],
-                    "requests_with_error": response.json()["UsageData"]
-                                            ["TotalRequestsWithError"],
-                    "queries_charged": response.json()["UsageData"]
-                                            ["TotalQueriesCharged"],
-                    "queries_not_charged": response.json()["UsageData"]
-                                            ["TotalQueriesNotCharged"],
-                    "estimated_price": response.json()["UsageData"]
-                                            ["TotalEstimatedPrice"],
-                })
-
-            except Exception as err:
-                print(err)
-
-        for api in self.CNPJ_DATABASES:
-            payload["Api"] = "companies"
-            payload["Datasets"] = api
-            try:
-                response = requests.post(url, headers=headers, json=payload)
-
-                if response.status_code == 500:
-                    response.raise_for_status()
+        payloads = self._usage_payloads(
+            initial_date=initial_date, final_date=final_date)
+
+        if usage_store is None:
+            usages = {}
+            results = iter_bulk(
+                lambda item: self._get_dataset_usage(item[1]),
+                enumerate(payloads), max_workers=max_workers)
+            for (i, payload), result in results:
+                usages[i] = result
+            return [
+                self._usage_error(payload=payload, error=usages[i])
+                if isinstance(usages[i], Exception) else usages[i]
+                for i, payload in enumerate(payloads)]
+
+        return self._get_usage_incremental(
+            payloads=payloads, max_workers=max_workers,
+            usage_store=usage_store)
+
+    def _get_usage_incremental(self, payloads: list, max_workers: int,
+                               usage_store: UsageStore) -> list:
+        """
+        Fetch usage day by day, querying only days not on `usage_store`.
 
-                if response.status_code != 200:
-                    raise BigDataCorpAPIException(
-                        response.json()['Status']['Message'])
-
-                results.append({
-                    'api_type': "companies",
-                    'end_point': api,
-                    "successful_requests": response.json()["UsageData"]
-                                            ["TotalSuccessfulRequests"],
-                    "requests_with_error": response.json()["UsageData"]
-                                            ["TotalRequestsWithError"],
-                    "queries_charged": response.json()["UsageData"]
-                                            ["TotalQueriesCharged"],
-                    "queries_not_charged": response.json()["UsageData"]
-                                            ["TotalQueriesNotCharged"],
-                    "estimated_price": response.json()["UsageData"]
-                                        ["TotalEstimatedPrice"],
-                })
-
-            except Exception as err:
-                print(err)
-
-        return results
+        Args:
+            payloads [list[dict]]: `/usage` payloads for the whole range.
+            max_workers [int]: Number of concurrent requests.
+            usage_store [UsageStore]: Local storage of per-day usage.
+        Return [list[dict]]:
+            Usage of each dataset, see `get_usage`.
+        """
+        today = datetime.date.today().isoformat()
+        day_usages = []
+        day_payloads = []
+        for i, payload in enumerate(payloads):
+            days = date_range(
+                payload["InitialReferenceDate"],
+                payload["FinalReferenceDate"])
+            stored = usage_store.get(
+                api_type=payload["Api"], end_point=payload["Datasets"],
+                days=days)
+            day_usages.append(list(stored.values()))
+            for day in days:
+                if day not in stored:
+                    day_payload = dict(payload)
+                    day_payload["InitialReferenceDate"] = day
+                    day_payload["FinalReferenceDate"] = day
+                    day_payloads.append((i, day_payload))
+
+        errors = {}
+        results = iter_bulk(
+            lambda item: self._get_dataset_usage(item[1]), day_payloads,
+            max_workers=max_workers)
+        for (i, day_payload), result in results:
+            if isinstance(result, Exception):
+                errors[i] = result
+                continue
+            day = day_payload["InitialReferenceDate"]
+            if day < today:
+                usage_store.set(day=day, usage=result)
+            day_usages[i].append(result)
+
+        return [
+            self._usage_error(payload=payload, error=errors[i])
+            if i in errors else sum_usage(
+                api_type=payload["Api"], end_point=payload["Datasets"],
+                usages=day_usages[i])
+            for i, payload in enumerate(payloads)]
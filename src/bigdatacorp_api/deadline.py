@@ -0,0 +1,99 @@
+"""End-to-end time budget of a BigDataCorpAPI call."""
+import time
+from bigdatacorp_api.exceptions import BigDataCorpAPITimeoutException
+
+
+class Deadline:
+    """
+    Time budget shared by all requests, retries and backoff of a call.
+
+    Each attempt uses at most the remaining time as transport timeout and
+    retries are not started if the backoff would end after the deadline.
+    The same object can be passed to many calls to share one budget.
+    """
+
+    # Smallest timeout passed to the transport, zero is not accepted
+    MIN_TIMEOUT = 0.001
+
+    def __init__(self, timeout: float, clock=time.monotonic):
+        """
+        __init__.
+
+        Args:
+            timeout [float]: Budget in seconds, starting now.
+        Kwargs:
+            clock [callable]: Function returning current time in seconds.
+        """
+        self.timeout = timeout
+        self._clock = clock
+        self.expires_at = clock() + timeout
+
+    def remaining(self) -> float:
+        """Return seconds left until the deadline, zero if expired."""
+        return max(self.expires_at - self._clock(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        """True if no time is left."""
+        return self.remaining() <= 0
+
+    def cap(self, timeout: float = None) -> float:
+        """
+        Limit a timeout to the time left.
+
+        Args:
+            timeout [float]: Timeout in seconds, None for no limit.
+        Return [float]:
+            Smallest of `timeout` and the remaining time, at least
+            `MIN_TIMEOUT`.
+        """
+        remaining = self.remaining()
+        if timeout is not None:
+            remaining = min(timeout, remaining)
+        return max(remaining, self.MIN_TIMEOUT)
+
+    def exception(self, url: str, datasets: list,
+                  error_msgs: list = None) -> BigDataCorpAPITimeoutException:
+        """
+        Return the exception of datasets not fetched before the deadline.
+
+        Args:
+            url [str]: End-point url.
+            datasets [list[str]]: Datasets of the request.
+        Kwargs:
+            error_msgs [list[str]]: Errors of previous attempts.
+        Return [BigDataCorpAPITimeoutException]:
+            Exception with datasets, url and errors on payload.
+        """
+        return BigDataCorpAPITimeoutException(
+            message="deadline of {}s exceeded fetching [{}]".format(
+                self.timeout, ", ".join(datasets)),
+            payload={
+                "url": url, "datasets": list(datasets),
+                "timeout": self.timeout, "errors": list(error_msgs or [])})
+
+    def __repr__(self):
+        return "Deadline(timeout={!r}, remaining={:.3f})".format(
+            self.timeout, self.remaining())
+
+
+def get_deadline(deadline, default: float = None):
+    """
+    Return the deadline of a call.
+
+    Args:
+        deadline [Deadline | float | None]: Deadline object, budget in
+            seconds or None to use `default`.
+    Kwargs:
+        default [float]: Budget in seconds used if `deadline` is None, None
+            for no deadline.
+    Return [Deadline | None]:
+        Deadline of the call or None if calls are not limited.
+    """
+    if isinstance(deadline, Deadline):
+        return deadline
+    if deadline is None:
+        deadline = default
+    if deadline is None:
+        return None
+    return Deadline(deadline)
@@ -0,0 +1,66 @@
+"""JSON decoding of BigData responses with optional fast backends."""
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def json_loads(data):
+    """Decode JSON bytes or str using the standard library."""
+    return json.loads(data)
+
+
+def json_dumps(obj) -> bytes:
+    """Encode an object as JSON bytes using the standard library."""
+    return json.dumps(obj).encode("utf-8")
+
+
+def orjson_loads(data):
+    """Decode JSON bytes or str using orjson."""
+    return orjson.loads(data)
+
+
+def orjson_dumps(obj) -> bytes:
+    """Encode an object as JSON bytes using orjson."""
+    return orjson.dumps(obj)
+
+
+if orjson is not None:
+    loads = orjson_loads
+    dumps = orjson_dumps
+else:  # pragma: no cover
+    loads = json_loads
+    dumps = json_dumps
+
+
+def get_json_decoder(decoder="auto"):
+    """
+    Return a function that decodes JSON bytes.
+
+    Args:
+        decoder [str | callable]: `auto` to use orjson when installed and
+            the standard library otherwise, `orjson`, `json` or a function
+            that receives bytes and returns the decoded object.
+    Return [callable]:
+        Decoder function.
+    Raise:
+        ValueError: If decoder is unknown.
+        ImportError: If `orjson` is asked and not installed.
+    """
+    if callable(decoder):
+        return decoder
+    if decoder == "auto":
+        return loads
+    if decoder == "json":
+        return json_loads
+    if decoder == "orjson":
+        if orjson is None:
+            raise ImportError(
+                "orjson must be installed to be used as JSON decoder, "
+                "`pip install orjson`")
+        return orjson_loads
+    raise ValueError(
+        "unknown JSON decoder [{}], use `auto`, `json`, `orjson` or a "
+        "function".format(decoder))
@@ -0,0 +1,220 @@
+"""Memory bounded deduplication of documents on bulk jobs."""
+import math
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+def _hash_key(key: str, digest_size: int = 8) -> bytes:
+    """Return a fixed size hash of a key."""
+    return hashlib.blake2b(
+        key.encode("utf-8"), digest_size=digest_size).digest()
+
+
+class SeenSet:
+    """
+    Exact set of keys seen on a job, stored as 64 bit hashes.
+
+    With NumPy installed hashes are kept on a sorted `uint64` array (8
+    bytes for each key) with a small set buffer merged into it when full,
+    without NumPy a set of integers is used.
+    """
+
+    def __init__(self, buffer_size: int = 65536):
+        """
+        __init__.
+
+        Kwargs:
+            buffer_size [int]: Number of keys kept on the set buffer before
+                merging them into the sorted array.
+        """
+        self.buffer_size = buffer_size
+        self._buffer = set()
+        self._sorted = None
+        if np is not None:
+            self._sorted = np.empty(0, dtype=np.uint64)
+        self._lock = threading.Lock()
+
+    def _contains(self, value: int) -> bool:
+        if value in self._buffer:
+            return True
+        if self._sorted is None or not len(self._sorted):
+            return False
+        i = np.searchsorted(self._sorted, np.uint64(value))
+        return i < len(self._sorted) and int(self._sorted[i]) == value
+
+    def add(self, key: str) -> bool:
+        """
+        Add a key to the set.
+
+        Args:
+            key [str]: Key to be added.
+        Return [bool]:
+            True if the key was already on the set.
+        """
+        value = int.from_bytes(_hash_key(key), "little")
+        with self._lock:
+            if self._contains(value):
+                return True
+            self._buffer.add(value)
+            if self._sorted is not None and \
+                    len(self._buffer) >= self.buffer_size:
+                buffer = np.fromiter(
+                    self._buffer, dtype=np.uint64, count=len(self._buffer))
+                self._sorted = np.union1d(self._sorted, buffer)
+                self._buffer = set()
+            return False
+
+    def __contains__(self, key: str) -> bool:
+        value = int.from_bytes(_hash_key(key), "little")
+        with self._lock:
+            return self._contains(value)
+
+    def __len__(self):
+        size = len(self._buffer)
+        if self._sorted is not None:
+            size += len(self._sorted)
+        return size
+
+
+class BloomFilter:
+    """
+    Probabilistic set with fixed memory.
+
+    Keys that were added are always found, keys that were not added are
+    found with probability `error_rate` when `capacity` keys were added.
+    Uses about 1.2 bytes for each key of capacity at 1% error rate.
+    """
+
+    def __init__(self, capacity: int = 10_000_000,
+                 error_rate: float = 0.001):
+        """
+        __init__.
+
+        Kwargs:
+            capacity [int]: Expected number of keys.
+            error_rate [float]: False positive rate at `capacity` keys.
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.n_bits = max(int(math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2)), 8)
+        self.n_hashes = max(int(round(
+            self.n_bits / capacity * math.log(2))), 1)
+        self._bits = bytearray((self.n_bits + 7) // 8)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def _positions(self, key: str) -> list:
+        # Double hashing, Kirsch and Mitzenmacher
+        digest = _hash_key(key, digest_size=16)
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.n_bits for i in range(self.n_hashes)]
+
+    def add(self, key: str) -> bool:
+        """
+        Add a key to the filter.
+
+        Args:
+            key [str]: Key to be added.
+        Return [bool]:
+            True if the key was probably already on the filter.
+        """
+        positions = self._positions(key)
+        bits = self._bits
+        with self._lock:
+            seen = True
+            for position in positions:
+                byte, bit = divmod(position, 8)
+                if not bits[byte] & (1 << bit):
+                    seen = False
+                    bits[byte] |= 1 << bit
+            if not seen:
+                self._count += 1
+            return seen
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(
+            bits[position // 8] & (1 << (position % 8))
+            for position in self._positions(key))
+
+    def __len__(self):
+        """Return the number of keys added that were not found."""
+        return self._count
+
+
+class Deduplicator:
+    """
+    Find repeated keys on a stream and share their results.
+
+    Keys are checked on `seen` in input order. Results of keys are kept on
+    a LRU with `max_results` entries, so repeated keys are answered without
+    a new request. A repeated key whose result was evicted (or a false
+    positive of a `BloomFilter`) is fetched again, through the client
+    caches if configured.
+    """
+
+    def __init__(self, seen=None, max_results: int = 10000):
+        """
+        __init__.
+
+        Kwargs:
+            seen [SeenSet | BloomFilter]: Index of keys seen, default to a
+                new `SeenSet`.
+            max_results [int]: Maximum number of results kept for repeated
+                keys.
+        """
+        self.seen = seen if seen is not None else SeenSet()
+        self.max_results = max_results
+        self.rows = 0
+        self.duplicates = 0
+        self.reused = 0
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, key: str) -> bool:
+        """
+        Register a row of the stream.
+
+        Args:
+            key [str]: Canonical key of the row.
+        Return [bool]:
+            True if the key was already seen.
+        """
+        self.rows += 1
+        duplicate = self.seen.add(key)
+        if duplicate:
+            self.duplicates += 1
+        return duplicate
+
+    def get(self, key: str):
+        """Return the stored result of a key or None."""
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                self.reused += 1
+            return result
+
+    def put(self, key: str, result):
+        """Store the result of a key, evicting the least recently used."""
+        if self.max_results <= 0:
+            return
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+
+    def get_stats(self) -> dict:
+        """Return counts of `rows`, `unique`, `duplicates` and `reused`."""
+        return {
+            "rows": self.rows, "unique": self.rows - self.duplicates,
+            "duplicates": self.duplicates, "reused": self.reused}
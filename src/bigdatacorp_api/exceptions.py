@@ -64,3 +64,15 @@ class BigDataCorpAPIInvalidInputException(BigDataCorpAPIException):
 
 class BigDataCorpAPIEmptyEnrichedProcessException(BigDataCorpAPIException):
     pass
+
+
+class BigDataCorpAPIRequestException(BigDataCorpAPIException):
+    pass
+
+
+class BigDataCorpAPICircuitOpenException(BigDataCorpAPIException):
+    pass
+
+
+class BigDataCorpAPITimeoutException(BigDataCorpAPIException):
+    pass
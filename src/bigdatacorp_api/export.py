@@ -0,0 +1,474 @@
+"""Columnar (Arrow/Parquet) export of flattened dataset results."""
+import os
+import json
+from bigdatacorp_api.decode import dumps
+from bigdatacorp_api.result import DatasetResult
+from bigdatacorp_api.exceptions import BigDataCorpAPIException
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+
+# Column types of the export specs are `string`, `int`, `float`, `bool` and
+# `json`, the last kept as JSON encoded strings so nested sub-records do not
+# change the schema.
+_ADDRESS_FIELDS = [
+    ("Typology", "string"), ("Title", "string"),
+    ("AddressMain", "string"), ("Number", "string"),
+    ("Complement", "string"), ("Neighborhood", "string"),
+    ("ZipCode", "string"), ("City", "string"), ("State", "string"),
+    ("Country", "string"), ("Type", "string"),
+    ("HouseholdCode", "string"), ("BuildingCode", "string"),
+    ("Priority", "int"), ("IsMain", "bool"), ("IsRecent", "bool"),
+    ("IsActive", "bool"), ("IsRatified", "bool"),
+    ("Latitude", "float"), ("Longitude", "float"),
+    ("FirstPassageDate", "string"), ("LastPassageDate", "string"),
+    ("CreationDate", "string"), ("LastUpdateDate", "string")]
+
+_PHONE_FIELDS = [
+    ("Number", "string"), ("AreaCode", "string"),
+    ("CountryCode", "string"), ("Complement", "string"),
+    ("Type", "string"), ("PortabilityHistory", "json"),
+    ("PlanType", "string"), ("Priority", "int"), ("IsMain", "bool"),
+    ("IsRecent", "bool"), ("IsActive", "bool"),
+    ("IsInDoNotCallList", "bool"), ("FirstPassageDate", "string"),
+    ("LastPassageDate", "string"), ("CreationDate", "string"),
+    ("LastUpdateDate", "string")]
+
+_LAWSUIT_FIELDS = [
+    ("Number", "string"), ("Type", "string"), ("MainSubject", "string"),
+    ("CourtName", "string"), ("CourtLevel", "string"),
+    ("CourtType", "string"), ("CourtDistrict", "string"),
+    ("JudgingBody", "string"), ("State", "string"), ("Status", "string"),
+    ("InferredCNJSubjectName", "string"),
+    ("InferredCNJProcedureTypeName", "string"),
+    ("InferredBroadCNJSubjectName", "string"), ("Value", "float"),
+    ("NumberOfVolumes", "int"), ("NumberOfPages", "int"),
+    ("NumberOfParties", "int"), ("NumberOfUpdates", "int"),
+    ("LawSuitAge", "int"), ("AverageNumberOfUpdatesPerMonth", "float"),
+    ("NoticeDate", "string"), ("ResJudicataDate", "string"),
+    ("CloseDate", "string"), ("RedistributionDate", "string"),
+    ("PublicationDate", "string"), ("LastMovementDate", "string"),
+    ("CaptureDate", "string"), ("LastUpdate", "string")]
+
+_PROCESSES = {
+    "section": ["Processes"],
+    "fields": [
+        ("TotalLawsuits", "int"), ("TotalLawsuitsAsAuthor", "int"),
+        ("TotalLawsuitsAsDefendant", "int"),
+        ("TotalLawsuitsAsOther", "int"),
+        ("FirstLawsuitDate", "string"), ("LastLawsuitDate", "string"),
+        ("Last30DaysLawsuits", "int"), ("Last90DaysLawsuits", "int"),
+        ("Last180DaysLawsuits", "int"), ("Last365DaysLawsuits", "int")],
+    "children": {
+        "lawsuits": {"path": ["Lawsuits"], "fields": _LAWSUIT_FIELDS},
+    }}
+
+_ADDRESSES_EXTENDED = {
+    "section": ["ExtendedAddresses"],
+    "fields": [
+        ("TotalAddresses", "int"), ("TotalActiveAddresses", "int"),
+        ("TotalRatifiedAddresses", "int")],
+    "children": {
+        "addresses": {"path": ["Addresses"], "fields": _ADDRESS_FIELDS},
+    }}
+
+_PHONES_EXTENDED = {
+    "section": ["ExtendedPhones"],
+    "fields": [
+        ("TotalPhones", "int"), ("TotalActivePhones", "int"),
+        ("TotalRatifiedPhones", "int")],
+    "children": {
+        "phones": {"path": ["Phones"], "fields": _PHONE_FIELDS},
+    }}
+
+EXPORT_SPECS = {
+    "cpf": {
+        "basic_data": {
+            "section": ["BasicData"],
+            "fields": [
+                ("TaxIdNumber", "string"), ("TaxIdCountry", "string"),
+                ("Name", "string"), ("Gender", "string"),
+                ("NameWordCount", "int"),
+                ("NumberOfFullNameNamesakes", "int"),
+                ("NameUniquenessScore", "float"),
+                ("BirthDate", "string"), ("Age", "int"),
+                ("ZodiacSign", "string"), ("BirthCountry", "string"),
+                ("MotherName", "string"), ("FatherName", "string"),
+                ("TaxIdStatus", "string"), ("TaxIdOrigin", "string"),
+                ("TaxIdFiscalRegion", "string"),
+                ("HasObitIndication", "bool"),
+                ("TaxIdStatusDate", "string"),
+                ("CreationDate", "string"), ("LastUpdateDate", "string"),
+                ("Aliases", "json"), ("AlternativeIdNumbers", "json"),
+                ("MaritalStatusData", "json")],
+            "children": {}},
+        "financial_data": {
+            # BigData names the section `FinantialData` on people results
+            "section": ["FinantialData", "FinancialData"],
+            "fields": [
+                ("TotalAssets", "string"),
+                ("IncomeEstimates", "json"),
+                ("FinantialStatus", "json")],
+            "children": {
+                "tax_returns": {
+                    "path": ["TaxReturns"],
+                    "fields": [
+                        ("Year", "string"), ("Status", "string"),
+                        ("Bank", "string"), ("Branch", "string"),
+                        ("Batch", "string"), ("IsVipBranch", "bool"),
+                        ("CaptureDate", "string")]},
+            }},
+        "addresses_extended": _ADDRESSES_EXTENDED,
+        "phones_extended": _PHONES_EXTENDED,
+        "processes": _PROCESSES,
+    },
+    "cnpj": {
+        "basic_data": {
+            "section": ["BasicData"],
+            "fields": [
+                ("TaxIdNumber", "string"), ("TaxIdCountry", "string"),
+                ("OfficialName", "string"), ("TradeName", "string"),
+                ("FoundedDate", "string"), ("Age", "int"),
+                ("IsHeadquarter", "bool"), ("HeadquarterState", "string"),
+                ("IsConglomerate", "bool"), ("TaxIdStatus", "string"),
+                ("TaxIdOrigin", "string"), ("TaxIdStatusDate", "string"),
+                ("TaxRegime", "string"),
+                ("CompanyType_ReceitaFederal", "string"),
+                ("HasActiveSanctions", "bool"),
+                ("CreationDate", "string"), ("LastUpdateDate", "string"),
+                ("Aliases", "json"), ("LegalNature", "json"),
+                ("TaxRegimes", "json"), ("AdditionalOutputData", "json")],
+            "children": {
+                "activities": {
+                    "path": ["Activities"],
+                    "fields": [
+                        ("IsMain", "bool"), ("Code", "string"),
+                        ("Activity", "string")]},
+            }},
+        "addresses_extended": _ADDRESSES_EXTENDED,
+        "phones_extended": _PHONES_EXTENDED,
+        "processes": _PROCESSES,
+    },
+}
+
+
+def _check_pyarrow():
+    if pyarrow is None:
+        raise ImportError(
+            "pyarrow must be installed to export results to Arrow/Parquet, "
+            "`pip install pyarrow`")
+
+
+def get_export_spec(entity: str, dataset: str) -> dict:
+    """
+    Return the export spec of a dataset.
+
+    Args:
+        entity [str]: `cpf` or `cnpj`.
+        dataset [str]: Dataset name.
+    Return [dict]:
+        Spec with the `section` keys of the result, the scalar `fields` and
+        the list valued `children` sub-records.
+    Raise:
+        BigDataCorpAPIException: If dataset has no export spec.
+    """
+    spec = EXPORT_SPECS.get(entity, {}).get(dataset)
+    if spec is None:
+        msg = "dataset [{}] of [{}] has no export schema, use: {}".format(
+            dataset, entity, list(EXPORT_SPECS.get(entity, {}).keys()))
+        raise BigDataCorpAPIException(msg)
+    return spec
+
+
+def _arrow_type(type_: str):
+    return {
+        "string": pyarrow.string(), "int": pyarrow.int64(),
+        "float": pyarrow.float64(), "bool": pyarrow.bool_(),
+        "json": pyarrow.string()}[type_]
+
+
+def get_schemas(entity: str, dataset: str) -> dict:
+    """
+    Return the Arrow schemas of a dataset export.
+
+    Args:
+        entity [str]: `cpf` or `cnpj`.
+        dataset [str]: Dataset name.
+    Return [dict[str, pyarrow.Schema]]:
+        Schemas by table name, the main table is named after the dataset
+        and child tables are `{dataset}__{child}`. Child tables have
+        `document` and `position` on the list before the record fields.
+    """
+    _check_pyarrow()
+    spec = get_export_spec(entity, dataset)
+    schemas = {dataset: pyarrow.schema(
+        [("document", pyarrow.string())] +
+        [(name, _arrow_type(type_)) for name, type_ in spec["fields"]])}
+    for child, child_spec in spec["children"].items():
+        schemas["{}__{}".format(dataset, child)] = pyarrow.schema(
+            [("document", pyarrow.string()), ("position", pyarrow.int64())] +
+            [(name, _arrow_type(type_))
+             for name, type_ in child_spec["fields"]])
+    return schemas
+
+
+def _get_section(response_json, section_keys: list):
+    """Return the dataset section of the first result or None."""
+    if isinstance(response_json, DatasetResult):
+        for key in section_keys:
+            section = response_json.section(key)
+            if section is not None:
+                return section
+        return None
+    if not isinstance(response_json, dict):
+        return None
+    results = response_json.get("Result") or []
+    if not results:
+        return None
+    for key in section_keys:
+        section = results[0].get(key)
+        if section is not None:
+            return section
+    return None
+
+
+def _get_document(response_json) -> str:
+    """Return the document of the `MatchKeys` of the first result."""
+    if isinstance(response_json, DatasetResult):
+        match_keys = response_json.match_keys
+    else:
+        try:
+            match_keys = response_json["Result"][0]["MatchKeys"]
+        except (KeyError, IndexError, TypeError):
+            match_keys = None
+    if match_keys is None:
+        return None
+    return match_keys[match_keys.find("{") + 1:match_keys.rfind("}")]
+
+
+def _coerce(value, type_: str):
+    """Convert a value to the column type, None if not convertible."""
+    if value is None:
+        return None
+    try:
+        if type_ == "json":
+            return dumps(value).decode("utf-8")
+        if type_ == "string":
+            return value if isinstance(value, str) else str(value)
+        if type_ == "int":
+            return int(value)
+        if type_ == "float":
+            return float(value)
+        if type_ == "bool":
+            if isinstance(value, str):
+                return value.strip().lower() in ("true", "1", "yes")
+            return bool(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _build_batch(schema, fields: list, documents: list, records: list,
+                 positions: list = None):
+    """
+    Build a record batch from dictionaries.
+
+    Records are converted by Arrow as a struct array, which is much faster
+    than flattening on Python. Records with values that do not match the
+    schema (or `json` columns) fall back to a column by column conversion.
+    """
+    columns = [pyarrow.array(documents, type=pyarrow.string())]
+    if positions is not None:
+        columns.append(pyarrow.array(positions, type=pyarrow.int64()))
+
+    scalar_fields = [
+        (name, type_) for name, type_ in fields if type_ != "json"]
+    struct_type = pyarrow.struct(
+        [(name, _arrow_type(type_)) for name, type_ in scalar_fields])
+    try:
+        struct_array = pyarrow.array(records, type=struct_type)
+        converted = dict(zip(
+            [name for name, _ in scalar_fields], struct_array.flatten()))
+    except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+        converted = {}
+
+    for name, type_ in fields:
+        if name in converted:
+            columns.append(converted[name])
+            continue
+        values = [
+            None if record is None else _coerce(record.get(name), type_)
+            for record in records]
+        columns.append(pyarrow.array(values, type=_arrow_type(type_)))
+    return pyarrow.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def to_record_batches(entity: str, dataset: str, results: list,
+                      documents: list = None) -> dict:
+    """
+    Flatten a batch of dataset results to Arrow record batches.
+
+    Args:
+        entity [str]: `cpf` or `cnpj`.
+        dataset [str]: Dataset name.
+        results [list[dict]]: Responses of `get_cpf_dataset` or
+            `get_cnpj_dataset`, exceptions and None are exported as empty
+            rows.
+    Kwargs:
+        documents [list[str]]: Document of each result, default to the
+            `MatchKeys` of the result.
+    Return [dict[str, pyarrow.RecordBatch]]:
+        Record batches by table name, see `get_schemas`.
+    """
+    _check_pyarrow()
+    spec = get_export_spec(entity, dataset)
+    schemas = get_schemas(entity, dataset)
+    if documents is None:
+        documents = [_get_document(result) for result in results]
+    elif len(documents) != len(results):
+        raise BigDataCorpAPIException(
+            "documents and results must have the same length")
+
+    sections = [
+        _get_section(result, spec["section"]) for result in results]
+    sections = [
+        section if isinstance(section, dict) else None
+        for section in sections]
+    batches = {dataset: _build_batch(
+        schemas[dataset], spec["fields"], documents, sections)}
+
+    for child, child_spec in spec["children"].items():
+        child_documents = []
+        child_positions = []
+        child_records = []
+        for document, section in zip(documents, sections):
+            if section is None:
+                continue
+            items = section
+            for key in child_spec["path"]:
+                items = items.get(key) if isinstance(items, dict) else None
+            for position, item in enumerate(items or []):
+                if isinstance(item, dict):
+                    child_documents.append(document)
+                    child_positions.append(position)
+                    child_records.append(item)
+        table_name = "{}__{}".format(dataset, child)
+        batches[table_name] = _build_batch(
+            schemas[table_name], child_spec["fields"], child_documents,
+            child_records, positions=child_positions)
+    return batches
+
+
+class ParquetExporter:
+    """
+    Write dataset results to Parquet files, one for each table.
+
+    Results are written in batches with `write`, files are named
+    `{table}.parquet` on the output directory, see `get_schemas` for table
+    names.
+    """
+
+    def __init__(self, directory: str, entity: str, dataset: str,
+                 compression: str = "zstd"):
+        """
+        __init__.
+
+        Args:
+            directory [str]: Output directory, created if it does not
+                exist.
+            entity [str]: `cpf` or `cnpj`.
+            dataset [str]: Dataset name.
+        Kwargs:
+            compression [str]: Parquet compression codec.
+        """
+        _check_pyarrow()
+        self.directory = directory
+        self.entity = entity
+        self.dataset = dataset
+        os.makedirs(directory, exist_ok=True)
+        self._writers = {
+            table: pyarrow.parquet.ParquetWriter(
+                os.path.join(directory, table + ".parquet"), schema,
+                compression=compression)
+            for table, schema in get_schemas(entity, dataset).items()}
+
+    def write(self, results: list, documents: list = None) -> dict:
+        """
+        Write a batch of results.
+
+        Args:
+            results [list[dict]]: Dataset responses.
+        Kwargs:
+            documents [list[str]]: Document of each result.
+        Return [dict[str, int]]:
+            Number of rows written on each table.
+        """
+        batches = to_record_batches(
+            self.entity, self.dataset, results, documents=documents)
+        for table, batch in batches.items():
+            self._writers[table].write_batch(batch)
+        return {table: batch.num_rows for table, batch in batches.items()}
+
+    def close(self):
+        """Close the Parquet files."""
+        for writer in self._writers.values():
+            writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def export_ndjson(path: str, directory: str, entity: str,
+                  datasets: list, batch_size: int = 10000) -> dict:
+    """
+    Export an `EnrichmentPipeline` NDJSON output to Parquet.
+
+    Args:
+        path [str]: NDJSON output of the pipeline.
+        directory [str]: Output directory of the Parquet files.
+        entity [str]: `cpf` or `cnpj`.
+        datasets [list[str]]: Datasets to be exported, lines of other
+            datasets and lines with errors are skipped.
+    Kwargs:
+        batch_size [int]: Number of results of each record batch.
+    Return [dict[str, int]]:
+        Number of rows written on each table.
+    """
+    exporters = {
+        dataset: ParquetExporter(
+            os.path.join(directory, dataset), entity, dataset)
+        for dataset in datasets}
+    pending = {dataset: ([], []) for dataset in datasets}
+    n_rows = {}
+
+    def flush(dataset):
+        documents, results = pending[dataset]
+        if results:
+            written = exporters[dataset].write(results, documents=documents)
+            for table, rows in written.items():
+                n_rows[table] = n_rows.get(table, 0) + rows
+        pending[dataset] = ([], [])
+
+    try:
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                line = json.loads(line)
+                dataset = line["dataset"]
+                if dataset not in pending or line["error"] is not None:
+                    continue
+                pending[dataset][0].append(line["document"])
+                pending[dataset][1].append(line["result"])
+                if len(pending[dataset][1]) >= batch_size:
+                    flush(dataset)
+        for dataset in datasets:
+            flush(dataset)
+    finally:
+        for exporter in exporters.values():
+            exporter.close()
+    return n_rows
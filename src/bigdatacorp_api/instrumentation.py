@@ -0,0 +1,389 @@
+"""Metrics and tracing hooks of BigDataCorpAPI clients."""
+import bisect
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from bigdatacorp_api.retry import get_http_status, _TRANSPORT_ERRORS
+from bigdatacorp_api.status import get_status_exception_class
+from bigdatacorp_api.exceptions import (
+    BigDataCorpAPIException,
+    BigDataCorpAPIInvalidDocumentException,
+    BigDataCorpAPIInvalidDatabaseException,
+    BigDataCorpAPIMinorDocumentException,
+    BigDataCorpAPIMaxRetryException,
+    BigDataCorpAPIInvalidInputException,
+    BigDataCorpAPILoginProblemException,
+    BigDataCorpAPIProblemAPIException,
+    BigDataCorpAPIOnDemandQueriesException,
+    BigDataCorpAPIMonitoringAPIException,
+    BigDataCorpAPIUnmappedErrorException,
+    BigDataCorpAPIEmptyEnrichedProcessException,
+    BigDataCorpAPIRequestException,
+    BigDataCorpAPICircuitOpenException,
+    BigDataCorpAPITimeoutException)
+
+try:
+    from opentelemetry import trace
+except ImportError:  # pragma: no cover
+    trace = None
+
+
+logger = logging.getLogger("bigdatacorp_api")
+
+# Label of each exception class, subclasses use the label of the closest
+# class on the hierarchy
+STATUS_CLASS_LABELS = {
+    BigDataCorpAPIInvalidDocumentException: "invalid_document",
+    BigDataCorpAPIInvalidDatabaseException: "invalid_database",
+    BigDataCorpAPIMinorDocumentException: "minor_document",
+    BigDataCorpAPIMaxRetryException: "max_retry",
+    BigDataCorpAPIInvalidInputException: "invalid_input",
+    BigDataCorpAPILoginProblemException: "login_problem",
+    BigDataCorpAPIProblemAPIException: "problem_api",
+    BigDataCorpAPIOnDemandQueriesException: "on_demand_queries",
+    BigDataCorpAPIMonitoringAPIException: "monitoring_api",
+    BigDataCorpAPIUnmappedErrorException: "unmapped_error",
+    BigDataCorpAPIEmptyEnrichedProcessException: "empty_enriched_process",
+    BigDataCorpAPIRequestException: "request_error",
+    BigDataCorpAPICircuitOpenException: "circuit_open",
+    BigDataCorpAPITimeoutException: "deadline_exceeded",
+    BigDataCorpAPIException: "error"}
+
+DEFAULT_BUCKETS = (
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def get_status_class(code: int) -> str:
+    """Return the status class label of a BigData status code."""
+    exception_class = get_status_exception_class(code)
+    if exception_class is None:
+        return "ok"
+    return STATUS_CLASS_LABELS[exception_class[0]]
+
+
+def get_exception_class(exception: Exception) -> str:
+    """
+    Return the status class label of an error raised by a request.
+
+    Args:
+        exception [Exception]: Error raised by the request.
+    Return [str]:
+        Label of the BigDataCorpAPI exception class, `http_4xx`/`http_5xx`
+        for HTTP errors, `transport_error` for connection errors and
+        `error` for others.
+    """
+    if isinstance(exception, BigDataCorpAPIException):
+        for klass in type(exception).__mro__:
+            label = STATUS_CLASS_LABELS.get(klass)
+            if label is not None:
+                return label
+    status = get_http_status(exception)
+    if status is not None:
+        return "http_{}xx".format(status // 100)
+    if isinstance(exception, _TRANSPORT_ERRORS):
+        return "transport_error"
+    return "error"
+
+
+class _NullSpan:
+    """Context manager that does nothing, returned by disabled tracing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Instrumentation:
+    """
+    Hooks called by clients on requests, the base class does nothing.
+
+    Subclass and override the hooks to collect metrics. Clients created
+    without instrumentation skip the hooks entirely.
+    """
+
+    def on_request(self, endpoint: str, datasets: list, attempt: int,
+                   elapsed: float, bytes_received: int = 0,
+                   status_codes: dict = None, exception: Exception = None):
+        """
+        Called after each request attempt.
+
+        Args:
+            endpoint [str]: End-point url.
+            datasets [list[str]]: Datasets of the request.
+            attempt [int]: Attempt number, starting at 1.
+            elapsed [float]: Duration of the attempt in seconds.
+        Kwargs:
+            bytes_received [int]: Size of the response body.
+            status_codes [dict[str, int]]: BigData status code of each
+                dataset, if a response was decoded.
+            exception [Exception]: Error raised by the attempt.
+        """
+        pass
+
+    def on_retry(self, endpoint: str, attempt: int, exception: Exception,
+                 delay: float):
+        """Called before waiting to retry a failed attempt."""
+        pass
+
+    def on_cache(self, dataset: str, hit: bool):
+        """Called on each cache lookup of a dataset."""
+        pass
+
+    def span(self, name: str, attributes: dict = None):
+        """Return a context manager wrapping a request attempt."""
+        return _NULL_SPAN
+
+
+class CompositeInstrumentation(Instrumentation):
+    """Forward hooks to many instrumentations."""
+
+    def __init__(self, instrumentations: list):
+        """
+        __init__.
+
+        Args:
+            instrumentations [list[Instrumentation]]: Hooks to be called,
+                spans are taken from the first one that creates spans.
+        """
+        self.instrumentations = list(instrumentations)
+
+    def on_request(self, *args, **kwargs):
+        for instrumentation in self.instrumentations:
+            instrumentation.on_request(*args, **kwargs)
+
+    def on_retry(self, *args, **kwargs):
+        for instrumentation in self.instrumentations:
+            instrumentation.on_retry(*args, **kwargs)
+
+    def on_cache(self, *args, **kwargs):
+        for instrumentation in self.instrumentations:
+            instrumentation.on_cache(*args, **kwargs)
+
+    def span(self, name: str, attributes: dict = None):
+        for instrumentation in self.instrumentations:
+            span = instrumentation.span(name, attributes)
+            if span is not _NULL_SPAN:
+                return span
+        return _NULL_SPAN
+
+
+class _Histogram:
+    """Cumulative histogram with fixed buckets."""
+
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, n_buckets: int):
+        self.counts = [0] * n_buckets
+        self.total = 0.0
+        self.count = 0
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(
+        '{}="{}"'.format(
+            name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in labels) + "}"
+
+
+class PrometheusInstrumentation(Instrumentation):
+    """
+    Collect client metrics in memory and render them on Prometheus format.
+
+    Metrics:
+        bigdatacorp_request_duration_seconds: Histogram of request
+            duration by end-point and dataset, a request with many datasets
+            is observed on each of them.
+        bigdatacorp_request_attempts_total: Attempts by end-point and
+            attempt number.
+        bigdatacorp_retries_total: Retries by end-point and error class.
+        bigdatacorp_status_total: Results by end-point, dataset and status
+            class, see `STATUS_CLASS_LABELS`.
+        bigdatacorp_response_bytes_total: Bytes received by end-point.
+        bigdatacorp_cache_requests_total: Cache lookups by dataset and
+            result (`hit` or `miss`).
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS,
+                 namespace: str = "bigdatacorp"):
+        """
+        __init__.
+
+        Kwargs:
+            buckets [tuple[float]]: Upper bounds of latency buckets in
+                seconds.
+            namespace [str]: Prefix of metric names.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._durations = {}
+        self._counters = {
+            "request_attempts_total": {},
+            "retries_total": {},
+            "status_total": {},
+            "response_bytes_total": {},
+            "cache_requests_total": {}}
+
+    def _inc(self, name: str, labels: tuple, value: float = 1):
+        counter = self._counters[name]
+        counter[labels] = counter.get(labels, 0) + value
+
+    def on_request(self, endpoint: str, datasets: list, attempt: int,
+                   elapsed: float, bytes_received: int = 0,
+                   status_codes: dict = None, exception: Exception = None):
+        bucket = bisect.bisect_left(self.buckets, elapsed)
+        with self._lock:
+            self._inc(
+                "request_attempts_total",
+                (("endpoint", endpoint), ("attempt", attempt)))
+            if bytes_received:
+                self._inc(
+                    "response_bytes_total", (("endpoint", endpoint),),
+                    bytes_received)
+            exception_class = None
+            if exception is not None:
+                exception_class = get_exception_class(exception)
+            for dataset in datasets:
+                key = (("endpoint", endpoint), ("dataset", dataset))
+                histogram = self._durations.get(key)
+                if histogram is None:
+                    histogram = self._durations[key] = _Histogram(
+                        len(self.buckets))
+                if bucket < len(self.buckets):
+                    histogram.counts[bucket] += 1
+                histogram.total += elapsed
+                histogram.count += 1
+
+                if exception_class is not None:
+                    status_class = exception_class
+                elif status_codes and dataset in status_codes:
+                    status_class = get_status_class(status_codes[dataset])
+                else:
+                    continue
+                self._inc("status_total", key + (
+                    ("status_class", status_class),))
+
+    def on_retry(self, endpoint: str, attempt: int, exception: Exception,
+                 delay: float):
+        with self._lock:
+            self._inc("retries_total", (
+                ("endpoint", endpoint),
+                ("error_class", get_exception_class(exception))))
+
+    def on_cache(self, dataset: str, hit: bool):
+        with self._lock:
+            self._inc("cache_requests_total", (
+                ("dataset", dataset), ("result", "hit" if hit else "miss")))
+
+    def get_cache_hit_rate(self, dataset: str = None) -> float:
+        """
+        Return the rate of cache lookups that were hits.
+
+        Kwargs:
+            dataset [str]: Dataset to consider, all datasets if not set.
+        Return [float | None]:
+            Hit rate, None if there was no lookup.
+        """
+        hits = lookups = 0
+        with self._lock:
+            for labels, value in \
+                    self._counters["cache_requests_total"].items():
+                if dataset is not None and labels[0][1] != dataset:
+                    continue
+                lookups += value
+                if labels[1][1] == "hit":
+                    hits += value
+        return hits / lookups if lookups else None
+
+    def render(self) -> str:
+        """Return all metrics on Prometheus text exposition format."""
+        ns = self.namespace
+        lines = []
+        with self._lock:
+            name = ns + "_request_duration_seconds"
+            lines.append("# TYPE {} histogram".format(name))
+            for labels, histogram in self._durations.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append("{}_bucket{} {}".format(
+                        name, _format_labels(labels + (("le", bound),)),
+                        cumulative))
+                lines.append("{}_bucket{} {}".format(
+                    name, _format_labels(labels + (("le", "+Inf"),)),
+                    histogram.count))
+                lines.append("{}_sum{} {}".format(
+                    name, _format_labels(labels), histogram.total))
+                lines.append("{}_count{} {}".format(
+                    name, _format_labels(labels), histogram.count))
+            for counter, values in self._counters.items():
+                name = "{}_{}".format(ns, counter)
+                lines.append("# TYPE {} counter".format(name))
+                for labels, value in values.items():
+                    lines.append("{}{} {}".format(
+                        name, _format_labels(labels), value))
+        return "\n".join(lines) + "\n"
+
+    def start_http_server(self, port: int, addr: str = "0.0.0.0"):
+        """
+        Serve metrics on `http://addr:port/metrics` on a daemon thread.
+
+        Args:
+            port [int]: Port to listen on, 0 to pick a free one.
+        Kwargs:
+            addr [str]: Address to listen on.
+        Return [ThreadingHTTPServer]:
+            Server, use `shutdown` to stop it.
+        """
+        instrumentation = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = instrumentation.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header(
+                    "Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((addr, port), MetricsHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        return server
+
+
+class OpenTelemetryInstrumentation(Instrumentation):
+    """Create an OpenTelemetry span for each request attempt."""
+
+    def __init__(self, tracer=None):
+        """
+        __init__.
+
+        Kwargs:
+            tracer [opentelemetry.trace.Tracer]: Tracer used to create
+                spans, default to the global tracer provider one.
+        """
+        if trace is None:
+            raise ImportError(
+                "opentelemetry-api must be installed to use "
+                "OpenTelemetryInstrumentation, "
+                "`pip install opentelemetry-api`")
+        self.tracer = tracer or trace.get_tracer("bigdatacorp_api")
+
+    def span(self, name: str, attributes: dict = None):
+        return self.tracer.start_as_current_span(
+            name, attributes=attributes)
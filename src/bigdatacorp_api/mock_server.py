@@ -0,0 +1,537 @@
+"""Local stand-in of BigDataCorp end-points for tests and benchmarks."""
+import sys
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from bigdatacorp_api.decode import loads, dumps
+from bigdatacorp_api.registry import DatasetRegistry
+from bigdatacorp_api.polling import AsyncQueryContract
+from bigdatacorp_api.streaming import STREAM_LISTS
+
+
+# Section of the result of datasets with a synthetic payload, others use
+# the dataset name in CamelCase
+DATASET_SECTIONS = {
+    "basic_data": "BasicData",
+    "processes": "Processes",
+    "addresses_extended": "ExtendedAddresses",
+    "phones_extended": "ExtendedPhones",
+    "financial_data": "FinantialData",
+}
+
+QUERY_PATHS = ("/peoplev2", "/companies", "/marketplace", "/processos")
+
+ASYNC_STATUS_PATH = "/async/status"
+
+_STATUS_MESSAGES = {
+    -101: "LOGIN EXPIRED",
+    -1200: "ON DEMAND QUERY ERROR"}
+
+
+class ErrorRule:
+    """
+    Error injected on responses of the mock server.
+
+    A rule sets a BigData status code on datasets of the response or
+    answers with an HTTP error status. `-101` is set on the `login` status
+    entry, as BigData does when the token has expired.
+    """
+
+    def __init__(self, code: int = None, http_status: int = None,
+                 datasets: list = None, paths: list = None,
+                 count: int = None, rate: float = 1.0,
+                 retry_after: float = None):
+        """
+        __init__.
+
+        Kwargs:
+            code [int]: BigData status code, ex.: `-1200`.
+            http_status [int]: HTTP status code, ex.: `429` or `500`.
+            datasets [list[str]]: Datasets that receive `code`, all datasets
+                of the request if not set.
+            paths [list[str]]: Paths where the rule applies, all if not set.
+            count [int]: Number of responses the rule is applied to, no
+                limit if not set.
+            rate [float]: Probability of applying the rule to a response.
+            retry_after [float]: `Retry-After` header of HTTP errors.
+        """
+        if code is None and http_status is None:
+            raise ValueError("code or http_status must be set")
+        self.code = code
+        self.http_status = http_status
+        self.datasets = set(datasets) if datasets else None
+        self.paths = set(paths) if paths else None
+        self.count = count
+        self.rate = rate
+        self.retry_after = retry_after
+
+    def matches(self, path: str, datasets: list) -> bool:
+        """Check if the rule applies to a request."""
+        if self.count is not None and self.count <= 0:
+            return False
+        if self.paths is not None and path not in self.paths:
+            return False
+        if self.datasets is not None and \
+                not self.datasets.intersection(datasets):
+            return False
+        return self.rate >= 1.0 or random.random() < self.rate
+
+
+class MockBigDataServer:
+    """
+    HTTP server answering BigData queries with synthetic responses.
+
+    Serves `/peoplev2`, `/companies`, `/marketplace`, `/processos` and
+    `/usage` on a background thread with keep-alive connections. Responses
+    are deterministic for a document, list sections (lawsuits, addresses,
+    phones) have `payload_items` entries. Queries with `Page` and
+    `PageSize` receive one page of the list sections.
+
+    Queries with `"Async": true` are answered with a `QueryId` and their
+    response is avaiable on `/async/status` after `async_delay` seconds,
+    see `async_contract`. This contract is only served by the mock server.
+
+    Example:
+        with MockBigDataServer(latency=0.01) as server:
+            bigdata_api = BigDataCorpAPI(
+                "token", registry=server.registry())
+            server.add_error(code=-1200, datasets=["processes"], count=1)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0, latency_jitter: float = 0.0,
+                 payload_items: int = 2, errors: list = None,
+                 dataset_latency: dict = None, async_delay: float = 0.0):
+        """
+        __init__.
+
+        Kwargs:
+            host [str]: Address to listen on.
+            port [int]: Port to listen on, 0 to pick a free one.
+            latency [float]: Seconds waited before each response.
+            latency_jitter [float]: Random seconds added to `latency`.
+            payload_items [int]: Number of entries of list sections.
+            errors [list[ErrorRule]]: Errors injected on responses.
+            dataset_latency [dict[str, float]]: Extra seconds waited by
+                requests of each dataset, used to simulate slow datasets.
+            async_delay [float]: Seconds until asynchronous queries are
+                done.
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.payload_items = payload_items
+        self.errors = list(errors or [])
+        self.dataset_latency = dict(dataset_latency or {})
+        self.async_delay = async_delay
+        self.async_jobs = {}
+        self.request_counts = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """Base url of the server."""
+        return "http://{}:{}".format(self.host, self.port)
+
+    def registry(self, registry: DatasetRegistry = None) -> DatasetRegistry:
+        """
+        Return a copy of a registry with end-points on the server.
+
+        Kwargs:
+            registry [DatasetRegistry]: Registry to be copied, default to
+                the `BigDataCorpAPI` registry.
+        Return [DatasetRegistry]:
+            Registry pointing to the server.
+        """
+        if registry is None:
+            from bigdatacorp_api.data import BigDataCorpAPI
+            registry = BigDataCorpAPI.registry
+        registry = registry.copy()
+        registry.rebase(self.url)
+        registry.set_endpoint("async_status", self.url + ASYNC_STATUS_PATH)
+        return registry
+
+    @staticmethod
+    def async_contract() -> AsyncQueryContract:
+        """
+        Return the asynchronous query contract of the mock server.
+
+        The status end-point is `async_status` of the `registry`.
+        """
+        return AsyncQueryContract(
+            submit_fields={"Async": True}, status_endpoint="async_status",
+            id_field="QueryId", ids_field="QueryIds", jobs_field="Jobs",
+            state_field="State", result_field="Result",
+            done_states=("DONE", ), failed_states=("FAILED", "NOT_FOUND"))
+
+    def add_error(self, **kwargs) -> ErrorRule:
+        """Inject an error on responses, see `ErrorRule`."""
+        rule = ErrorRule(**kwargs)
+        with self._lock:
+            self.errors.append(rule)
+        return rule
+
+    def clear_errors(self):
+        """Remove all injected errors."""
+        with self._lock:
+            self.errors = []
+
+    def _take_error(self, path: str, datasets: list,
+                    explicit_path: bool = False):
+        """
+        Return the first rule that applies to a request.
+
+        With `explicit_path` only rules that list the path are used.
+        """
+        with self._lock:
+            for rule in self.errors:
+                if explicit_path and (
+                        rule.paths is None or path not in rule.paths):
+                    continue
+                if rule.matches(path, datasets):
+                    if rule.count is not None:
+                        rule.count -= 1
+                    return rule
+        return None
+
+    def get_delay(self, payload: dict) -> float:
+        """Return seconds waited before answering a request."""
+        delay = self.latency
+        if self.latency_jitter:
+            delay += random.random() * self.latency_jitter
+        if self.dataset_latency and isinstance(payload, dict) and \
+                not payload.get("Async"):
+            delay += max([
+                self.dataset_latency.get(db.strip(), 0.0)
+                for db in str(payload.get("Datasets", "")).split(",")])
+        return delay
+
+    @staticmethod
+    def _seed(document: str) -> int:
+        return int(hashlib.md5(document.encode()).hexdigest()[:8], 16)
+
+    def _items(self, build, seed: int) -> list:
+        return [build(i, seed) for i in range(self.payload_items)]
+
+    @staticmethod
+    def _lawsuit(i: int, seed: int) -> dict:
+        return {
+            "Number": "{:07d}-{:02d}.2020.8.26.0100".format(
+                (seed + i) % 10000000, i % 100),
+            "Type": "ACAO CIVIL", "MainSubject": "INDENIZACAO",
+            "CourtName": "TJSP", "CourtLevel": "1", "CourtType": "CIVEL",
+            "State": "SP", "Status": "ATIVO", "Value": float(i * 1000),
+            "NumberOfParties": 2, "NumberOfUpdates": i,
+            "NoticeDate": "2020-01-01T00:00:00Z",
+            "LastMovementDate": "2021-01-01T00:00:00Z",
+            "Parties": [
+                {"Doc": "52998224725", "Name": "FULANO", "Polarity": "ACTIVE",
+                 "Type": "AUTHOR"},
+                {"Doc": "11144477735", "Name": "CICLANO",
+                 "Polarity": "PASSIVE", "Type": "DEFENDANT"}],
+            "Updates": [
+                {"Content": "MOVIMENTACAO {}".format(j),
+                 "PublishDate": "2021-01-01T00:00:00Z"}
+                for j in range(3)]}
+
+    @staticmethod
+    def _relationship(i: int, seed: int) -> dict:
+        return {
+            "RelatedEntityTaxIdNumber": "{:011d}".format(
+                (seed * 7919 + i) % 100000000000),
+            "RelatedEntityName": "RELACIONADO {}".format(i),
+            "RelationshipType": "PARTNER", "RelationshipLevel": "DIRECT",
+            "RelationshipStartDate": "2010-01-01T00:00:00Z",
+            "RelationshipEndDate": "9999-12-31T23:59:59.9999999"}
+
+    @staticmethod
+    def _address(i: int, seed: int) -> dict:
+        return {
+            "Typology": "RUA", "AddressMain": "DAS FLORES",
+            "Number": str((seed + i) % 1000), "Neighborhood": "CENTRO",
+            "ZipCode": "01001000", "City": "SAO PAULO", "State": "SP",
+            "Country": "BRASIL", "Priority": i + 1, "IsMain": i == 0,
+            "IsActive": True, "Latitude": -23.55, "Longitude": -46.63}
+
+    @staticmethod
+    def _phone(i: int, seed: int) -> dict:
+        return {
+            "Number": "9{:08d}".format((seed + i) % 100000000),
+            "AreaCode": "11", "CountryCode": "55", "Type": "MOBILE",
+            "Priority": i + 1, "IsMain": i == 0, "IsActive": True}
+
+    def _section(self, dataset: str, document: str):
+        seed = self._seed(document)
+        if dataset == "basic_data":
+            return {
+                "TaxIdNumber": document, "Name": "FULANO {}".format(seed),
+                "OfficialName": "EMPRESA {}".format(seed),
+                "Age": seed % 90, "TaxIdStatus": "REGULAR",
+                "BirthDate": "1980-01-01T00:00:00Z"}
+        if dataset in ("processes", "owners_lawsuits"):
+            lawsuits = self._items(self._lawsuit, seed)
+            return {
+                "Lawsuits": lawsuits, "TotalLawsuits": len(lawsuits),
+                "TotalLawsuitsAsAuthor": len(lawsuits),
+                "TotalLawsuitsAsDefendant": 0, "TotalLawsuitsAsOther": 0}
+        if dataset == "related_people":
+            relationships = self._items(self._relationship, seed)
+            return {
+                "PersonalRelationships": relationships,
+                "TotalRelationships": len(relationships)}
+        if dataset == "economic_group_full_extended":
+            relationships = self._items(self._relationship, seed)
+            return {
+                "Relationships": relationships,
+                "TotalRelationships": len(relationships)}
+        if dataset == "addresses_extended":
+            addresses = self._items(self._address, seed)
+            return {"Addresses": addresses,
+                    "TotalAddresses": len(addresses)}
+        if dataset in ("phones_extended", "related_people_phones"):
+            phones = self._items(self._phone, seed)
+            return {"Phones": phones, "TotalPhones": len(phones)}
+        return {"Document": document, "Seed": seed}
+
+    @staticmethod
+    def _paginate(result: dict, datasets: list, payload: dict):
+        """Keep one page of the list sections of a result."""
+        page_size = int(payload["PageSize"])
+        page = int(payload.get("Page", 1))
+        if page_size <= 0 or page < 1:
+            raise ValueError("invalid page")
+        start = (page - 1) * page_size
+        for db in datasets:
+            list_path = STREAM_LISTS.get(db)
+            if list_path is None:
+                continue
+            section = result.get(list_path[0])
+            if section and list_path[1] in section:
+                section[list_path[1]] = \
+                    section[list_path[1]][start:start + page_size]
+
+    @staticmethod
+    def _section_name(dataset: str) -> str:
+        name = DATASET_SECTIONS.get(dataset)
+        if name is None:
+            name = "".join(part.title() for part in dataset.split("_"))
+        return name
+
+    def query_response(self, path: str, payload: dict):
+        """
+        Return the HTTP status, headers and body of a query.
+
+        Args:
+            path [str]: Request path.
+            payload [dict]: Request payload.
+        Return [tuple[int, dict, dict]]:
+            HTTP status, headers and decoded body.
+        """
+        datasets = [
+            db.strip() for db in payload.get("Datasets", "").split(",")
+            if db.strip()]
+        query = payload.get("q", "")
+        document = query[query.find("{") + 1:query.rfind("}")]
+
+        rule = self._take_error(path, datasets)
+        if rule is not None and rule.http_status is not None:
+            headers = {}
+            if rule.retry_after is not None:
+                headers["Retry-After"] = str(rule.retry_after)
+            return rule.http_status, headers, {
+                "Status": {"Message": "HTTP {}".format(rule.http_status)}}
+
+        status = {
+            db: [{"Code": 0, "Message": "OK"}] for db in datasets}
+        if rule is not None:
+            message = _STATUS_MESSAGES.get(rule.code, "MOCK ERROR")
+            if rule.code == -101:
+                status["login"] = [{"Code": -101, "Message": message}]
+            else:
+                for db in datasets:
+                    if rule.datasets is None or db in rule.datasets:
+                        status[db] = [{"Code": rule.code, "Message": message}]
+
+        result = {"MatchKeys": query}
+        for db in datasets:
+            result[self._section_name(db)] = self._section(db, document)
+        if "PageSize" in payload:
+            self._paginate(result, datasets, payload)
+        response = {
+            "Result": [result],
+            "QueryId": hashlib.md5(query.encode()).hexdigest(),
+            "ElapsedMilliseconds": int(self.latency * 1000),
+            "Status": status}
+        if payload.get("Async"):
+            return self._submit_async(response, datasets)
+        return 200, {}, response
+
+    def _submit_async(self, response: dict, datasets: list):
+        """Register an asynchronous query and return its id."""
+        status = response["Status"]
+        if "login" in status or all(
+                status[db][0]["Code"] != 0 for db in datasets):
+            # Refused on submit, datasets with errors are not processed
+            return 200, {}, {"Status": status}
+
+        delay = self.async_delay + max([
+            self.dataset_latency.get(db, 0.0) for db in datasets] + [0.0])
+        with self._lock:
+            query_id = "{}-{}".format(
+                response["QueryId"], len(self.async_jobs))
+            self.async_jobs[query_id] = (time.monotonic() + delay, response)
+        return 200, {}, {"QueryId": query_id, "Status": status}
+
+    def async_status_response(self, path: str, payload: dict):
+        """Return the HTTP status, headers and body of a job poll."""
+        query_ids = payload.get("QueryIds")
+        if not isinstance(query_ids, list):
+            raise ValueError("QueryIds must be a list")
+        # Only errors added for the status path apply to polls
+        rule = self._take_error(path, [], explicit_path=True)
+        if rule is not None and rule.http_status is not None:
+            return rule.http_status, {}, {
+                "Status": {"Message": "HTTP {}".format(rule.http_status)}}
+
+        now = time.monotonic()
+        jobs = []
+        with self._lock:
+            for query_id in query_ids:
+                job = self.async_jobs.get(query_id)
+                if job is None:
+                    jobs.append({"QueryId": query_id, "State": "NOT_FOUND"})
+                elif job[0] > now:
+                    jobs.append({"QueryId": query_id, "State": "PENDING"})
+                else:
+                    jobs.append({
+                        "QueryId": query_id, "State": "DONE",
+                        "Result": job[1]})
+        return 200, {}, {"Jobs": jobs}
+
+    def usage_response(self, path: str, payload: dict):
+        """Return the HTTP status, headers and body of an usage query."""
+        rule = self._take_error(path, [payload.get("Datasets", "")])
+        if rule is not None:
+            return rule.http_status or 400, {}, {
+                "Status": {"Message": "MOCK ERROR {}".format(
+                    rule.code or rule.http_status)}}
+        return 200, {}, {"UsageData": {
+            "TotalSuccessfulRequests": 10,
+            "TotalRequestsWithError": 1,
+            "TotalQueriesCharged": 10,
+            "TotalQueriesNotCharged": 1,
+            "TotalEstimatedPrice": 0.5}}
+
+    def _routes(self) -> dict:
+        routes = {path: self.query_response for path in QUERY_PATHS}
+        routes["/usage"] = self.usage_response
+        routes[ASYNC_STATUS_PATH] = self.async_status_response
+        return routes
+
+    def _make_handler(self):
+        server = self
+        routes = self._routes()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                path = self.path.split("?")[0]
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length)
+                with server._lock:
+                    server.request_counts[path] = \
+                        server.request_counts.get(path, 0) + 1
+
+                try:
+                    payload = loads(body) if body else {}
+                except ValueError:
+                    payload = None
+                delay = server.get_delay(payload)
+                if delay:
+                    time.sleep(delay)
+
+                route = routes.get(path)
+                if route is None:
+                    status, headers, response = 404, {}, {
+                        "Status": {"Message": "not found"}}
+                else:
+                    try:
+                        if payload is None:
+                            raise ValueError("invalid payload")
+                        status, headers, response = route(path, payload)
+                    except ValueError:
+                        status, headers, response = 400, {}, {
+                            "Status": {"Message": "invalid payload"}}
+
+                content = dumps(response)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """Start serving on a background thread."""
+        self._server = ThreadingHTTPServer(
+            (self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main(argv: list = None):
+    """Run the mock server until interrupted."""
+    parser = argparse.ArgumentParser(
+        description="Local stand-in of BigDataCorp end-points.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--payload-items", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    server = MockBigDataServer(
+        host=args.host, port=args.port, latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        payload_items=args.payload_items).start()
+    print("Mock BigData server on", server.url, file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
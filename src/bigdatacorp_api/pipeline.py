@@ -0,0 +1,258 @@
+"""Streaming enrichment pipeline with checkpoint and resume."""
+import os
+import csv
+import json
+import threading
+from bigdatacorp_api.bulk import iter_bulk
+from bigdatacorp_api.dedup import Deduplicator
+from bigdatacorp_api.decode import dumps
+from bigdatacorp_api.result import DatasetResult
+from bigdatacorp_api.exceptions import BigDataCorpAPIException
+
+
+def read_documents(path: str, column: str = "document",
+                   file_format: str = None):
+    """
+    Read documents from a CSV or NDJSON file as a stream.
+
+    Args:
+        path [str]: Path of the file.
+    Kwargs:
+        column [str]: CSV column or NDJSON key with the document.
+        file_format [str]: `csv` or `ndjson`, inferred from file extension
+            if not passed.
+    Return [generator]:
+        Yield documents as strings, empty values are skipped.
+    """
+    if file_format is None:
+        extension = os.path.splitext(path)[1].lower()
+        file_format = "ndjson" if extension in (
+            ".ndjson", ".jsonl", ".json") else "csv"
+
+    with open(path, newline="", encoding="utf-8") as file:
+        if file_format == "csv":
+            for row in csv.DictReader(file):
+                document = (row.get(column) or "").strip()
+                if document:
+                    yield document
+        elif file_format == "ndjson":
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                document = str(json.loads(line).get(column) or "").strip()
+                if document:
+                    yield document
+        else:
+            raise ValueError(
+                "unknown file format [{}], use `csv` or `ndjson`".format(
+                    file_format))
+
+
+class Checkpoint:
+    """
+    Append-only record of completed (document, dataset) pairs.
+
+    Each completed pair is a tab separated line on the checkpoint file, it
+    is loaded on start so a rerun skips pairs already done. Pipelines
+    record documents by their canonical key.
+    """
+
+    def __init__(self, path: str):
+        """
+        __init__.
+
+        Args:
+            path [str]: Path of the checkpoint file, created if it does not
+                exist.
+        """
+        self.path = path
+        self._resumed = set()
+        self._added = set()
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) == 2:
+                        self._resumed.add((parts[0], parts[1]))
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, item: tuple) -> bool:
+        return item in self._resumed or item in self._added
+
+    def __len__(self) -> int:
+        return len(self._resumed) + len(self._added)
+
+    def resumed(self, item: tuple) -> bool:
+        """True if the pair was completed before the file was opened."""
+        return item in self._resumed
+
+    def add(self, document: str, dataset: str):
+        """Register a completed (document, dataset) pair."""
+        with self._lock:
+            if (document, dataset) in self:
+                return
+            self._added.add((document, dataset))
+            self._file.write("{}\t{}\n".format(document, dataset))
+            self._file.flush()
+
+    def close(self):
+        """Close the checkpoint file."""
+        with self._lock:
+            self._file.close()
+
+
+class EnrichmentPipeline:
+    """
+    Enrich a stream of documents and write results to NDJSON.
+
+    Documents are read lazily, enriched concurrently and each result is
+    written as one NDJSON line as soon as it completes. Successful
+    (document, dataset) pairs are recorded on the checkpoint after the
+    result is written, a rerun with the same checkpoint only queries pairs
+    that are missing. Errors are written to the output and not checkpointed,
+    so they are retried on the next run.
+
+    Documents are checkpointed by their canonical key, repeated documents
+    (with any punctuation) are queried once and their results are written
+    for every input row.
+
+    Output lines have `document`, `dataset`, `result` and `error` keys.
+    """
+
+    _METHODS = {
+        "cpf": "get_cpf_datasets",
+        "cnpj": "get_cnpj_datasets",
+        "process": "get_process_datasets"}
+
+    def __init__(self, bigdata_api, entity: str, datasets: list,
+                 output_path: str, checkpoint_path: str = None,
+                 max_workers: int = 8, single_request: bool = False,
+                 max_results: int = 10000):
+        """
+        __init__.
+
+        Args:
+            bigdata_api [BigDataCorpAPI]: Client used on queries.
+            entity [str]: One of `cpf`, `cnpj` or `process`.
+            datasets [list[str]]: Datasets fetched for each document.
+            output_path [str]: NDJSON file results are appended to.
+        Kwargs:
+            checkpoint_path [str]: Checkpoint file, default to
+                `output_path + '.checkpoint'`.
+            max_workers [int]: Number of concurrent documents.
+            single_request [bool]: If set true datasets of a document are
+                grouped by end-point and fetched with one request for each
+                group.
+            max_results [int]: Number of results kept to be written again
+                for repeated documents, older ones are fetched again.
+        """
+        if entity not in self._METHODS:
+            raise BigDataCorpAPIException(
+                "entity [{}] not avaiable, use cpf, cnpj or process".format(
+                    entity))
+        bigdata_api._check_datasets(entity=entity, datasets=datasets)
+
+        self.bigdata_api = bigdata_api
+        self.entity = entity
+        self.datasets = list(datasets)
+        self.output_path = output_path
+        self.checkpoint_path = checkpoint_path or output_path + ".checkpoint"
+        self.max_workers = max_workers
+        self.single_request = single_request
+        self.max_results = max_results
+
+    def _pending(self, documents, checkpoint: Checkpoint,
+                 dedup: Deduplicator, stats: dict):
+        """Yield documents with the datasets that are not checkpointed."""
+        document_key = self.bigdata_api._document_key
+        for document in documents:
+            stats["documents"] += 1
+            key = document_key(self.entity, document)
+            # Pairs completed on this run are written again for repeated
+            # documents, raw documents are checked for old checkpoints
+            datasets = [
+                db for db in self.datasets
+                if not checkpoint.resumed((key, db)) and
+                not checkpoint.resumed((document, db))]
+            stats["skipped"] += len(self.datasets) - len(datasets)
+            if not datasets:
+                continue
+            if dedup.check(key):
+                stats["duplicates"] += 1
+            yield document, key, datasets, "{}|{}".format(
+                key, ",".join(datasets))
+
+    def run(self, documents) -> dict:
+        """
+        Enrich documents, appending results to the output file.
+
+        Args:
+            documents [iterable[str]]: Documents to be enriched, consumed
+                lazily.
+        Return [dict]:
+            Counts of `documents` read, `skipped` pairs already
+            checkpointed, `succeeded` and `failed` pairs and `duplicates`
+            documents repeated on input.
+        """
+        fetch_datasets = getattr(self.bigdata_api, self._METHODS[self.entity])
+        dedup = Deduplicator(max_results=self.max_results)
+
+        def fetch(item):
+            document, _, datasets, item_key = item
+            result = dedup.get(item_key)
+            if result is not None:
+                return result
+            result = fetch_datasets(
+                document, datasets, single_request=self.single_request,
+                raise_errors=False)
+            if not any(isinstance(r, Exception) for r in result.values()):
+                dedup.put(item_key, result)
+            return result
+
+        stats = {
+            "documents": 0, "skipped": 0, "succeeded": 0, "failed": 0,
+            "duplicates": 0}
+        checkpoint = Checkpoint(self.checkpoint_path)
+        try:
+            with open(self.output_path, "ab") as output:
+                results = iter_bulk(
+                    fetch, self._pending(documents, checkpoint, dedup, stats),
+                    max_workers=self.max_workers, key=lambda item: item[3])
+                for (document, key, datasets, _), results_dict in results:
+                    completed = []
+                    for dataset in datasets:
+                        if isinstance(results_dict, Exception):
+                            result = results_dict
+                        else:
+                            result = results_dict[dataset]
+                        self._write(output, document, dataset, result)
+                        if isinstance(result, Exception):
+                            stats["failed"] += 1
+                        else:
+                            stats["succeeded"] += 1
+                            completed.append(dataset)
+                    output.flush()
+                    for dataset in completed:
+                        checkpoint.add(key, dataset)
+        finally:
+            checkpoint.close()
+        return stats
+
+    @staticmethod
+    def _write(output, document: str, dataset: str, result):
+        """Write one result as a NDJSON line."""
+        line = {"document": document, "dataset": dataset,
+                "result": None, "error": None}
+        if isinstance(result, BigDataCorpAPIException):
+            line["error"] = result.to_dict()
+        elif isinstance(result, Exception):
+            line["error"] = {
+                "payload": {}, "type": result.__class__.__name__,
+                "message": str(result)}
+        elif isinstance(result, DatasetResult):
+            line["result"] = result.to_dict()
+        else:
+            line["result"] = result
+        output.write(dumps(line) + b"\n")
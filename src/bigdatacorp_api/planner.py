@@ -0,0 +1,319 @@
+"""Cost-aware planning and execution of bulk queries."""
+import threading
+from bigdatacorp_api.bulk import iter_bulk
+from bigdatacorp_api.exceptions import BigDataCorpAPIInvalidDocumentException
+
+
+# Entity of each `Api` of the usage end-point
+_USAGE_ENTITIES = {"people": "cpf", "companies": "cnpj"}
+
+
+class PriceTable:
+    """
+    Estimated price of one query of each dataset.
+
+    Prices are looked up by (entity, dataset), then by dataset, then by the
+    dataset price tier on the registry and at last `default_price`.
+    """
+
+    def __init__(self, prices: dict = None, tier_prices: dict = None,
+                 default_price: float = 0.0):
+        """
+        __init__.
+
+        Kwargs:
+            prices [dict]: Price by dataset name or `(entity, dataset)`.
+            tier_prices [dict[str, float]]: Price by price tier.
+            default_price [float]: Price of datasets without any other
+                price.
+        """
+        self.prices = dict(prices or {})
+        self.tier_prices = dict(tier_prices or {})
+        self.default_price = default_price
+
+    @classmethod
+    def from_usage(cls, usage: list, default_price: float = 0.0,
+                   tier_prices: dict = None):
+        """
+        Build a price table from `BigDataCorpAPI.get_usage` results.
+
+        Price of each dataset is the estimated price divided by the
+        queries charged on the period, datasets without charged queries
+        or with errors are not priced.
+
+        Args:
+            usage [list[dict]]: Result of `get_usage`.
+        Kwargs:
+            default_price [float]: Price of datasets without usage.
+            tier_prices [dict[str, float]]: Price by price tier.
+        Return [PriceTable]:
+            New price table.
+        """
+        prices = {}
+        for result in usage:
+            if "error" in result or not result.get("queries_charged"):
+                continue
+            entity = _USAGE_ENTITIES.get(
+                result["api_type"], result["api_type"])
+            prices[(entity, result["end_point"])] = \
+                result["estimated_price"] / result["queries_charged"]
+        return cls(
+            prices=prices, tier_prices=tier_prices,
+            default_price=default_price)
+
+    def get_price(self, entity: str, dataset: str,
+                  price_tier: str = None) -> float:
+        """Return the price of one query of an entity dataset."""
+        price = self.prices.get((entity, dataset))
+        if price is None:
+            price = self.prices.get(dataset)
+        if price is None and price_tier is not None:
+            price = self.tier_prices.get(price_tier)
+        if price is None:
+            price = self.default_price
+        return price
+
+
+class QueryPlan:
+    """
+    Queries needed to fetch datasets for a set of documents.
+
+    Attributes:
+        entity [str]: Entity of the documents.
+        items [list[tuple]]: `(document, datasets, price)` of each request
+            to be made, in input order.
+        cached [list[tuple]]: `(document, dataset)` already on the client
+            cache, they have no cost.
+        duplicates [int]: Number of repeated documents removed.
+        invalid [list[str]]: Documents with invalid check digits, they are
+            not queried.
+        estimated_cost [float]: Sum of the price of all items.
+    """
+
+    def __init__(self, entity: str):
+        self.entity = entity
+        self.items = []
+        self.cached = []
+        self.duplicates = 0
+        self.invalid = []
+        self.estimated_cost = 0.0
+        self.cost_by_dataset = {}
+        self.queries_by_dataset = {}
+
+    def summary(self) -> dict:
+        """Return counts and estimated cost of the plan."""
+        return {
+            "entity": self.entity,
+            "requests": len(self.items),
+            "queries": sum(self.queries_by_dataset.values()),
+            "cached": len(self.cached),
+            "duplicates": self.duplicates,
+            "invalid": len(self.invalid),
+            "estimated_cost": self.estimated_cost,
+            "queries_by_dataset": dict(self.queries_by_dataset),
+            "cost_by_dataset": dict(self.cost_by_dataset)}
+
+
+class QueryPlanner:
+    """
+    Plan bulk queries, estimate their cost and run them under a budget.
+
+    Example:
+        planner = QueryPlanner(bigdata_api, PriceTable.from_usage(usage))
+        plan = planner.plan("cnpj", cnpjs, ["basic_data", "kyc"])
+        print(plan.summary())
+        report = planner.execute(plan, budget=100.0)
+    """
+
+    def __init__(self, bigdata_api, prices: PriceTable = None):
+        """
+        __init__.
+
+        Args:
+            bigdata_api [BigDataCorpAPI]: Client used on queries, its
+                cache and registry are used on planning.
+        Kwargs:
+            prices [PriceTable]: Price of each dataset, default to no cost.
+        """
+        self.bigdata_api = bigdata_api
+        self.prices = prices or PriceTable()
+
+    def _get_price(self, entity: str, dataset: str) -> float:
+        api = self.bigdata_api
+        return self.prices.get_price(
+            entity, dataset, api.registry.get(entity, dataset).price_tier)
+
+    def _is_cached(self, entity: str, document: str, dataset: str) -> bool:
+        # Cache statistics and metrics are not changed by planning
+        api = self.bigdata_api
+        endpoint = api._dataset_url(entity=entity, dataset=dataset)
+        document = api._document_key(entity, document)
+        return any(
+            cache.contains(
+                endpoint=endpoint, document=document, dataset=dataset)
+            for cache in api._caches)
+
+    def plan(self, entity: str, documents, datasets: list,
+             single_request: bool = False) -> QueryPlan:
+        """
+        Build the plan of queries of documents and datasets.
+
+        Documents are deduplicated on their canonical key, documents with
+        invalid check digits and (document, dataset) pairs already on the
+        client cache are not queried.
+
+        Args:
+            entity [str]: One of `cpf`, `cnpj` or `process`.
+            documents [iterable[str]]: Documents to be queried.
+            datasets [list[str]]: Datasets to be fetched for each document.
+        Kwargs:
+            single_request [bool]: If set true datasets of a document are
+                grouped by end-point on one request.
+        Return [QueryPlan]:
+            Plan with requests and estimated cost.
+        """
+        api = self.bigdata_api
+        groups = api._group_datasets(
+            entity=entity, datasets=datasets, single_request=single_request)
+        prices = {db: self._get_price(entity, db) for db in datasets}
+
+        plan = QueryPlan(entity=entity)
+        seen = set()
+        for document in documents:
+            key = api._document_key(entity, document)
+            if key in seen:
+                plan.duplicates += 1
+                continue
+            seen.add(key)
+            try:
+                document = api._check_document(
+                    entity=entity, document=document)
+            except BigDataCorpAPIInvalidDocumentException:
+                plan.invalid.append(document)
+                continue
+            for group in groups:
+                pending = []
+                for dataset in group:
+                    if self._is_cached(entity, document, dataset):
+                        plan.cached.append((document, dataset))
+                    else:
+                        pending.append(dataset)
+                if not pending:
+                    continue
+                price = sum(prices[db] for db in pending)
+                plan.items.append((document, pending, price))
+                plan.estimated_cost += price
+                for dataset in pending:
+                    plan.queries_by_dataset[dataset] = \
+                        plan.queries_by_dataset.get(dataset, 0) + 1
+                    plan.cost_by_dataset[dataset] = \
+                        plan.cost_by_dataset.get(dataset, 0.0) + \
+                        prices[dataset]
+        return plan
+
+    def execute(self, plan: QueryPlan, budget: float = None,
+                max_workers: int = 8, on_result=None) -> dict:
+        """
+        Run a plan, stopping dispatch when the budget is reached.
+
+        Requests are dispatched in plan order, the first one that does not
+        fit on the remaining budget and all after it are skipped. The price
+        of a request is reserved when it is dispatched, so spend never goes
+        over the budget even with concurrent requests. Requests that fail
+        keep their reservation, since the API may charge them. Cached pairs
+        that expired after planning are dispatched first as requests with
+        their price.
+
+        Args:
+            plan [QueryPlan]: Plan built by `plan`.
+        Kwargs:
+            budget [float]: Maximum spend of the run, None for no limit.
+            max_workers [int]: Number of concurrent requests.
+            on_result [callable]: Called with `(document, dataset, result)`
+                for each result, including cached ones. If not set results
+                are returned on the report.
+        Return [dict]:
+            Report with `ran`, `failed` and `skipped` (document, dataset)
+            pairs, `cached` pairs, `spent` and `budget`. Results are on
+            `results` keyed by (document, dataset) when `on_result` is not
+            set.
+        """
+        api = self.bigdata_api
+        entity = plan.entity
+        report = {
+            "ran": [], "failed": [], "skipped": [], "cached": [],
+            "spent": 0.0, "budget": budget}
+        if on_result is None:
+            report["results"] = {}
+
+            def on_result(document, dataset, result):
+                report["results"][(document, dataset)] = result
+
+        lock = threading.Lock()
+
+        items = []
+        for document, dataset in plan.cached:
+            cached = api._get_cached(
+                entity=entity,
+                endpoint=api._dataset_url(entity=entity, dataset=dataset),
+                document=api._document_key(entity, document),
+                dataset=dataset)
+            if cached is None:
+                items.append(
+                    (document, [dataset], self._get_price(entity, dataset)))
+                continue
+            report["cached"].append((document, dataset))
+            cached = api._wrap_results({dataset: cached})[dataset]
+            on_result(document, dataset, cached)
+        items.extend(plan.items)
+
+        def dispatch():
+            for i, (document, datasets, price) in enumerate(items):
+                with lock:
+                    if budget is not None and \
+                            report["spent"] + price > budget:
+                        report["skipped"].extend(
+                            (skipped, db)
+                            for skipped, dbs, _ in items[i:]
+                            for db in dbs)
+                        return
+                    report["spent"] += price
+                yield document, datasets
+
+        def fetch(item):
+            document, datasets = item
+            return api._fetch_datasets(
+                entity=entity, document=document, datasets=datasets,
+                raise_errors=False, deadline=api._get_deadline())
+
+        for (document, datasets), results in iter_bulk(
+                fetch, dispatch(), max_workers=max_workers):
+            for dataset in datasets:
+                if isinstance(results, Exception):
+                    result = results
+                else:
+                    result = results[dataset]
+                if isinstance(result, Exception):
+                    report["failed"].append((document, dataset))
+                else:
+                    report["ran"].append((document, dataset))
+                on_result(document, dataset, result)
+        return report
+
+    def run(self, entity: str, documents, datasets: list,
+            budget: float = None, max_workers: int = 8,
+            single_request: bool = False, on_result=None) -> dict:
+        """
+        Plan and execute queries, see `plan` and `execute`.
+
+        Return [dict]:
+            Execution report with the plan `summary` on `plan`.
+        """
+        plan = self.plan(
+            entity=entity, documents=documents, datasets=datasets,
+            single_request=single_request)
+        report = self.execute(
+            plan, budget=budget, max_workers=max_workers,
+            on_result=on_result)
+        report["plan"] = plan.summary()
+        return report
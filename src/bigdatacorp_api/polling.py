@@ -0,0 +1,471 @@
+"""Submit queries asynchronously and poll their results in batches."""
+import time
+import heapq
+import itertools
+from collections import deque
+from bigdatacorp_api.status import check_login_status, get_status_exception
+from bigdatacorp_api.exceptions import (
+    BigDataCorpAPIException, BigDataCorpAPIMonitoringAPIException,
+    BigDataCorpAPITimeoutException, BigDataCorpAPIMaxRetryException,
+    BigDataCorpAPICircuitOpenException)
+
+
+class AsyncQueryContract:
+    """
+    Fields and end-points of the asynchronous query API.
+
+    Queries are submitted to the dataset end-point with `submit_fields`
+    added to the payload, the response has the job id on `id_field`. The
+    state of many jobs is read posting their ids on `ids_field` to the
+    `status_endpoint` of the registry, the response has a list of jobs on
+    `jobs_field`, each one with `id_field`, `state_field` and, when done,
+    the usual BigData response on `result_field`.
+
+    There is no default contract, set the fields and register the status
+    end-point following the contract of your BigDataCorp account. The
+    contract of the local mock server is returned by
+    `MockBigDataServer.async_contract`.
+    """
+
+    def __init__(self, submit_fields: dict, status_endpoint: str,
+                 id_field: str, ids_field: str, jobs_field: str,
+                 state_field: str, result_field: str, done_states: tuple,
+                 failed_states: tuple):
+        """
+        __init__.
+
+        Args:
+            submit_fields [dict]: Fields added to the query payload to
+                submit it asynchronously.
+            status_endpoint [str]: Name of the job status end-point on the
+                client registry, see `DatasetRegistry.set_endpoint`.
+            id_field [str]: Job id on submit responses and status entries.
+            ids_field [str]: List of job ids on status payloads.
+            jobs_field [str]: List of job entries on status responses.
+            state_field [str]: State of a job entry.
+            result_field [str]: BigData response of a finished job entry.
+            done_states [tuple[str]]: States of finished jobs.
+            failed_states [tuple[str]]: States of jobs that will not
+                finish, other states are polled again.
+        """
+        self.submit_fields = dict(submit_fields)
+        self.status_endpoint = status_endpoint
+        self.id_field = id_field
+        self.ids_field = ids_field
+        self.jobs_field = jobs_field
+        self.state_field = state_field
+        self.result_field = result_field
+        self.done_states = tuple(done_states)
+        self.failed_states = tuple(failed_states)
+
+
+class AsyncQueryJob:
+    """Datasets of a document submitted on one asynchronous query."""
+
+    __slots__ = (
+        "query_id", "entity", "document", "datasets", "url", "submitted_at",
+        "next_poll", "interval", "polls", "results")
+
+    def __init__(self, query_id: str, entity: str, document: str,
+                 datasets: list, url: str, submitted_at: float,
+                 interval: float):
+        self.query_id = query_id
+        self.entity = entity
+        self.document = document
+        self.datasets = list(datasets)
+        self.url = url
+        self.submitted_at = submitted_at
+        self.next_poll = submitted_at + interval
+        self.interval = interval
+        self.polls = 0
+        self.results = None
+
+    @property
+    def done(self) -> bool:
+        """True if results (or errors) of the job are avaiable."""
+        return self.results is not None
+
+    def __repr__(self):
+        return (
+            "AsyncQueryJob(query_id={!r}, entity={!r}, datasets={!r}, "
+            "polls={}, done={})").format(
+            self.query_id, self.entity, self.datasets, self.polls,
+            self.done)
+
+
+class PollingScheduler:
+    """
+    Submit queries without waiting for them and collect results in batches.
+
+    Submitting returns as soon as BigData registers the query, so slow
+    on-demand datasets do not hold a connection and a worker while they
+    are processed. Pending jobs are kept on a heap by next poll time, each
+    poll asks the state of up to `batch_size` due jobs with one request.
+    The poll interval of a job grows by `poll_backoff` each time it is
+    still pending, up to `max_poll_interval`.
+
+    Responses of finished jobs are checked as synchronous ones and stored
+    on the client caches. Errors are returned as results.
+
+    Example:
+        scheduler = PollingScheduler(bigdata_api, contract, batch_size=200)
+        results = scheduler.run("cpf", cpfs, ["processes"])
+        for cpf, dataset, result in results:
+            ...
+    """
+
+    def __init__(self, bigdata_api, contract: AsyncQueryContract,
+                 poll_interval: float = 1.0, poll_backoff: float = 1.5,
+                 max_poll_interval: float = 30.0, batch_size: int = 100,
+                 max_pending: int = 1000, job_timeout: float = 3600.0,
+                 poll_window: float = None, clock=time.monotonic,
+                 sleep=time.sleep):
+        """
+        __init__.
+
+        Args:
+            bigdata_api [BigDataCorpAPI]: Client used on requests, its
+                transport, retry policy, rate limiter, circuit breaker and
+                caches are used.
+            contract [AsyncQueryContract]: Fields and end-points of the
+                asynchronous API.
+        Kwargs:
+            poll_interval [float]: Seconds between the submit and the first
+                poll of a job.
+            poll_backoff [float]: Multiplier of the poll interval each time
+                a job is still pending.
+            max_poll_interval [float]: Maximum seconds between polls of a
+                job.
+            batch_size [int]: Maximum number of jobs on a poll request.
+            max_pending [int]: Maximum number of jobs waiting for results
+                on `run`, new documents are submitted as jobs finish.
+            job_timeout [float]: Seconds after the submit a job is given up
+                with `BigDataCorpAPITimeoutException`, None for no limit.
+            poll_window [float]: Jobs due up to this many seconds after the
+                first due one are polled on the same request, default to
+                half of `poll_interval`.
+            clock [callable]: Function returning current time in seconds.
+            sleep [callable]: Function used to wait for the next poll.
+        """
+        self.bigdata_api = bigdata_api
+        self.contract = contract
+        self.poll_interval = poll_interval
+        self.poll_backoff = poll_backoff
+        self.max_poll_interval = max_poll_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.job_timeout = job_timeout
+        self.poll_window = poll_interval / 2 if poll_window is None \
+            else poll_window
+        self._clock = clock
+        self._sleep = sleep
+        self._heap = []
+        self._finished = deque()
+        self._counter = itertools.count()
+        self.stats = {"submitted": 0, "polls": 0, "done": 0, "failed": 0}
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs waiting for results."""
+        return len(self._heap)
+
+    def _request(self, url: str, payload: dict) -> dict:
+        """
+        Post a payload with the client retry policy.
+
+        Args:
+            url [str]: End-point url.
+            payload [dict]: Request payload.
+        Return [dict]:
+            Decoded response.
+        Raise:
+            BigDataCorpAPIException: If login expired, the error is not
+                retryable or all attempts failed.
+        """
+        api = self.bigdata_api
+        policy = api._retry_policy
+        error_msgs = []
+        for attempt in range(policy.max_attempts):
+            try:
+                api._before_request(url)
+                api._acquire(url)
+                response = api._transport.post(
+                    url, json=payload, headers=api._headers(),
+                    timeout=api._request_timeout())
+                response.raise_for_status()
+                response_json = api._json_decoder(response.content)
+                check_login_status(response_json.get("Status", {}))
+                api._record_request(url, response_json={
+                    "Status": response_json.get("Status") or {}})
+                return response_json
+            except Exception as e:
+                api._record_request(url, exception=e)
+                api._register_error(exception=e, error_msgs=error_msgs)
+                if attempt + 1 < policy.max_attempts:
+                    self._sleep(policy.get_delay(attempt, e))
+        raise api._max_retry_exception(error_msgs)
+
+    def _finish(self, job: AsyncQueryJob, results: dict):
+        job.results = self.bigdata_api._wrap_results(results)
+        failed = any(isinstance(r, Exception) for r in results.values())
+        self.stats["failed" if failed else "done"] += 1
+        self._finished.append(job)
+
+    def _fail(self, job: AsyncQueryJob, exception: Exception):
+        self._finish(job, {dataset: exception for dataset in job.datasets})
+
+    def _submit_group(self, entity: str, document: str,
+                      datasets: list) -> AsyncQueryJob:
+        """Submit datasets that share an end-point as one job."""
+        api = self.bigdata_api
+        url = api._dataset_url(entity=entity, dataset=datasets[0])
+        job = AsyncQueryJob(
+            query_id=None, entity=entity, document=document,
+            datasets=datasets, url=url, submitted_at=self._clock(),
+            interval=self.poll_interval)
+        try:
+            normalized = api._check_document(entity=entity, document=document)
+            payload = {
+                "Datasets": ",".join(datasets),
+                "q": api._dataset_query(
+                    entity=entity, dataset=datasets[0], document=normalized),
+                "Limit": 1}
+            payload.update(self.contract.submit_fields)
+            response_json = self._request(url, payload)
+        except BigDataCorpAPIException as e:
+            self._fail(job, e)
+            return job
+
+        # Datasets refused on submit are not polled
+        status_data = response_json.get("Status", {})
+        errors = {}
+        for dataset in datasets:
+            entries = status_data.get(dataset)
+            if entries:
+                exception = get_status_exception(
+                    status=entries[0], payload={
+                        api._ENTITY_PAYLOAD_KEYS.get(entity, entity):
+                            document,
+                        "dataset": dataset})
+                if exception is not None:
+                    errors[dataset] = exception
+        job.query_id = response_json.get(self.contract.id_field)
+        if job.query_id is None:
+            for dataset in datasets:
+                errors.setdefault(
+                    dataset, BigDataCorpAPIMonitoringAPIException(
+                        message="asynchronous query was not registered",
+                        payload={"url": url, "datasets": datasets}))
+        if errors:
+            if len(errors) < len(datasets):
+                # Keep polling datasets that were accepted
+                job.datasets = [db for db in datasets if db not in errors]
+                self._finish(AsyncQueryJob(
+                    query_id=job.query_id, entity=entity, document=document,
+                    datasets=list(errors), url=url,
+                    submitted_at=job.submitted_at, interval=job.interval),
+                    errors)
+            else:
+                self._finish(job, errors)
+                return job
+
+        self.stats["submitted"] += 1
+        heapq.heappush(self._heap, (job.next_poll, next(self._counter), job))
+        return job
+
+    def submit(self, entity: str, document: str, datasets: list,
+               single_request: bool = True) -> list:
+        """
+        Submit datasets of a document without waiting for results.
+
+        Args:
+            entity [str]: One of `cpf`, `cnpj` or `process`.
+            document [str]: Document to be queried.
+            datasets [list[str]]: Datasets to be fetched.
+        Kwargs:
+            single_request [bool]: If set true datasets are grouped by
+                end-point and submitted with one request for each group.
+        Return [list[AsyncQueryJob]]:
+            Jobs submitted, jobs refused on submit are already done.
+        Raise:
+            BigDataCorpAPIException: If datasets are not avaiable for the
+                entity.
+        """
+        groups = self.bigdata_api._group_datasets(
+            entity=entity, datasets=datasets, single_request=single_request)
+        return [
+            self._submit_group(entity, document, group) for group in groups]
+
+    def _due_jobs(self) -> list:
+        """Wait for the next poll time and pop jobs that are due."""
+        wait = self._heap[0][0] - self._clock()
+        if wait > 0:
+            self._sleep(wait)
+        # Jobs due soon are polled now, so jobs submitted close together
+        # share requests
+        due = self._clock() + self.poll_window
+        jobs = []
+        while self._heap and len(jobs) < self.batch_size and \
+                self._heap[0][0] <= due:
+            jobs.append(heapq.heappop(self._heap)[2])
+        return jobs
+
+    def _reschedule(self, job: AsyncQueryJob, now: float):
+        if self.job_timeout is not None and \
+                now - job.submitted_at >= self.job_timeout:
+            self._fail(job, BigDataCorpAPITimeoutException(
+                message="asynchronous query not finished after {}s".format(
+                    self.job_timeout),
+                payload={
+                    "url": job.url, "datasets": job.datasets,
+                    "query_id": job.query_id, "polls": job.polls}))
+            return
+        job.interval = min(
+            job.interval * self.poll_backoff, self.max_poll_interval)
+        job.next_poll = now + job.interval
+        heapq.heappush(self._heap, (job.next_poll, next(self._counter), job))
+
+    def _handle_entry(self, job: AsyncQueryJob, entry: dict,
+                      now: float):
+        """Finish or reschedule a job from its status entry."""
+        api = self.bigdata_api
+        contract = self.contract
+        state = entry.get(contract.state_field)
+        response_json = entry.get(contract.result_field)
+        if state in contract.done_states or (
+                state in contract.failed_states and response_json):
+            try:
+                response_dict = api._check_responses(
+                    entity=job.entity, document=job.document,
+                    datasets=job.datasets, response_json=response_json,
+                    raise_errors=False)
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                self._fail(job, BigDataCorpAPIMonitoringAPIException(
+                    message="malformed asynchronous query result",
+                    payload={"query_id": job.query_id, "error": str(e)}))
+                return
+            cache_document = api._document_key(job.entity, job.document)
+            for dataset, response in response_dict.items():
+                if not isinstance(response, Exception):
+                    api._set_cached(
+                        entity=job.entity, endpoint=job.url,
+                        document=cache_document, dataset=dataset,
+                        response=response)
+            self._finish(job, response_dict)
+        elif state in contract.failed_states:
+            self._fail(job, BigDataCorpAPIMonitoringAPIException(
+                message="asynchronous query {}".format(state).lower(),
+                payload={
+                    "query_id": job.query_id, "state": state,
+                    "datasets": job.datasets}))
+        else:
+            self._reschedule(job, now)
+
+    def poll(self) -> list:
+        """
+        Poll one batch of due jobs, waiting until a job is due.
+
+        Jobs are given back to the heap if the poll request fails.
+
+        Return [list[AsyncQueryJob]]:
+            Jobs finished since the last call, including jobs refused on
+            submit.
+        Raise:
+            BigDataCorpAPIException: If the poll fails with an error that
+                is not transient, ex.: login expired. Retries exhausted and
+                open circuits only delay the jobs.
+        """
+        if self._heap:
+            jobs = self._due_jobs()
+            contract = self.contract
+            url = self.bigdata_api.registry.get_endpoint(
+                contract.status_endpoint)
+            for job in jobs:
+                job.polls += 1
+            self.stats["polls"] += 1
+            try:
+                response_json = self._request(url, {
+                    contract.ids_field: [job.query_id for job in jobs]})
+                entries = {
+                    entry.get(contract.id_field): entry
+                    for entry in response_json.get(contract.jobs_field, [])}
+            except (BigDataCorpAPIMaxRetryException,
+                    BigDataCorpAPICircuitOpenException):
+                entries = {}
+            except BigDataCorpAPIException:
+                for job in jobs:
+                    heapq.heappush(
+                        self._heap, (job.next_poll, next(self._counter), job))
+                raise
+            now = self._clock()
+            for job in jobs:
+                entry = entries.get(job.query_id)
+                if entry is None:
+                    self._reschedule(job, now)
+                else:
+                    self._handle_entry(job, entry, now)
+
+        finished = list(self._finished)
+        self._finished.clear()
+        return finished
+
+    @staticmethod
+    def _job_results(job: AsyncQueryJob):
+        for dataset in job.datasets:
+            yield job.document, dataset, job.results[dataset]
+
+    def iter_results(self):
+        """
+        Poll until all submitted jobs are finished.
+
+        Return [generator]:
+            Yield `(document, dataset, result)` as jobs finish, result is
+            the exception object if an error occoured.
+        """
+        while self._heap or self._finished:
+            for job in self.poll():
+                yield from self._job_results(job)
+
+    def run(self, entity: str, documents, datasets: list,
+            single_request: bool = True):
+        """
+        Submit documents and stream results as they finish.
+
+        Documents are consumed lazily, at most `max_pending` jobs wait for
+        results or to be yielded at any time.
+
+        Args:
+            entity [str]: One of `cpf`, `cnpj` or `process`.
+            documents [iterable[str]]: Documents to be queried.
+            datasets [list[str]]: Datasets to be fetched for each document.
+        Kwargs:
+            single_request [bool]: If set true datasets of a document are
+                grouped by end-point and submitted with one request for
+                each group.
+        Return [generator]:
+            Yield `(document, dataset, result)` as jobs finish, result is
+            the exception object if an error occoured.
+        """
+        groups = self.bigdata_api._group_datasets(
+            entity=entity, datasets=datasets, single_request=single_request)
+        documents = iter(documents)
+        exhausted = False
+        while True:
+            # Jobs refused on submit count until yielded, so failing
+            # documents are streamed instead of piling up
+            while not exhausted and \
+                    len(self._heap) + len(self._finished) < self.max_pending:
+                try:
+                    document = next(documents)
+                except StopIteration:
+                    exhausted = True
+                    break
+                for group in groups:
+                    self._submit_group(entity, document, group)
+
+            if not self._heap and not self._finished:
+                if exhausted:
+                    return
+                continue
+            for job in self.poll():
+                yield from self._job_results(job)
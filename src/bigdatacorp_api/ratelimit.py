@@ -0,0 +1,218 @@
+"""Client-side token bucket rate limiters for BigDataCorp end-points."""
+import time
+import sqlite3
+import threading
+
+
+class TokenBucketRateLimiter:
+    """
+    Thread-safe token bucket.
+
+    Tokens are added at `rate` per second up to `capacity`. Each request
+    takes one token, requests wait when the bucket is empty.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        __init__.
+
+        Args:
+            rate [float]: Tokens added per second (requests per second).
+        Kwargs:
+            capacity [float]: Maximum number of tokens (burst size), default
+                to `rate`.
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1, max_wait: float = None) -> float:
+        """
+        Take tokens from the bucket without blocking.
+
+        The bucket may become negative, the caller must wait the returned
+        time before sending the request.
+
+        Kwargs:
+            tokens [float]: Number of tokens to be taken.
+            max_wait [float]: If the wait is not shorter than `max_wait`
+                seconds the tokens are not taken and None is returned.
+        Return [float | None]:
+            Time in seconds to wait before using the tokens.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity,
+                self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            wait = max(tokens - self._tokens, 0.0) / self.rate
+            if max_wait is not None and wait >= max_wait:
+                return None
+            self._tokens -= tokens
+            return wait
+
+    def acquire(self, tokens: float = 1):
+        """
+        Block until tokens are avaiable.
+
+        Kwargs:
+            tokens [float]: Number of tokens to be taken.
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+
+class SQLiteTokenBucketRateLimiter:
+    """
+    Token bucket shared by processes of the same host using SQLite.
+
+    Bucket state is kept on a SQLite database and updated inside an
+    immediate transaction, so all processes using the same `path` and
+    `name` share the same quota.
+    """
+
+    def __init__(self, path: str, rate: float, capacity: float = None,
+                 name: str = "default"):
+        """
+        __init__.
+
+        Args:
+            path [str]: Path of the SQLite database file.
+            rate [float]: Tokens added per second (requests per second).
+        Kwargs:
+            capacity [float]: Maximum number of tokens (burst size), default
+                to `rate`.
+            name [str]: Name of the bucket, allow many buckets on the same
+                database.
+        """
+        self.path = path
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.name = name
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None,
+            timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bigdata_rate_limit ("
+            " name TEXT PRIMARY KEY,"
+            " tokens REAL NOT NULL,"
+            " updated_at REAL NOT NULL)")
+
+    def reserve(self, tokens: float = 1, max_wait: float = None) -> float:
+        """
+        Take tokens from the bucket without blocking.
+
+        Kwargs:
+            tokens [float]: Number of tokens to be taken.
+            max_wait [float]: If the wait is not shorter than `max_wait`
+                seconds the tokens are not taken and None is returned.
+        Return [float | None]:
+            Time in seconds to wait before using the tokens.
+        """
+        with self._lock:
+            now = time.time()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated_at FROM bigdata_rate_limit "
+                    "WHERE name = ?", (self.name, )).fetchone()
+                if row is None:
+                    available = self.capacity
+                else:
+                    available = min(
+                        self.capacity,
+                        row[0] + max(now - row[1], 0) * self.rate)
+                wait = max(tokens - available, 0.0) / self.rate
+                if max_wait is not None and wait >= max_wait:
+                    self._conn.execute("ROLLBACK")
+                    return None
+                available -= tokens
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO bigdata_rate_limit "
+                    "(name, tokens, updated_at) VALUES (?, ?, ?)",
+                    (self.name, available, now))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    def acquire(self, tokens: float = 1):
+        """
+        Block until tokens are avaiable.
+
+        Kwargs:
+            tokens [float]: Number of tokens to be taken.
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class EndpointRateLimiter:
+    """
+    Rate limiters for each end-point url.
+
+    End-points without a limiter use `default`, if it is None requests to
+    them are not limited.
+    """
+
+    def __init__(self, limiters: dict = None, default=None):
+        """
+        __init__.
+
+        Kwargs:
+            limiters [dict]: Limiter for each end-point url, ex.:
+                `{BigDataCorpAPI.PEOPLE_URL: TokenBucketRateLimiter(10)}`.
+            default [TokenBucketRateLimiter]: Limiter used by end-points
+                not in `limiters`.
+        """
+        self.limiters = dict(limiters or {})
+        self.default = default
+
+    def get_limiter(self, endpoint: str):
+        """Return the limiter of an end-point or None."""
+        return self.limiters.get(endpoint, self.default)
+
+    def reserve(self, endpoint: str, tokens: float = 1,
+                max_wait: float = None) -> float:
+        """
+        Take tokens for an end-point without blocking.
+
+        Args:
+            endpoint [str]: End-point url.
+        Kwargs:
+            tokens [float]: Number of tokens to be taken.
+            max_wait [float]: If the wait is not shorter than `max_wait`
+                seconds the tokens are not taken and None is returned.
+        Return [float | None]:
+            Time in seconds to wait before sending the request.
+        """
+        limiter = self.get_limiter(endpoint)
+        if limiter is None:
+            return 0.0
+        return limiter.reserve(tokens, max_wait=max_wait)
+
+    def acquire(self, endpoint: str, tokens: float = 1):
+        """
+        Block until the end-point has tokens avaiable.
+
+        Args:
+            endpoint [str]: End-point url.
+        Kwargs:
+            tokens [float]: Number of tokens to be taken.
+        """
+        wait = self.reserve(endpoint, tokens)
+        if wait > 0:
+            time.sleep(wait)
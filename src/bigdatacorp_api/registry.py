@@ -0,0 +1,271 @@
+"""Registry of BigData datasets with end-point routing metadata."""
+import threading
+from urllib.parse import urlsplit
+from bigdatacorp_api.cache import HOUR, DAY
+from bigdatacorp_api.exceptions import BigDataCorpAPIException
+
+
+ENDPOINTS = {
+    "people": "https://bigboost.bigdatacorp.com.br/peoplev2",
+    "companies": "https://bigboost.bigdatacorp.com.br/companies",
+    "marketplace": "https://plataforma.bigdatacorp.com.br/marketplace",
+    "processes": "https://plataforma.bigdatacorp.com.br/processos",
+    "usage": "https://plataforma.bigdatacorp.com.br/usage"}
+
+# Values used when a dataset is registered without them
+ENTITY_DEFAULTS = {
+    "cpf": {
+        "endpoint": "people", "query_prefix": "doc", "usage_api": "people"},
+    "cnpj": {
+        "endpoint": "companies", "query_prefix": "doc",
+        "usage_api": "companies"},
+    "process": {
+        "endpoint": "processes", "query_prefix": "processnumber",
+        "usage_api": None}}
+
+# Default cache time to live in seconds, datasets not listed use the
+# `default_ttl` of the cache
+DATASET_TTLS = {
+    "basic_data": 30 * DAY,
+    "registration_data": 30 * DAY,
+    "historical_basic_data": 30 * DAY,
+    "demographic_data": 30 * DAY,
+    "processes": 6 * HOUR,
+    "owners_lawsuits": 6 * HOUR,
+    "kyc": 6 * HOUR,
+    "owners_kyc": 6 * HOUR,
+}
+
+
+class DatasetSpec:
+    """Routing metadata of an entity dataset."""
+
+    __slots__ = (
+        "entity", "dataset", "endpoint", "query_prefix", "price_tier",
+        "ttl", "usage_api")
+
+    def __init__(self, entity: str, dataset: str, endpoint: str,
+                 query_prefix: str, price_tier: str = "standard",
+                 ttl: float = None, usage_api: str = None):
+        """
+        __init__.
+
+        Args:
+            entity [str]: Entity type, ex.: `cpf`, `cnpj` or `process`.
+            dataset [str]: Dataset name.
+            endpoint [str]: Name of the end-point on the registry, ex.:
+                `people`.
+            query_prefix [str]: Prefix of the query, ex.: `doc` for
+                `doc{00000000000}`.
+        Kwargs:
+            price_tier [str]: Price tier of the dataset.
+            ttl [float]: Default cache time to live in seconds, used by
+                the client caches. None to use the cache default.
+            usage_api [str]: `Api` used to query usage of the dataset on
+                `/usage`, None if usage is not queried.
+        """
+        self.entity = entity
+        self.dataset = dataset
+        self.endpoint = endpoint
+        self.query_prefix = query_prefix
+        self.price_tier = price_tier
+        self.ttl = ttl
+        self.usage_api = usage_api
+
+    def format_query(self, document: str) -> str:
+        """Return the BigData query of a document."""
+        return "{}{{{}}}".format(self.query_prefix, document)
+
+    def __repr__(self):
+        return (
+            "DatasetSpec(entity={!r}, dataset={!r}, endpoint={!r}, "
+            "query_prefix={!r}, price_tier={!r}, ttl={!r}, "
+            "usage_api={!r})").format(
+            self.entity, self.dataset, self.endpoint, self.query_prefix,
+            self.price_tier, self.ttl, self.usage_api)
+
+
+class DatasetRegistry:
+    """
+    Index of datasets by entity with the end-point used to fetch them.
+
+    Lookups are dictionary based, datasets can be registered at runtime
+    and end-point urls changed without subclassing the client.
+    """
+
+    def __init__(self, endpoints: dict = None):
+        """
+        __init__.
+
+        Kwargs:
+            endpoints [dict[str, str]]: Url of each end-point name, updates
+                `ENDPOINTS`.
+        """
+        self._endpoints = dict(ENDPOINTS)
+        self._endpoints.update(endpoints or {})
+        self._by_entity = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_lists(cls, cpf_datasets: list, cnpj_datasets: list,
+                   process_datasets: list, marketplace_datasets: list = (),
+                   endpoints: dict = None):
+        """
+        Build a registry from lists of datasets of each entity.
+
+        Args:
+            cpf_datasets [list[str]]: Datasets of people.
+            cnpj_datasets [list[str]]: Datasets of companies.
+            process_datasets [list[str]]: Datasets of processes.
+        Kwargs:
+            marketplace_datasets [list[str]]: CNPJ datasets fetched on
+                the marketplace end-point.
+            endpoints [dict[str, str]]: Url of each end-point name.
+        Return [DatasetRegistry]:
+            New registry.
+        """
+        registry = cls(endpoints=endpoints)
+        for dataset in cpf_datasets:
+            registry.register("cpf", dataset)
+        for dataset in cnpj_datasets:
+            if dataset in marketplace_datasets:
+                registry.register(
+                    "cnpj", dataset, endpoint="marketplace",
+                    price_tier="marketplace")
+            else:
+                registry.register("cnpj", dataset)
+        for dataset in process_datasets:
+            registry.register("process", dataset)
+        return registry
+
+    def register(self, entity: str, dataset: str, endpoint: str = None,
+                 query_prefix: str = None, price_tier: str = "standard",
+                 ttl: float = None, usage_api: str = "default") -> DatasetSpec:
+        """
+        Register a dataset, replacing it if already registered.
+
+        Args:
+            entity [str]: Entity type, ex.: `cpf`, `cnpj` or `process`.
+            dataset [str]: Dataset name.
+        Kwargs:
+            endpoint [str]: End-point name, default to the entity
+                end-point.
+            query_prefix [str]: Query prefix, default to the entity prefix.
+            price_tier [str]: Price tier of the dataset.
+            ttl [float]: Default cache time to live in seconds, default to
+                `DATASET_TTLS`.
+            usage_api [str]: `Api` of the `/usage` end-point, default to the
+                entity one.
+        Return [DatasetSpec]:
+            Registered spec.
+        Raise:
+            BigDataCorpAPIException: If end-point or query prefix are not
+                set for an entity without defaults, or end-point is not
+                known.
+        """
+        defaults = ENTITY_DEFAULTS.get(entity, {})
+        endpoint = endpoint or defaults.get("endpoint")
+        query_prefix = query_prefix or defaults.get("query_prefix")
+        if usage_api == "default":
+            usage_api = defaults.get("usage_api")
+        if endpoint is None or query_prefix is None:
+            raise BigDataCorpAPIException(
+                "endpoint and query_prefix must be set for entity "
+                "[{}]".format(entity))
+        if endpoint not in self._endpoints:
+            raise BigDataCorpAPIException(
+                "endpoint [{}] not registered, use `set_endpoint`".format(
+                    endpoint))
+        if ttl is None:
+            ttl = DATASET_TTLS.get(dataset)
+
+        spec = DatasetSpec(
+            entity=entity, dataset=dataset, endpoint=endpoint,
+            query_prefix=query_prefix, price_tier=price_tier, ttl=ttl,
+            usage_api=usage_api)
+        with self._lock:
+            datasets = dict(self._by_entity.get(entity, {}))
+            datasets[dataset] = spec
+            self._by_entity[entity] = datasets
+        return spec
+
+    def unregister(self, entity: str, dataset: str):
+        """Remove a dataset from the registry."""
+        with self._lock:
+            datasets = dict(self._by_entity.get(entity, {}))
+            datasets.pop(dataset, None)
+            self._by_entity[entity] = datasets
+
+    def set_endpoint(self, name: str, url: str):
+        """Set the url of an end-point."""
+        with self._lock:
+            self._endpoints[name] = url
+
+    def rebase(self, base_url: str):
+        """
+        Point all end-points to another host keeping their paths.
+
+        Used to send requests to a proxy or to a local stand-in server, ex.:
+        `rebase("http://127.0.0.1:8080")` routes `people` to
+        `http://127.0.0.1:8080/peoplev2`.
+
+        Args:
+            base_url [str]: Scheme and host of the new base url.
+        """
+        base_url = base_url.rstrip("/")
+        with self._lock:
+            for name, url in self._endpoints.items():
+                path = urlsplit(url).path
+                self._endpoints[name] = base_url + path
+
+    def get_endpoint(self, name: str) -> str:
+        """Return the url of an end-point."""
+        return self._endpoints[name]
+
+    def has(self, entity: str, dataset: str) -> bool:
+        """Return True if the dataset is registered for the entity."""
+        return dataset in self._by_entity.get(entity, {})
+
+    def get(self, entity: str, dataset: str) -> DatasetSpec:
+        """
+        Return the spec of an entity dataset.
+
+        Args:
+            entity [str]: Entity type.
+            dataset [str]: Dataset name.
+        Return [DatasetSpec]:
+            Dataset spec.
+        Raise:
+            BigDataCorpAPIException: If dataset is not registered.
+        """
+        spec = self._by_entity.get(entity, {}).get(dataset)
+        if spec is None:
+            raise BigDataCorpAPIException(
+                "dataset [{}] not registered for [{}]".format(
+                    dataset, entity))
+        return spec
+
+    def get_url(self, entity: str, dataset: str) -> str:
+        """Return the end-point url of an entity dataset."""
+        return self._endpoints[self.get(entity, dataset).endpoint]
+
+    def datasets(self, entity: str) -> list:
+        """Return the datasets of an entity in registration order."""
+        return list(self._by_entity.get(entity, {}).keys())
+
+    def specs(self, entity: str = None) -> list:
+        """Return specs of an entity or of all entities."""
+        entities = [entity] if entity is not None else list(self._by_entity)
+        return [
+            spec for name in entities
+            for spec in self._by_entity.get(name, {}).values()]
+
+    def copy(self):
+        """Return an independent copy of the registry."""
+        registry = DatasetRegistry(endpoints=self._endpoints)
+        for spec in self.specs():
+            registry.register(
+                spec.entity, spec.dataset, endpoint=spec.endpoint,
+                query_prefix=spec.query_prefix, price_tier=spec.price_tier,
+                ttl=spec.ttl, usage_api=spec.usage_api)
+        return registry
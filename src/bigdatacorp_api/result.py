@@ -0,0 +1,170 @@
+"""Compact dataset results with lazily decoded sections."""
+from bigdatacorp_api.decode import loads, dumps
+
+
+class DatasetResult:
+    """
+    Response of a dataset keeping each section as encoded JSON.
+
+    Sections of the result (`BasicData`, `Processes`, ...) are kept as
+    compact JSON bytes and decoded only on first access, the decoded value
+    is kept for later accesses. Envelope fields are kept decoded. Returned
+    by clients created with `lazy_results=True`.
+
+    The object can be read as the original response with `result["Result"]`
+    or `to_dict`, which decodes all sections.
+    """
+
+    __slots__ = (
+        "dataset", "match_keys", "query_id", "elapsed_milliseconds",
+        "status", "_sections", "_decoded")
+
+    def __init__(self, dataset: str, sections: dict, status: list = None,
+                 match_keys: str = None, query_id: str = None,
+                 elapsed_milliseconds: int = None):
+        """
+        __init__.
+
+        Args:
+            dataset [str]: Dataset name.
+            sections [dict[str, bytes]]: Encoded JSON of each section of
+                the result.
+        Kwargs:
+            status [list[dict]]: Status entries of the dataset.
+            match_keys [str]: Query matched, ex.: `doc{00000000000}`.
+            query_id [str]: Id of the BigData query.
+            elapsed_milliseconds [int]: Time spent on the query by BigData.
+        """
+        self.dataset = dataset
+        self.match_keys = match_keys
+        self.query_id = query_id
+        self.elapsed_milliseconds = elapsed_milliseconds
+        self.status = status or []
+        self._sections = sections
+        self._decoded = None
+
+    @classmethod
+    def from_response(cls, dataset: str, response_json: dict,
+                      encoded: dict = None):
+        """
+        Build a result from a decoded dataset response.
+
+        Args:
+            dataset [str]: Dataset name.
+            response_json [dict]: Decoded BigData response of the dataset.
+        Kwargs:
+            encoded [dict]: Encoded sections by id of the result, responses
+                split from the same request share their `Result`, so its
+                sections are encoded once and the bytes are shared.
+        Return [DatasetResult]:
+            Result with the sections encoded.
+        """
+        results = response_json.get("Result") or []
+        first = results[0] if results else {}
+        if encoded is None or not first:
+            encoded = {}
+        sections = encoded.get(id(first))
+        if sections is None:
+            sections = encoded[id(first)] = {
+                key: dumps(value) for key, value in first.items()
+                if key != "MatchKeys"}
+        return cls(
+            dataset=dataset,
+            sections=dict(sections),
+            status=response_json.get("Status", {}).get(dataset),
+            match_keys=first.get("MatchKeys"),
+            query_id=response_json.get("QueryId"),
+            elapsed_milliseconds=response_json.get("ElapsedMilliseconds"))
+
+    @property
+    def sections(self) -> list:
+        """Names of the sections of the result."""
+        return list(self._sections.keys())
+
+    @property
+    def is_empty(self) -> bool:
+        """True if BigData returned no result for the query."""
+        return self.match_keys is None and not self._sections
+
+    def section(self, name: str, default=None):
+        """
+        Return a decoded section of the result.
+
+        Args:
+            name [str]: Section name, ex.: `BasicData`.
+        Kwargs:
+            default: Value returned if result has no section `name`.
+        Return:
+            Decoded section.
+        """
+        if self._decoded is not None and name in self._decoded:
+            return self._decoded[name]
+        encoded = self._sections.get(name)
+        if encoded is None:
+            return default
+        if self._decoded is None:
+            self._decoded = {}
+        value = self._decoded[name] = loads(encoded)
+        return value
+
+    @property
+    def basic_data(self) -> dict:
+        """`BasicData` section or None."""
+        return self.section("BasicData")
+
+    @property
+    def processes(self) -> dict:
+        """`Processes` section or None."""
+        return self.section("Processes")
+
+    @property
+    def lawsuits(self) -> list:
+        """Lawsuits of the `Processes` section."""
+        return (self.processes or {}).get("Lawsuits") or []
+
+    @property
+    def addresses(self) -> list:
+        """Addresses of the `ExtendedAddresses` section."""
+        return (self.section("ExtendedAddresses") or {}).get(
+            "Addresses") or []
+
+    @property
+    def phones(self) -> list:
+        """Phones of the `ExtendedPhones` section."""
+        return (self.section("ExtendedPhones") or {}).get("Phones") or []
+
+    def to_dict(self) -> dict:
+        """Return the result as the original BigData response."""
+        results = []
+        if not self.is_empty:
+            first = {"MatchKeys": self.match_keys}
+            for name in self._sections:
+                first[name] = self.section(name)
+            results.append(first)
+        return {
+            "Result": results,
+            "QueryId": self.query_id,
+            "ElapsedMilliseconds": self.elapsed_milliseconds,
+            "Status": {self.dataset: self.status}}
+
+    def __getitem__(self, key: str):
+        if key == "Status":
+            return {self.dataset: self.status}
+        if key == "QueryId":
+            return self.query_id
+        if key == "ElapsedMilliseconds":
+            return self.elapsed_milliseconds
+        if key == "Result":
+            return self.to_dict()["Result"]
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self):
+        return "DatasetResult(dataset={!r}, match_keys={!r}, " \
+            "sections={!r})".format(
+                self.dataset, self.match_keys, self.sections)
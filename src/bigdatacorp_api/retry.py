@@ -0,0 +1,177 @@
+"""Retry policy with exponential backoff for BigDataCorpAPI requests."""
+import random
+import asyncio
+import datetime
+import requests
+from email.utils import parsedate_to_datetime
+from bigdatacorp_api.exceptions import BigDataCorpAPIProblemAPIException
+
+try:
+    import aiohttp
+    _AIOHTTP_TRANSPORT_ERRORS = (
+        aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)
+except ImportError:  # pragma: no cover
+    _AIOHTTP_TRANSPORT_ERRORS = ()
+
+
+_TRANSPORT_ERRORS = (
+    requests.ConnectionError, requests.Timeout, ConnectionError,
+    TimeoutError, asyncio.TimeoutError) + _AIOHTTP_TRANSPORT_ERRORS
+
+
+def get_http_status(exception: Exception):
+    """Return the HTTP status code of a requests or aiohttp error."""
+    response = getattr(exception, "response", None)
+    if response is not None and getattr(response, "status_code", None):
+        return response.status_code
+    return getattr(exception, "status", None)
+
+
+def is_server_error(exception: Exception) -> bool:
+    """
+    Check if an error shows that the end-point is degraded.
+
+    Args:
+        exception [Exception]: Error raised by a request.
+    Return [bool]:
+        True for transport errors, HTTP 5xx and malformed responses.
+    """
+    status_code = get_http_status(exception)
+    if status_code is not None:
+        return status_code >= 500
+    return isinstance(exception, _TRANSPORT_ERRORS + (
+        ValueError, KeyError, IndexError, TypeError))
+
+
+def get_retry_after(exception: Exception):
+    """
+    Return the `Retry-After` header of an HTTP error in seconds.
+
+    Args:
+        exception [Exception]: requests or aiohttp HTTP error.
+    Return [float | None]:
+        Seconds to wait or None if header is not present or invalid.
+    """
+    response = getattr(exception, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is None:
+        headers = getattr(exception, "headers", None)
+    if not headers:
+        return None
+
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = datetime.datetime.now(tz=retry_at.tzinfo)
+    return max((retry_at - now).total_seconds(), 0.0)
+
+
+class RetryPolicy:
+    """
+    Define which errors are retried and how long to wait between attempts.
+
+    The delay of attempt `n` (starting at 0) is
+    `min(backoff_max, backoff_base * backoff_factor ** n)`, with full jitter
+    a random value between 0 and that delay is used. A `Retry-After` header
+    on 429/503 responses overrides the computed delay.
+
+    Transport errors (connection reset, timeouts) and HTTP status in
+    `retry_status_codes` are retried. Other HTTP errors are permanent.
+    Malformed responses (invalid JSON, missing `Status`) and BigData
+    internal problem status (-2000 to -2999) are retried only if
+    configured.
+    """
+
+    def __init__(self, max_attempts: int = 5, backoff_base: float = 1.0,
+                 backoff_factor: float = 2.0, backoff_max: float = 30.0,
+                 jitter: bool = True,
+                 retry_status_codes: tuple = (429, 500, 502, 503, 504),
+                 retry_malformed_response: bool = False,
+                 retry_problem_api: bool = False,
+                 respect_retry_after: bool = True,
+                 retry_after_max: float = 60.0):
+        """
+        __init__.
+
+        Kwargs:
+            max_attempts [int]: Maximum number of attempts, including the
+                first one.
+            backoff_base [float]: Delay in seconds after the first attempt.
+            backoff_factor [float]: Multiplier of the delay at each attempt.
+            backoff_max [float]: Maximum delay in seconds.
+            jitter [bool]: If set true, use a random delay between 0 and the
+                exponential delay (full jitter).
+            retry_status_codes [tuple[int]]: HTTP status codes that are
+                retried.
+            retry_malformed_response [bool]: If set true, retry responses
+                that are not valid JSON or miss dataset status.
+            retry_problem_api [bool]: If set true, retry BigData internal
+                problem status codes (-2000 to -2999).
+            respect_retry_after [bool]: If set true, use `Retry-After`
+                header as delay when present.
+            retry_after_max [float]: Maximum delay in seconds accepted from
+                `Retry-After` header.
+        """
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.retry_status_codes = tuple(retry_status_codes)
+        self.retry_malformed_response = retry_malformed_response
+        self.retry_problem_api = retry_problem_api
+        self.respect_retry_after = respect_retry_after
+        self.retry_after_max = retry_after_max
+
+    def is_retryable(self, exception: Exception) -> bool:
+        """
+        Check if an error raised by an attempt should be retried.
+
+        Args:
+            exception [Exception]: Error raised by the attempt.
+        Return [bool]:
+            True if the request should be retried.
+        """
+        if isinstance(exception, BigDataCorpAPIProblemAPIException):
+            return self.retry_problem_api
+
+        status_code = get_http_status(exception)
+        if status_code is not None:
+            return status_code in self.retry_status_codes
+
+        if isinstance(exception, (ValueError, KeyError, IndexError,
+                                  TypeError)):
+            return self.retry_malformed_response
+
+        return isinstance(exception, _TRANSPORT_ERRORS)
+
+    def get_delay(self, attempt: int, exception: Exception = None) -> float:
+        """
+        Return the time to wait before the next attempt.
+
+        Args:
+            attempt [int]: Number of the attempt that failed, starting at 0.
+        Kwargs:
+            exception [Exception]: Error raised by the attempt.
+        Return [float]:
+            Delay in seconds.
+        """
+        if self.respect_retry_after and exception is not None:
+            retry_after = get_retry_after(exception)
+            if retry_after is not None:
+                return min(retry_after, self.retry_after_max)
+
+        delay = min(
+            self.backoff_max,
+            self.backoff_base * self.backoff_factor ** attempt)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
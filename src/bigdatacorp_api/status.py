@@ -0,0 +1,135 @@
+"""Map BigDataCorp status codes to BigDataCorpAPI exceptions."""
+from bigdatacorp_api.exceptions import (
+    BigDataCorpAPIMinorDocumentException,
+    BigDataCorpAPIInvalidInputException,
+    BigDataCorpAPILoginProblemException,
+    BigDataCorpAPIProblemAPIException,
+    BigDataCorpAPIOnDemandQueriesException,
+    BigDataCorpAPIMonitoringAPIException,
+    BigDataCorpAPIUnmappedErrorException)
+
+
+def check_login_status(status_data: dict):
+    """
+    Check if BigBoost login has expired.
+
+    Args:
+        status_data [dict]: `Status` entry of BigData response.
+    Raise:
+        BigDataCorpAPILoginProblemException: If login status code is -101.
+    """
+    login_entry = status_data.get("login")
+    if login_entry is not None:
+        login_return = login_entry[0]
+        if login_return["Code"] == -101:
+            msg = "BigBoost user has expired"
+            raise BigDataCorpAPILoginProblemException(msg)
+
+
+def check_minor_status(status_data: dict):
+    """
+    Check if BigData returned a minor validation error for a CPF.
+
+    Args:
+        status_data [dict]: `Status` entry of BigData response.
+    Raise:
+        BigDataCorpAPIMinorDocumentException: If the CPF belongs to a minor.
+    """
+    birth_validation = status_data.get('date_of_birth_validation')
+    if birth_validation is not None:
+        raise BigDataCorpAPIMinorDocumentException(
+            message="this cpf belongs to a minor",
+            payload=birth_validation[0])
+
+
+def get_status_exception_class(code: int):
+    """
+    Return the exception class and message of a status code.
+
+    Args:
+        code [int]: BigData status code.
+    Return [tuple[type, str] | None]:
+        Exception class and message, None if code is 0.
+    """
+    if code == 0:
+        return None
+    if code >= -202 and code <= -100:
+        return (
+            BigDataCorpAPIInvalidInputException,
+            "error related to input data")
+    elif code >= -1002 and code <= -1000:
+        return (
+            BigDataCorpAPILoginProblemException,
+            "error related to login problem")
+    elif code >= -2999 and code <= -2000:
+        return (
+            BigDataCorpAPIProblemAPIException,
+            "error related to internal problems in APIs or services")
+    elif code >= -1999 and code <= -1200:
+        return (
+            BigDataCorpAPIOnDemandQueriesException,
+            "error related to on-demand queries")
+    elif code <= -3000:
+        return (
+            BigDataCorpAPIMonitoringAPIException,
+            "error related to problems in the Monitoring API or "
+            "Asynchronous Calls")
+    else:
+        return BigDataCorpAPIUnmappedErrorException, "unmapped error"
+
+
+def get_status_exception(status: dict, payload: dict):
+    """
+    Return the exception corresponding to a dataset status.
+
+    Args:
+        status [dict]: Status of a dataset, with `Code` and `Message` keys.
+        payload [dict]: Information about the query (document and dataset)
+            to be added to exception payload.
+    Return [BigDataCorpAPIException | None]:
+        Exception corresponding to the status code, None if code is 0.
+    """
+    exception_class = get_status_exception_class(status['Code'])
+    if exception_class is None:
+        return None
+
+    exception_payload = {'bigdata_status': status}
+    exception_payload.update(payload)
+    return exception_class[0](
+        message=exception_class[1], payload=exception_payload)
+
+
+def check_dataset_status(status: dict, payload: dict):
+    """
+    Raise the exception corresponding to a dataset status.
+
+    Args:
+        status [dict]: Status of a dataset, with `Code` and `Message` keys.
+        payload [dict]: Information about the query (document and dataset)
+            to be added to exception payload.
+    Raise:
+        BigDataCorpAPIException: If status code is not 0.
+    """
+    exception = get_status_exception(status=status, payload=payload)
+    if exception is not None:
+        raise exception
+
+
+def check_problem_status(status_data: dict, datasets: list):
+    """
+    Raise if any dataset has an internal problem status (-2000 to -2999).
+
+    Args:
+        status_data [dict]: `Status` entry of BigData response.
+        datasets [list[str]]: Datasets fetched on the request.
+    Raise:
+        BigDataCorpAPIProblemAPIException: If a dataset status is an
+            internal problem of BigData APIs or services.
+    """
+    for dataset in datasets:
+        status = status_data[dataset][0]
+        if status['Code'] >= -2999 and status['Code'] <= -2000:
+            raise BigDataCorpAPIProblemAPIException(
+                message="error related to internal problems in APIs "
+                        "or services",
+                payload={'bigdata_status': status, 'dataset': dataset})
@@ -0,0 +1,277 @@
+"""Incremental parsing of large list datasets from BigData responses."""
+import json
+import codecs
+from bigdatacorp_api.exceptions import BigDataCorpAPIException
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover
+    ijson = None
+
+# Errors raised by parsers on malformed or truncated bodies
+_PARSE_ERRORS = (ValueError, )
+if ijson is not None:  # pragma: no cover
+    _PARSE_ERRORS += (ijson.JSONError, )
+
+
+# Section and list key of the records of each list dataset, ex.:
+# `Result[].Processes.Lawsuits[]` for `processes`. Used on streaming and
+# pagination
+STREAM_LISTS = {
+    "processes": ("Processes", "Lawsuits"),
+    "addresses_extended": ("ExtendedAddresses", "Addresses"),
+    "phones_extended": ("ExtendedPhones", "Phones"),
+    "related_people_phones": ("RelatedPeoplePhones", "Phones"),
+    "owners_lawsuits": ("OwnersLawsuits", "Lawsuits"),
+    "related_people": ("RelatedPeople", "PersonalRelationships"),
+    "economic_group_full_extended": (
+        "EconomicGroupFullExtended", "Relationships")}
+
+_WHITESPACE = " \t\n\r"
+_DECODER = json.JSONDecoder()
+
+
+def get_stream_list(dataset: str) -> tuple:
+    """
+    Return the section and list key of the records of a dataset.
+
+    Args:
+        dataset [str]: Dataset name.
+    Return [tuple[str, str]]:
+        Section and list key, see `STREAM_LISTS`.
+    Raise:
+        BigDataCorpAPIException: If the dataset has no streamed list.
+    """
+    list_path = STREAM_LISTS.get(dataset)
+    if list_path is None:
+        raise BigDataCorpAPIException(
+            "dataset [{}] can not be streamed, pass `list_path` or use "
+            "one of: {}".format(dataset, ", ".join(STREAM_LISTS)))
+    return list_path
+
+
+def iter_body(response, chunk_size: int = 65536):
+    """
+    Return the body of a response as an iterator of bytes chunks.
+
+    Responses without `iter_content` (ex.: replayed from cassettes) are
+    returned as one chunk.
+    """
+    iter_content = getattr(response, "iter_content", None)
+    if iter_content is None:
+        return iter([response.content])
+    return iter_content(chunk_size=chunk_size)
+
+
+class _Buffer:
+    """Text of a JSON document decoded from chunks as it is consumed."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """
+        Read chunks until the unread text at least doubles.
+
+        Growing the buffer geometrically keeps the cost of decoding values
+        split across chunks linear on their size.
+        """
+        if self.eof:
+            return False
+        parts = [self.text[self.pos:]]
+        target = max(len(parts[0]), 1)
+        read = 0
+        while read < target:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self.eof = True
+                parts.append(self._decoder.decode(b"", final=True))
+                break
+            if isinstance(chunk, bytes):
+                chunk = self._decoder.decode(chunk)
+            parts.append(chunk)
+            read += len(chunk)
+        self.text = "".join(parts)
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next character that is not whitespace, "" at end."""
+        while True:
+            text, pos = self.text, self.pos
+            size = len(text)
+            while pos < size and text[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < size:
+                return text[pos]
+            if not self.fill():
+                return ""
+
+    def next_char(self) -> str:
+        """Consume the next character that is not whitespace."""
+        char = self.peek()
+        if not char:
+            raise ValueError("unexpected end of JSON document")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.text, self.pos)
+                # A number at the end may continue on the next chunk
+                if end < len(self.text) or self.eof:
+                    self.pos = end
+                    return value
+            except ValueError:
+                if self.eof:
+                    raise
+            self.fill()
+
+
+def _walk(buffer: _Buffer, pattern: dict):
+    """
+    Yield `(kind, value)` of values of a container matching a pattern.
+
+    Patterns map object keys (`*` for array items) to a kind, to a nested
+    pattern or are missing to skip the value.
+    """
+    char = buffer.peek()
+    if char not in ("{", "["):
+        buffer.value()
+        return
+    buffer.pos += 1
+    close = "}" if char == "{" else "]"
+    if buffer.peek() == close:
+        buffer.pos += 1
+        return
+    while True:
+        if char == "{":
+            key = buffer.value()
+            if buffer.next_char() != ":":
+                raise ValueError("expected `:` after object key")
+            sub_pattern = pattern.get(key)
+        else:
+            sub_pattern = pattern.get("*")
+
+        if sub_pattern is None:
+            buffer.value()
+        elif isinstance(sub_pattern, str):
+            yield sub_pattern, buffer.value()
+        else:
+            yield from _walk(buffer, sub_pattern)
+
+        separator = buffer.next_char()
+        if separator == close:
+            return
+        if separator != ",":
+            raise ValueError("expected `,` or `{}`".format(close))
+
+
+def _parse_python(chunks, list_path: tuple):
+    pattern = {"*": "record"}
+    for key in reversed(list_path):
+        pattern = {key: pattern}
+    pattern = {"Status": "status", "Result": {"*": pattern}}
+    buffer = _Buffer(chunks)
+    yield from _walk(buffer, pattern)
+    if buffer.peek():
+        raise ValueError("extra data after JSON document")
+
+
+class _ChunkFile:
+    """File-like object reading from an iterator of bytes chunks."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._rest = b""
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._rest) < size:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                break
+            self._rest += chunk
+        if size < 0:
+            data, self._rest = self._rest, b""
+        else:
+            data, self._rest = self._rest[:size], self._rest[size:]
+        return data
+
+
+def _parse_ijson(chunks, list_path: tuple):
+    targets = {
+        "Status": "status",
+        ".".join(("Result", "item") + tuple(list_path) + ("item", )):
+            "record"}
+    builder = None
+    for prefix, event, value in ijson.parse(
+            _ChunkFile(chunks), use_float=True):
+        if builder is None:
+            kind = targets.get(prefix)
+            if kind is None or event == "map_key":
+                continue
+            if event not in ("start_map", "start_array"):
+                yield kind, value
+                continue
+            builder = ijson.ObjectBuilder()
+            builder_prefix = prefix
+            builder_kind = kind
+        builder.event(event, value)
+        if prefix == builder_prefix and event in ("end_map", "end_array"):
+            yield builder_kind, builder.value
+            builder = None
+
+
+def _wrap_errors(events):
+    """Raise parser errors as `BigDataCorpAPIException`."""
+    try:
+        yield from events
+    except _PARSE_ERRORS as e:
+        raise BigDataCorpAPIException(
+            message="malformed response body: {}".format(e),
+            payload={"error": str(e)}) from e
+
+
+def parse_stream(chunks, list_path: tuple, use_ijson: bool = None):
+    """
+    Parse a BigData response incrementally.
+
+    Only one record is decoded at a time, other sections of the result are
+    skipped, so memory is bounded by the largest record instead of the
+    response.
+
+    Args:
+        chunks [iterable[bytes]]: Response body.
+        list_path [tuple[str]]: Keys from each `Result` entry to the list
+            of records, ex.: `("Processes", "Lawsuits")`.
+    Kwargs:
+        use_ijson [bool]: Parse with ijson, default to use it if
+            installed. The fallback is a pure Python parser that decodes
+            each record with the standard library.
+    Return [generator]:
+        Yield `("status", status)` with the `Status` block and
+        `("record", record)` for each record, in document order.
+    Raise:
+        ImportError: If `use_ijson` is set and ijson is not installed.
+        BigDataCorpAPIException: If the body is not valid JSON or is
+            truncated, raised while iterating.
+    """
+    if use_ijson is None:
+        use_ijson = ijson is not None
+    if use_ijson:
+        if ijson is None:
+            raise ImportError(
+                "ijson must be installed to parse with `use_ijson`, "
+                "`pip install ijson`")
+        return _wrap_errors(_parse_ijson(chunks, list_path))
+    return _wrap_errors(_parse_python(chunks, list_path))
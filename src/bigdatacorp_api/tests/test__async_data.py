@@ -0,0 +1,90 @@
+"""Test AsyncBigDataCorpAPI."""
+import time
+import asyncio
+import unittest
+from bigdatacorp_api.ratelimit import EndpointRateLimiter
+from bigdatacorp_api.exceptions import BigDataCorpAPIInvalidInputException
+
+try:
+    from aiohttp import web
+    from bigdatacorp_api.async_data import AsyncBigDataCorpAPI
+except ImportError:  # pragma: no cover
+    web = None
+
+
+@unittest.skipIf(web is None, "aiohttp is not installed")
+class TestAsyncBigDataCorpAPI(unittest.IsolatedAsyncioTestCase):
+    """Test async client against a local aiohttp server."""
+
+    async def asyncSetUp(self):
+        self.requests = []
+
+        async def handler(request):
+            payload = await request.json()
+            self.requests.append(payload)
+            datasets = payload["Datasets"].split(",")
+            return web.json_response({
+                "Result": [{"BasicData": {"Name": "FULANO"}}],
+                "Status": {
+                    db: [{"Code": -110 if db == "processes" else 0,
+                          "Message": "OK"}]
+                    for db in datasets}})
+
+        app = web.Application()
+        app.router.add_post("/peoplev2", handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        registry = AsyncBigDataCorpAPI.registry.copy()
+        registry.set_endpoint(
+            "people", "http://127.0.0.1:{}/peoplev2".format(port))
+        self.bigdata_api = AsyncBigDataCorpAPI(
+            bigdata_auth_token="token", max_concurrency=2,
+            registry=registry)
+
+    async def asyncTearDown(self):
+        await self.bigdata_api.close()
+        await self.runner.cleanup()
+
+    async def test__get_cpf_datasets(self):
+        results = await self.bigdata_api.get_cpf_datasets(
+            cpf="52998224725", datasets=["basic_data", "processes"],
+            raise_errors=False)
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(
+            results["basic_data"]["Result"][0]["BasicData"]["Name"],
+            "FULANO")
+        self.assertIsInstance(
+            results["processes"], BigDataCorpAPIInvalidInputException)
+
+    async def test__raise_errors(self):
+        with self.assertRaises(BigDataCorpAPIInvalidInputException):
+            await self.bigdata_api.get_cpf_dataset(
+                cpf="52998224725", dataset="processes")
+
+    async def test__blocking_rate_limiter(self):
+        class BlockingLimiter:
+            def reserve(self, tokens=1, max_wait=None):
+                time.sleep(0.2)
+                return 0.0
+
+        self.bigdata_api._rate_limiter = EndpointRateLimiter(
+            default=BlockingLimiter())
+        ticks = []
+
+        async def tick():
+            for _ in range(10):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        # The loop keeps running while the limiter blocks
+        ticker = asyncio.ensure_future(tick())
+        await asyncio.sleep(0)
+        await self.bigdata_api.get_cpf_dataset(
+            cpf="52998224725", dataset="basic_data")
+        await ticker
+        self.assertLess(
+            max(b - a for a, b in zip(ticks, ticks[1:])), 0.15)
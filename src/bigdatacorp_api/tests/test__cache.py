@@ -0,0 +1,178 @@
+"""Test response caches."""
+import os
+import time
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from bigdatacorp_api.data import BigDataCorpAPI
+from bigdatacorp_api.cache import (
+    SQLiteResponseCache, MemoryResponseCache, SingleFlight)
+from bigdatacorp_api.tests.test__datasets import FakeTransport
+
+
+class TestSQLiteResponseCache(unittest.TestCase):
+    """Test SQLite cache TTL, eviction and counters."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "cache.db")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test__ttl(self):
+        cache = SQLiteResponseCache(
+            self.path, dataset_ttls={"processes": 10})
+        cache.set("url", "52998224725", "processes", {"a": 1})
+        self.assertEqual(
+            cache.get("url", "52998224725", "processes"), {"a": 1})
+        with mock.patch("bigdatacorp_api.cache.time.time",
+                        return_value=10 ** 11):
+            self.assertIsNone(cache.get("url", "52998224725", "processes"))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+        cache.close()
+
+    def test__eviction(self):
+        cache = SQLiteResponseCache(self.path, max_entries=2)
+        cache.set("url", "1", "basic_data", {"a": 1})
+        cache.set("url", "2", "basic_data", {"a": 2})
+        cache.get("url", "1", "basic_data")
+        cache.set("url", "3", "basic_data", {"a": 3})
+        self.assertEqual(cache.stats()["entries"], 2)
+        self.assertIsNone(cache.get("url", "2", "basic_data"))
+        self.assertIsNotNone(cache.get("url", "1", "basic_data"))
+
+        # Updates do not add entries, the counter is kept on reopen
+        cache.set("url", "1", "basic_data", {"a": 4})
+        cache.close()
+        cache = SQLiteResponseCache(self.path, max_entries=2)
+        self.assertEqual(cache.stats()["entries"], 2)
+        self.assertEqual(cache.get("url", "1", "basic_data"), {"a": 4})
+        cache.clear()
+        self.assertEqual(cache.stats()["entries"], 0)
+        cache.close()
+
+    def test__client(self):
+        cache = SQLiteResponseCache(self.path)
+        transport = FakeTransport()
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport, cache=cache)
+        bigdata_api.get_cnpj_datasets(
+            cnpj="00.000.000/0001-91", datasets=["basic_data"])
+        bigdata_api.get_cnpj_dataset(
+            cnpj="00000000000191", dataset="basic_data")
+        bigdata_api.get_cnpj_datasets(
+            cnpj="00000000000191", datasets=["basic_data", "processes"],
+            single_request=True)
+        self.assertEqual(len(transport.requests), 2)
+        self.assertEqual(transport.requests[1][1]["Datasets"], "processes")
+        cache.close()
+
+    def test__registry_ttl(self):
+        cache = SQLiteResponseCache(
+            self.path, dataset_ttls={"processes": 10})
+        transport = FakeTransport()
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport, cache=cache)
+        bigdata_api.registry = bigdata_api.registry.copy()
+        bigdata_api.registry.register("cnpj", "basic_data", ttl=0)
+        for _ in range(2):
+            bigdata_api.get_cnpj_datasets(
+                cnpj="00000000000191", datasets=["basic_data", "processes"])
+        # TTL 0 on the registry is not cached, cache TTLs override it
+        self.assertEqual(
+            [payload["Datasets"] for _, payload in transport.requests],
+            ["basic_data", "processes", "basic_data"])
+        self.assertEqual(cache.get_ttl("processes", ttl=60), 10)
+        self.assertEqual(cache.get_ttl("kyc", ttl=60), 60)
+        self.assertEqual(cache.get_ttl("kyc"), cache.default_ttl)
+        cache.close()
+
+
+class TestMemoryResponseCache(unittest.TestCase):
+    """Test in-process LRU cache and coalescing of identical requests."""
+
+    def test__lru(self):
+        cache = MemoryResponseCache(max_entries=2)
+        cache.set("url", "1", "basic_data", {"a": 1})
+        cache.set("url", "2", "basic_data", {"a": 2})
+        cache.get("url", "1", "basic_data")
+        cache.set("url", "3", "basic_data", {"a": 3})
+        self.assertIsNone(cache.get("url", "2", "basic_data"))
+        self.assertEqual(cache.get("url", "1", "basic_data"), {"a": 1})
+
+    def test__copies(self):
+        cache = MemoryResponseCache()
+        response = {"Result": [{"a": 1}]}
+        cache.set("url", "1", "basic_data", response)
+        response["Result"].clear()
+        cache.get("url", "1", "basic_data")["Result"].clear()
+        self.assertEqual(
+            cache.get("url", "1", "basic_data"), {"Result": [{"a": 1}]})
+
+    def test__single_flight_cached_before_release(self):
+        in_flight = []
+
+        class Cache(MemoryResponseCache):
+            def set(self, *args, **kwargs):
+                in_flight.append(len(bigdata_api._single_flight._calls))
+                super().set(*args, **kwargs)
+
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=FakeTransport(),
+            memory_cache=Cache())
+        bigdata_api.get_cpf_dataset(cpf="52998224725", dataset="basic_data")
+        self.assertEqual(in_flight, [1])
+
+    def test__single_flight(self):
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        class SlowTransport(FakeTransport):
+            def post(self, *args, **kwargs):
+                calls.append(1)
+                started.set()
+                release.wait(5)
+                return super().post(*args, **kwargs)
+
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=SlowTransport(),
+            memory_cache=MemoryResponseCache())
+        results = []
+
+        def fetch():
+            results.append(bigdata_api.get_cpf_dataset(
+                cpf="529.982.247-25", dataset="basic_data"))
+
+        threads = [threading.Thread(target=fetch) for _ in range(4)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 4)
+        # Waiters do not share the response objects of the leader
+        self.assertEqual(len({id(result) for result in results}), 4)
+        results[0]["Result"].clear()
+        self.assertTrue(all(result["Result"] for result in results[1:]))
+
+    def test__single_flight_timeout(self):
+        single_flight = SingleFlight()
+        release = threading.Event()
+        thread = threading.Thread(
+            target=single_flight.do, args=("key", lambda: release.wait(5)))
+        thread.start()
+        time.sleep(0.05)
+        with self.assertRaises(TimeoutError):
+            single_flight.do("key", lambda: None, timeout=0.05)
+        release.set()
+        thread.join()
+        self.assertEqual(single_flight.do("key", lambda: 1, timeout=0.05), 1)
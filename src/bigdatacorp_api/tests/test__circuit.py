@@ -0,0 +1,96 @@
+"""Test circuit breakers."""
+import time
+import unittest
+from unittest import mock
+import requests
+from bigdatacorp_api.data import BigDataCorpAPI
+from bigdatacorp_api.retry import RetryPolicy
+from bigdatacorp_api.circuit import CircuitBreaker, CircuitBreakerRegistry
+from bigdatacorp_api.ratelimit import (
+    EndpointRateLimiter, TokenBucketRateLimiter)
+from bigdatacorp_api.exceptions import (
+    BigDataCorpAPICircuitOpenException, BigDataCorpAPIMaxRetryException,
+    BigDataCorpAPITimeoutException)
+from bigdatacorp_api.tests.test__retry import FlakyTransport
+from bigdatacorp_api.tests.test__datasets import FakeTransport
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test circuit states."""
+
+    def test__open_half_open_close(self):
+        breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(BigDataCorpAPICircuitOpenException):
+            breaker.before_call()
+
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        breaker.before_call()
+        with self.assertRaises(BigDataCorpAPICircuitOpenException):
+            breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test__release(self):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.release()
+        breaker.before_call()
+        with self.assertRaises(BigDataCorpAPICircuitOpenException):
+            breaker.before_call()
+
+    def test__failure_rate(self):
+        breaker = CircuitBreaker(
+            failure_threshold=None, failure_rate=0.5, window_size=4,
+            min_calls=4)
+        for failed in [False, True, False, True]:
+            if failed:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test__client(self):
+        transport = FlakyTransport(errors=[
+            requests.ConnectionError() for _ in range(3)])
+        registry = CircuitBreakerRegistry(failure_threshold=2)
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport,
+            retry_policy=RetryPolicy(max_attempts=2, backoff_base=0),
+            circuit_breaker=registry)
+        with mock.patch("builtins.print"):
+            with self.assertRaises(BigDataCorpAPIMaxRetryException):
+                bigdata_api.get_cpf_dataset(
+                    cpf="52998224725", dataset="basic_data")
+            with self.assertRaises(BigDataCorpAPICircuitOpenException):
+                bigdata_api.get_cpf_dataset(
+                    cpf="52998224725", dataset="basic_data")
+        self.assertEqual(len(transport.requests), 2)
+        status = bigdata_api.get_circuit_breaker_status()
+        self.assertEqual(
+            status[BigDataCorpAPI.PEOPLE_URL]["state"], "open")
+
+    def test__probe_rate_limit_timeout(self):
+        registry = CircuitBreakerRegistry(
+            failure_threshold=1, recovery_timeout=0)
+        limiter = TokenBucketRateLimiter(rate=5, capacity=1)
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=FakeTransport(),
+            circuit_breaker=registry,
+            rate_limiter=EndpointRateLimiter(default=limiter))
+        breaker = registry.get(BigDataCorpAPI.PEOPLE_URL)
+        breaker.record_failure()
+        limiter.reserve()
+
+        # The probe is released when the rate limit wait times out
+        with self.assertRaises(BigDataCorpAPITimeoutException):
+            bigdata_api.get_cpf_dataset(
+                cpf="52998224725", dataset="basic_data", deadline=0.05)
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        bigdata_api.get_cpf_dataset(cpf="52998224725", dataset="basic_data")
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
@@ -0,0 +1,143 @@
+"""Test multi-dataset fetch of BigDataCorpAPI."""
+import json
+import unittest
+from unittest import mock
+from bigdatacorp_api.data import BigDataCorpAPI
+from bigdatacorp_api.exceptions import (
+    BigDataCorpAPIInvalidInputException,
+    BigDataCorpAPIOnDemandQueriesException)
+
+
+def build_response(datasets: list, codes: dict = {}):
+    """Build a fake BigData response for datasets."""
+    response = mock.Mock()
+    response.status_code = 200
+    body = {
+        "Result": [{"MatchKeys": "doc{52998224725}",
+                    "BasicData": {"Name": "FULANO"}}],
+        "QueryId": "query-id",
+        "ElapsedMilliseconds": 10,
+        "Status": {
+            db: [{"Code": codes.get(db, 0), "Message": "OK"}]
+            for db in datasets}}
+    response.content = json.dumps(body).encode()
+    return response
+
+
+class FakeTransport:
+    """Record requests and answer with fake responses."""
+
+    def __init__(self, codes: dict = {}):
+        self.codes = codes
+        self.requests = []
+
+    def post(self, url, json=None, headers=None, **kwargs):
+        self.requests.append((url, json))
+        return build_response(json["Datasets"].split(","), self.codes)
+
+
+class TestGetDatasets(unittest.TestCase):
+    """Test grouping datasets by end-point."""
+
+    def test__single_request(self):
+        transport = FakeTransport()
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport)
+        datasets = ["basic_data", "processes",
+                    "partner_murabei_credit_score_company"]
+        results = bigdata_api.get_cnpj_datasets(
+            cnpj="00.000.000/0001-91", datasets=datasets,
+            single_request=True)
+
+        self.assertEqual(list(results.keys()), datasets)
+        self.assertEqual(len(transport.requests), 2)
+        self.assertEqual(
+            transport.requests[0][1]["Datasets"], "basic_data,processes")
+        self.assertTrue(transport.requests[1][0].endswith("/marketplace"))
+        self.assertEqual(
+            list(results["processes"]["Status"].keys()), ["processes"])
+        self.assertEqual(
+            results["basic_data"]["Result"][0]["BasicData"]["Name"],
+            "FULANO")
+
+    def test__errors_per_dataset(self):
+        transport = FakeTransport(codes={"processes": -1200})
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport)
+        results = bigdata_api.get_cpf_datasets(
+            cpf="52998224725", datasets=["basic_data", "processes"],
+            single_request=True, raise_errors=False)
+        self.assertIsInstance(
+            results["processes"], BigDataCorpAPIOnDemandQueriesException)
+        self.assertEqual(results["basic_data"]["Status"]["basic_data"][0][
+            "Code"], 0)
+
+    def test__raise_errors(self):
+        transport = FakeTransport(codes={"processes": -110})
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport)
+        with self.assertRaises(BigDataCorpAPIInvalidInputException):
+            bigdata_api.get_cpf_datasets(
+                cpf="52998224725", datasets=["basic_data", "processes"],
+                single_request=True)
+
+
+class TestBulkGetDatasets(unittest.TestCase):
+    """Test bulk fetch with bounded concurrency."""
+
+    def test__bulk(self):
+        transport = FakeTransport(codes={"processes": -110})
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport)
+        cpfs = ["52998224725", "11144477735", "39053344705"]
+        results = list(bigdata_api.bulk_get_cpf_datasets(
+            cpfs=iter(cpfs), datasets=["basic_data", "processes"],
+            max_workers=2))
+
+        self.assertEqual(len(results), 6)
+        self.assertEqual(len(transport.requests), 6)
+        for cpf, dataset, result in results:
+            self.assertIn(cpf, cpfs)
+            if dataset == "processes":
+                self.assertIsInstance(
+                    result, BigDataCorpAPIInvalidInputException)
+            else:
+                self.assertEqual(result["QueryId"], "query-id")
+
+    def test__bulk_is_lazy(self):
+        transport = FakeTransport()
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport)
+        consumed = []
+
+        def cnpjs():
+            for i in range(1000):
+                consumed.append(i)
+                yield "00.000.000/0001-91"
+
+        results = bigdata_api.bulk_get_cnpj_datasets(
+            cnpjs=cnpjs(), datasets=["basic_data"], max_workers=2,
+            max_pending=4)
+        next(results)
+        results.close()
+        self.assertLessEqual(len(consumed), 6)
+
+
+class TestResponseDecoding(unittest.TestCase):
+    """Test single-parse response pipeline."""
+
+    def test__decoder_called_once(self):
+        decoder = mock.Mock(side_effect=json.loads)
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=FakeTransport(),
+            json_decoder=decoder)
+        bigdata_api.get_cpf_dataset(cpf="52998224725", dataset="basic_data")
+        self.assertEqual(decoder.call_count, 1)
+
+    def test__return_raw(self):
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=FakeTransport(),
+            json_decoder="json")
+        result, raw = bigdata_api.get_cpf_dataset(
+            cpf="52998224725", dataset="basic_data", return_raw=True)
+        self.assertEqual(json.loads(raw), result)
@@ -0,0 +1,145 @@
+"""Test timeouts and deadline budgets of calls."""
+import gc
+import time
+import asyncio
+import unittest
+from bigdatacorp_api.data import BigDataCorpAPI
+from bigdatacorp_api.async_data import AsyncBigDataCorpAPI
+from bigdatacorp_api.retry import RetryPolicy
+from bigdatacorp_api.deadline import Deadline, get_deadline
+from bigdatacorp_api.mock_server import MockBigDataServer
+from bigdatacorp_api.exceptions import (
+    BigDataCorpAPITimeoutException, BigDataCorpAPIMaxRetryException)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDeadline(unittest.TestCase):
+    """Test budget accounting."""
+
+    def test__remaining(self):
+        clock = FakeClock()
+        deadline = Deadline(2.0, clock=clock)
+        self.assertEqual(deadline.remaining(), 2.0)
+        self.assertEqual(deadline.cap(10.0), 2.0)
+        self.assertEqual(deadline.cap(0.5), 0.5)
+        self.assertEqual(deadline.cap(None), 2.0)
+
+        clock.now += 3
+        self.assertTrue(deadline.expired)
+        self.assertEqual(deadline.remaining(), 0.0)
+        self.assertEqual(deadline.cap(10.0), Deadline.MIN_TIMEOUT)
+
+        exception = deadline.exception("url", ["basic_data"], ["timeout"])
+        self.assertIsInstance(exception, BigDataCorpAPITimeoutException)
+        self.assertEqual(exception.payload["errors"], ["timeout"])
+
+    def test__get_deadline(self):
+        deadline = Deadline(1.0)
+        self.assertIs(get_deadline(deadline, default=5.0), deadline)
+        self.assertIsNone(get_deadline(None))
+        self.assertEqual(get_deadline(None, default=5.0).timeout, 5.0)
+        self.assertEqual(get_deadline(2.0, default=5.0).timeout, 2.0)
+
+
+class TestClientDeadline(unittest.TestCase):
+    """Test partial results of calls with deadline."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockBigDataServer(
+            dataset_latency={"processes": 2.0}).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.clear_errors()
+
+    def build_api(self, **kwargs):
+        kwargs.setdefault(
+            "retry_policy", RetryPolicy(max_attempts=3, backoff_base=0))
+        return BigDataCorpAPI(
+            bigdata_auth_token="token", registry=self.server.registry(),
+            **kwargs)
+
+    def test__partial_results(self):
+        with self.build_api(deadline=0.5) as bigdata_api:
+            started = time.monotonic()
+            results = bigdata_api.get_cpf_datasets(
+                cpf="52998224725",
+                datasets=["basic_data", "processes", "financial_data"])
+            elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 1.5)
+        self.assertIn("BasicData", results["basic_data"]["Result"][0])
+        self.assertIn(
+            "FinantialData", results["financial_data"]["Result"][0])
+        self.assertIsInstance(
+            results["processes"], BigDataCorpAPITimeoutException)
+        self.assertEqual(
+            results["processes"].payload["datasets"], ["processes"])
+
+    def test__single_dataset(self):
+        with self.build_api() as bigdata_api:
+            with self.assertRaises(BigDataCorpAPITimeoutException):
+                bigdata_api.get_cpf_dataset(
+                    "52998224725", "processes", deadline=0.3)
+            self.assertIn(
+                "BasicData", bigdata_api.get_cpf_dataset(
+                    "52998224725", "basic_data",
+                    deadline=0.3)["Result"][0])
+
+    def test__fanout_threads(self):
+        with self.build_api(deadline=1.0, fanout_workers=2) as bigdata_api:
+            for _ in range(10):
+                bigdata_api.get_cpf_datasets(
+                    cpf="52998224725",
+                    datasets=["basic_data", "financial_data"])
+            gc.collect()
+            self.assertLessEqual(
+                len(bigdata_api._transport._sessions), 2)
+
+    def test__read_timeout(self):
+        with self.build_api(read_timeout=0.1) as bigdata_api:
+            started = time.monotonic()
+            with self.assertRaises(BigDataCorpAPIMaxRetryException):
+                bigdata_api.get_cpf_dataset("52998224725", "processes")
+        self.assertLess(time.monotonic() - started, 1.5)
+
+    def test__backoff_after_deadline(self):
+        self.server.add_error(http_status=503)
+        policy = RetryPolicy(max_attempts=5, backoff_base=5, jitter=False)
+        with self.build_api(retry_policy=policy) as bigdata_api:
+            started = time.monotonic()
+            with self.assertRaises(BigDataCorpAPITimeoutException) as error:
+                bigdata_api.get_cpf_dataset(
+                    "52998224725", "basic_data", deadline=1.0)
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(len(error.exception.payload["errors"]), 1)
+
+    def test__async_partial_results(self):
+        async def fetch():
+            async with AsyncBigDataCorpAPI(
+                    bigdata_auth_token="token",
+                    registry=self.server.registry(),
+                    retry_policy=RetryPolicy(max_attempts=3, backoff_base=0),
+                    deadline=0.5) as bigdata_api:
+                return await bigdata_api.get_cpf_datasets(
+                    cpf="52998224725", datasets=["basic_data", "processes"])
+
+        results = asyncio.run(fetch())
+        self.assertIn("BasicData", results["basic_data"]["Result"][0])
+        self.assertIsInstance(
+            results["processes"], BigDataCorpAPITimeoutException)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""Test deduplication of documents on bulk jobs."""
+import threading
+import unittest
+from bigdatacorp_api.data import BigDataCorpAPI
+from bigdatacorp_api.bulk import iter_bulk
+from bigdatacorp_api.dedup import SeenSet, BloomFilter, Deduplicator, np
+from bigdatacorp_api.tests.test__datasets import FakeTransport
+
+
+class TestSeen(unittest.TestCase):
+    """Test indexes of seen keys."""
+
+    def test__seen_set(self):
+        seen = SeenSet(buffer_size=4)
+        keys = ["key{}".format(i) for i in range(10)]
+        self.assertEqual([seen.add(k) for k in keys], [False] * 10)
+        self.assertEqual([seen.add(k) for k in keys], [True] * 10)
+        self.assertEqual(len(seen), 10)
+        self.assertIn("key3", seen)
+        self.assertNotIn("key10", seen)
+        if np is not None:
+            self.assertGreater(len(seen._sorted), 0)
+
+    def test__bloom_filter(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        keys = ["key{}".format(i) for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+        false_positives = sum(
+            "other{}".format(i) in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test__deduplicator(self):
+        dedup = Deduplicator(max_results=1)
+        self.assertFalse(dedup.check("a"))
+        dedup.put("a", {"basic_data": 1})
+        self.assertTrue(dedup.check("a"))
+        self.assertEqual(dedup.get("a"), {"basic_data": 1})
+        dedup.put("b", {"basic_data": 2})
+        self.assertIsNone(dedup.get("a"))
+        self.assertEqual(dedup.get_stats(), {
+            "rows": 2, "unique": 1, "duplicates": 1, "reused": 1})
+
+
+class TestBulkDedup(unittest.TestCase):
+    """Test fan out of results to repeated input rows."""
+
+    def test__iter_bulk_key(self):
+        calls = []
+        release = threading.Event()
+
+        def func(item):
+            calls.append(item)
+            release.wait(1)
+            return item.upper()
+
+        items = ["a", "b", "a", "a"]
+        results = iter_bulk(
+            func, items, max_workers=2, max_pending=4, key=lambda x: x)
+        threading.Timer(0.05, release.set).start()
+        results = sorted(results)
+        self.assertEqual(
+            results, [("a", "A"), ("a", "A"), ("a", "A"), ("b", "B")])
+        self.assertEqual(sorted(calls), ["a", "b"])
+
+    def test__bulk_fan_out(self):
+        transport = FakeTransport()
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport)
+        cpfs = ["52998224725", "529.982.247-25", "11144477735",
+                "52998224725"]
+        results = list(bigdata_api.bulk_get_cpf_datasets(
+            cpfs, datasets=["basic_data"], max_workers=2))
+        self.assertEqual(
+            sorted(r[0] for r in results), sorted(cpfs))
+        self.assertEqual(len(transport.requests), 2)
+        self.assertTrue(all(
+            "BasicData" in r[2]["Result"][0] for r in results))
+
+        transport = FakeTransport()
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport)
+        list(bigdata_api.bulk_get_cpf_datasets(
+            cpfs, datasets=["basic_data"], max_workers=2, dedup=False))
+        self.assertEqual(len(transport.requests), 4)
+
+    def test__bulk_stats(self):
+        transport = FakeTransport()
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport)
+        dedup = Deduplicator(seen=BloomFilter(capacity=1000))
+        cpfs = ["52998224725", "11144477735"] * 5
+        results = list(bigdata_api.bulk_get_cpf_datasets(
+            cpfs, datasets=["basic_data"], max_workers=1, max_pending=1,
+            dedup=dedup))
+        self.assertEqual(len(results), 10)
+        self.assertEqual(len(transport.requests), 2)
+        self.assertEqual(dedup.get_stats(), {
+            "rows": 10, "unique": 2, "duplicates": 8, "reused": 8})
+
+
+if __name__ == '__main__':
+    unittest.main()
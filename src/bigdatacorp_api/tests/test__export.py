@@ -0,0 +1,76 @@
+"""Test Arrow/Parquet export of dataset results."""
+import os
+import json
+import tempfile
+import unittest
+from bigdatacorp_api import export
+from bigdatacorp_api.exceptions import BigDataCorpAPIException
+
+
+def build_result(document: str, section: str, data: dict) -> dict:
+    """Build a dataset response with one result."""
+    return {
+        "Result": [{"MatchKeys": "doc{" + document + "}", section: data}],
+        "Status": {}}
+
+
+@unittest.skipIf(export.pyarrow is None, "pyarrow is not installed")
+class TestExport(unittest.TestCase):
+    """Test flattening and Parquet files."""
+
+    def test__basic_data(self):
+        results = [
+            build_result("52998224725", "BasicData", {
+                "Name": "FULANO", "Age": 30, "HasObitIndication": False,
+                "Aliases": {"CommonName": "FULANO"}, "Unknown": [1]}),
+            {"Result": [], "Status": {}},
+            # Age as string does not match the schema
+            build_result("11144477735", "BasicData", {
+                "Name": "CICLANO", "Age": "41"}),
+        ]
+        batches = export.to_record_batches("cpf", "basic_data", results)
+        table = batches["basic_data"].to_pydict()
+        self.assertEqual(
+            table["document"], ["52998224725", None, "11144477735"])
+        self.assertEqual(table["Name"], ["FULANO", None, "CICLANO"])
+        self.assertEqual(table["Age"], [30, None, 41])
+        self.assertEqual(
+            json.loads(table["Aliases"][0]), {"CommonName": "FULANO"})
+        self.assertEqual(
+            batches["basic_data"].schema,
+            export.get_schemas("cpf", "basic_data")["basic_data"])
+
+    def test__children(self):
+        results = [build_result("52998224725", "Processes", {
+            "TotalLawsuits": 2,
+            "Lawsuits": [
+                {"Number": "1", "Value": 10, "Parties": []},
+                {"Number": "2", "Value": 2.5}]})]
+        batches = export.to_record_batches(
+            "cpf", "processes", results, documents=["529.982.247-25"])
+        lawsuits = batches["processes__lawsuits"].to_pydict()
+        self.assertEqual(lawsuits["document"], ["529.982.247-25"] * 2)
+        self.assertEqual(lawsuits["position"], [0, 1])
+        self.assertEqual(lawsuits["Value"], [10.0, 2.5])
+        self.assertEqual(
+            batches["processes"].to_pydict()["TotalLawsuits"], [2])
+
+        with self.assertRaises(BigDataCorpAPIException):
+            export.get_export_spec("cnpj", "financial_data")
+
+    def test__parquet(self):
+        import pyarrow.parquet
+
+        results = [build_result("00000000000191", "ExtendedPhones", {
+            "TotalPhones": 1,
+            "Phones": [{"Number": "999999999", "AreaCode": "11"}]})]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with export.ParquetExporter(
+                    tmp_dir, "cnpj", "phones_extended") as exporter:
+                exporter.write(results)
+                exporter.write(results)
+            table = pyarrow.parquet.read_table(
+                os.path.join(tmp_dir, "phones_extended__phones.parquet"))
+            self.assertEqual(table.num_rows, 2)
+            self.assertEqual(
+                table.column("AreaCode").to_pylist(), ["11", "11"])
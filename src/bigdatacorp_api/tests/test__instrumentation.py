@@ -0,0 +1,78 @@
+"""Test metrics hooks of the client."""
+import unittest
+import urllib.request
+import requests
+from bigdatacorp_api.data import BigDataCorpAPI
+from bigdatacorp_api.retry import RetryPolicy
+from bigdatacorp_api.cache import MemoryResponseCache
+from bigdatacorp_api.instrumentation import (
+    PrometheusInstrumentation, get_status_class, get_exception_class)
+from bigdatacorp_api.exceptions import BigDataCorpAPIOnDemandQueriesException
+from bigdatacorp_api.tests.test__datasets import FakeTransport
+from bigdatacorp_api.tests.test__retry import FlakyTransport
+
+
+class TestPrometheusInstrumentation(unittest.TestCase):
+    """Test metrics collected on requests."""
+
+    def test__status_classes(self):
+        self.assertEqual(get_status_class(0), "ok")
+        self.assertEqual(get_status_class(-110), "invalid_input")
+        self.assertEqual(get_status_class(-1200), "on_demand_queries")
+        self.assertEqual(get_status_class(-2001), "problem_api")
+        self.assertEqual(get_status_class(-3001), "monitoring_api")
+        self.assertEqual(
+            get_exception_class(BigDataCorpAPIOnDemandQueriesException("")),
+            "on_demand_queries")
+        self.assertEqual(
+            get_exception_class(requests.ConnectionError()),
+            "transport_error")
+
+    def test__metrics(self):
+        metrics = PrometheusInstrumentation()
+        transport = FakeTransport(codes={"processes": -1200})
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport,
+            memory_cache=MemoryResponseCache(), instrumentation=metrics)
+        for _ in range(2):
+            bigdata_api.get_cpf_datasets(
+                cpf="52998224725", datasets=["basic_data", "processes"],
+                single_request=True, raise_errors=False)
+
+        text = metrics.render()
+        url = BigDataCorpAPI.PEOPLE_URL
+        self.assertIn(
+            'bigdatacorp_status_total{endpoint="' + url + '",'
+            'dataset="processes",status_class="on_demand_queries"} 2', text)
+        self.assertIn(
+            'bigdatacorp_status_total{endpoint="' + url + '",'
+            'dataset="basic_data",status_class="ok"} 1', text)
+        self.assertIn(
+            'bigdatacorp_request_duration_seconds_count{endpoint="' + url +
+            '",dataset="processes"} 2', text)
+        self.assertIn('bigdatacorp_response_bytes_total{endpoint="', text)
+        # basic_data is cached after the first call, processes failed
+        self.assertEqual(metrics.get_cache_hit_rate("basic_data"), 0.5)
+        self.assertEqual(metrics.get_cache_hit_rate("processes"), 0.0)
+
+    def test__retries_and_server(self):
+        metrics = PrometheusInstrumentation()
+        transport = FlakyTransport(errors=[requests.ConnectionError()])
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport,
+            retry_policy=RetryPolicy(backoff_base=0),
+            instrumentation=metrics)
+        with self.assertLogs("bigdatacorp_api", level="WARNING"):
+            bigdata_api.get_cpf_dataset(
+                cpf="52998224725", dataset="basic_data")
+
+        server = metrics.start_http_server(0, addr="127.0.0.1")
+        try:
+            with urllib.request.urlopen("http://127.0.0.1:{}/metrics".format(
+                    server.server_address[1])) as response:
+                text = response.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertIn('error_class="transport_error"} 1', text)
+        self.assertIn('attempt="2"} 1', text)
@@ -0,0 +1,100 @@
+"""Test the client offline against the mock server and cassettes."""
+import os
+import tempfile
+import unittest
+from bigdatacorp_api.data import BigDataCorpAPI
+from bigdatacorp_api.retry import RetryPolicy
+from bigdatacorp_api.mock_server import MockBigDataServer
+from bigdatacorp_api.transport import RecordingTransport, ReplayTransport
+from bigdatacorp_api.exceptions import (
+    BigDataCorpAPILoginProblemException,
+    BigDataCorpAPIOnDemandQueriesException,
+    BigDataCorpAPIMonitoringAPIException,
+    BigDataCorpAPIRequestException)
+
+
+class TestMockServer(unittest.TestCase):
+    """Test responses and injected errors."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockBigDataServer(payload_items=3).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.clear_errors()
+        self.bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", registry=self.server.registry(),
+            retry_policy=RetryPolicy(max_attempts=3, backoff_base=0))
+
+    def tearDown(self):
+        self.bigdata_api.close()
+
+    def test__datasets(self):
+        results = self.bigdata_api.get_cnpj_datasets(
+            cnpj="00.000.000/0001-91",
+            datasets=["processes", "partner_murabei_credit_score_company"],
+            single_request=True)
+        processes = results["processes"]["Result"][0]["Processes"]
+        self.assertEqual(len(processes["Lawsuits"]), 3)
+        self.assertEqual(
+            results["processes"]["Result"][0]["MatchKeys"],
+            "doc{00000000000191}")
+        self.assertEqual(self.server.request_counts["/marketplace"], 1)
+
+        usage = self.bigdata_api.get_usage("2024-01-01", "2024-01-02")
+        self.assertEqual(usage[0]["queries_charged"], 10)
+
+    def test__errors(self):
+        self.server.add_error(code=-1200, datasets=["processes"], count=1)
+        results = self.bigdata_api.get_cpf_datasets(
+            cpf="52998224725", datasets=["basic_data", "processes"],
+            single_request=True, raise_errors=False)
+        self.assertIsInstance(
+            results["processes"], BigDataCorpAPIOnDemandQueriesException)
+        self.assertIn("BasicData", results["basic_data"]["Result"][0])
+
+        self.server.add_error(code=-3001, count=1)
+        with self.assertRaises(BigDataCorpAPIMonitoringAPIException):
+            self.bigdata_api.get_cpf_dataset(
+                cpf="52998224725", dataset="basic_data")
+
+        self.server.add_error(code=-101, count=1)
+        with self.assertRaises(BigDataCorpAPILoginProblemException):
+            self.bigdata_api.get_cpf_dataset(
+                cpf="52998224725", dataset="basic_data")
+
+    def test__http_errors_retried(self):
+        self.server.add_error(http_status=429, retry_after=0, count=1)
+        self.server.add_error(http_status=500, count=1)
+        before = self.server.request_counts.get("/peoplev2", 0)
+        result = self.bigdata_api.get_cpf_dataset(
+            cpf="52998224725", dataset="basic_data")
+        self.assertIn("BasicData", result["Result"][0])
+        self.assertEqual(self.server.request_counts["/peoplev2"] - before, 3)
+
+    def test__record_replay(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "cassette.json")
+            registry = self.server.registry()
+            with RecordingTransport(path) as transport:
+                bigdata_api = BigDataCorpAPI(
+                    bigdata_auth_token="secret-token", transport=transport,
+                    registry=registry)
+                recorded = bigdata_api.get_cpf_dataset(
+                    cpf="52998224725", dataset="processes")
+            with open(path) as file:
+                self.assertNotIn("secret-token", file.read())
+
+            bigdata_api = BigDataCorpAPI(
+                bigdata_auth_token="token", transport=ReplayTransport(path),
+                registry=registry)
+            self.assertEqual(
+                bigdata_api.get_cpf_dataset(
+                    cpf="52998224725", dataset="processes"), recorded)
+            with self.assertRaises(BigDataCorpAPIRequestException):
+                bigdata_api.get_cpf_dataset(
+                    cpf="11144477735", dataset="processes")
@@ -0,0 +1,123 @@
+"""Test paginated iteration over list datasets."""
+import unittest
+from bigdatacorp_api.data import BigDataCorpAPI
+from bigdatacorp_api.retry import RetryPolicy
+from bigdatacorp_api.mock_server import MockBigDataServer
+from bigdatacorp_api.exceptions import (
+    BigDataCorpAPIException, BigDataCorpAPIOnDemandQueriesException)
+
+
+class TestPagination(unittest.TestCase):
+    """Test pages, prefetch and early stop against the mock server."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockBigDataServer(payload_items=25).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.clear_errors()
+        self.server.request_counts.clear()
+        self.bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", registry=self.server.registry(),
+            retry_policy=RetryPolicy(max_attempts=3, backoff_base=0))
+
+    def tearDown(self):
+        self.bigdata_api.close()
+
+    def n_requests(self):
+        return self.server.request_counts.get("/peoplev2", 0)
+
+    def test__all_pages(self):
+        lawsuits = self.bigdata_api.get_cpf_dataset(
+            "52998224725", "processes")["Result"][0]["Processes"]["Lawsuits"]
+        self.assertEqual(len(lawsuits), 25)
+        for prefetch in (True, False):
+            self.server.request_counts.clear()
+            records = list(self.bigdata_api.iter_cpf_dataset(
+                "529.982.247-25", "processes", page_size=10,
+                prefetch=prefetch))
+            self.assertEqual(records, lawsuits)
+            self.assertEqual(self.n_requests(), 3)
+
+        # Last page is full, an empty page ends the iteration
+        pages = list(self.bigdata_api._iter_dataset_pages(
+            "cpf", "52998224725", "processes", page_size=5))
+        self.assertEqual([len(page) for page in pages], [5] * 5)
+
+        phones = list(self.bigdata_api.iter_cnpj_dataset(
+            "00000000000191", "related_people_phones", page_size=20))
+        self.assertEqual(len(phones), 25)
+        self.assertIn("AreaCode", phones[0])
+
+    def test__lazy(self):
+        records = self.bigdata_api.iter_cpf_dataset(
+            "52998224725", "processes", page_size=5, prefetch=False)
+        self.assertEqual(self.n_requests(), 0)
+        for _ in range(5):
+            next(records)
+        self.assertEqual(self.n_requests(), 1)
+        records.close()
+
+        # Prefetch fetches at most one page ahead
+        records = self.bigdata_api.iter_cpf_dataset(
+            "52998224725", "processes", page_size=5)
+        next(records)
+        records.close()
+        self.assertLessEqual(self.n_requests(), 3)
+
+        records = list(self.bigdata_api.iter_cpf_dataset(
+            "52998224725", "processes", page_size=5, max_pages=2))
+        self.assertEqual(len(records), 10)
+
+    def test__errors(self):
+        self.server.add_error(code=-1200, count=1)
+        with self.assertRaises(BigDataCorpAPIOnDemandQueriesException):
+            list(self.bigdata_api.iter_cpf_dataset(
+                "52998224725", "processes"))
+        with self.assertRaises(BigDataCorpAPIException):
+            list(self.bigdata_api.iter_cpf_dataset(
+                "52998224725", "basic_data"))
+        with self.assertRaises(BigDataCorpAPIException):
+            list(self.bigdata_api.iter_cpf_dataset(
+                "52998224725", "processes", page_size=0))
+
+
+class UnpagedServer(MockBigDataServer):
+    """Server that ignores `Page` and `PageSize`."""
+
+    @staticmethod
+    def _paginate(result: dict, datasets: list, payload: dict):
+        pass
+
+
+class TestUnpagedServer(unittest.TestCase):
+    """Test pagination against a server that always sends all records."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = UnpagedServer(payload_items=10).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def test__repeated_page(self):
+        with BigDataCorpAPI(
+                bigdata_auth_token="token",
+                registry=self.server.registry()) as bigdata_api:
+            for prefetch in (True, False):
+                self.server.request_counts.clear()
+                with self.assertLogs("bigdatacorp_api", "WARNING"):
+                    records = list(bigdata_api.iter_cpf_dataset(
+                        "52998224725", "processes", page_size=10,
+                        prefetch=prefetch, max_pages=None))
+                self.assertEqual(len(records), 10)
+                self.assertEqual(self.server.request_counts["/peoplev2"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
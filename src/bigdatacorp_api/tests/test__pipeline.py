@@ -0,0 +1,99 @@
+"""Test streaming enrichment pipeline."""
+import os
+import json
+import tempfile
+import unittest
+from bigdatacorp_api.data import BigDataCorpAPI
+from bigdatacorp_api.pipeline import EnrichmentPipeline, read_documents
+from bigdatacorp_api.tests.test__datasets import FakeTransport
+
+
+class TestEnrichmentPipeline(unittest.TestCase):
+    """Test checkpoint and resume of the pipeline."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.tmp_dir.name, "input.csv")
+        self.output_path = os.path.join(self.tmp_dir.name, "output.ndjson")
+        with open(self.input_path, "w") as file:
+            file.write("name,document\n")
+            file.write("a,52998224725\nb,\nc,11144477735\n")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def read_output(self):
+        with open(self.output_path) as file:
+            return [json.loads(line) for line in file]
+
+    def test__read_documents(self):
+        self.assertEqual(
+            list(read_documents(self.input_path)),
+            ["52998224725", "11144477735"])
+        ndjson_path = os.path.join(self.tmp_dir.name, "input.ndjson")
+        with open(ndjson_path, "w") as file:
+            file.write('{"cpf": "39053344705"}\n\n')
+        self.assertEqual(
+            list(read_documents(ndjson_path, column="cpf")),
+            ["39053344705"])
+
+    def test__resume(self):
+        transport = FakeTransport(codes={"processes": -1200})
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport)
+        pipeline = EnrichmentPipeline(
+            bigdata_api, entity="cpf",
+            datasets=["basic_data", "processes"],
+            output_path=self.output_path, max_workers=2)
+
+        stats = pipeline.run(read_documents(self.input_path))
+        self.assertEqual(stats, {
+            "documents": 2, "skipped": 0, "succeeded": 2, "failed": 2,
+            "duplicates": 0})
+        lines = self.read_output()
+        self.assertEqual(len(lines), 4)
+        errors = [line for line in lines if line["error"] is not None]
+        self.assertEqual({line["dataset"] for line in errors}, {"processes"})
+        self.assertEqual(
+            errors[0]["error"]["type"],
+            "BigDataCorpAPIOnDemandQueriesException")
+
+        # Only failed datasets are fetched again
+        transport.codes = {}
+        n_requests = len(transport.requests)
+        stats = pipeline.run(read_documents(self.input_path))
+        self.assertEqual(stats, {
+            "documents": 2, "skipped": 2, "succeeded": 2, "failed": 0,
+            "duplicates": 0})
+        self.assertEqual(len(transport.requests) - n_requests, 2)
+        self.assertTrue(all(
+            json_["Datasets"] == "processes"
+            for _, json_ in transport.requests[n_requests:]))
+        self.assertEqual(len(self.read_output()), 6)
+
+        stats = pipeline.run(read_documents(self.input_path))
+        self.assertEqual(stats["skipped"], 4)
+
+    def test__duplicates(self):
+        with open(self.input_path, "a") as file:
+            file.write("d,529.982.247-25\ne,111.444.777-35\n")
+        transport = FakeTransport()
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport)
+        pipeline = EnrichmentPipeline(
+            bigdata_api, entity="cpf", datasets=["basic_data"],
+            output_path=self.output_path, max_workers=2)
+
+        stats = pipeline.run(read_documents(self.input_path))
+        self.assertEqual(stats["duplicates"], 2)
+        self.assertEqual(stats["succeeded"], 4)
+        self.assertEqual(len(transport.requests), 2)
+        self.assertEqual(
+            [line["document"] for line in self.read_output()].count(
+                "529.982.247-25"), 1)
+        with open(pipeline.checkpoint_path) as file:
+            self.assertEqual(len(file.readlines()), 2)
+
+        stats = pipeline.run(read_documents(self.input_path))
+        self.assertEqual(stats["skipped"], 4)
+        self.assertEqual(len(transport.requests), 2)
@@ -0,0 +1,103 @@
+"""Test cost-aware query planner."""
+import time
+import unittest
+from unittest import mock
+from bigdatacorp_api.data import BigDataCorpAPI
+from bigdatacorp_api.cache import MemoryResponseCache
+from bigdatacorp_api.planner import PriceTable, QueryPlanner
+from bigdatacorp_api.tests.test__datasets import FakeTransport
+
+
+class TestQueryPlanner(unittest.TestCase):
+    """Test planning and budget caps."""
+
+    def setUp(self):
+        self.transport = FakeTransport()
+        self.bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=self.transport,
+            memory_cache=MemoryResponseCache())
+        self.prices = PriceTable.from_usage([
+            {"api_type": "companies", "end_point": "basic_data",
+             "queries_charged": 4, "estimated_price": 0.2},
+            {"api_type": "companies", "end_point": "kyc",
+             "queries_charged": 0, "estimated_price": 0.0},
+            {"api_type": "companies", "end_point": "processes",
+             "error": "invalid"},
+        ], tier_prices={"standard": 1.0})
+
+    def test__price_table(self):
+        self.assertEqual(
+            self.prices.get_price("cnpj", "basic_data", "standard"), 0.05)
+        self.assertEqual(
+            self.prices.get_price("cnpj", "kyc", "standard"), 1.0)
+        self.assertEqual(self.prices.get_price("cpf", "kyc"), 0.0)
+
+    def test__plan(self):
+        self.bigdata_api.get_cnpj_dataset(
+            cnpj="00000000000191", dataset="basic_data")
+        planner = QueryPlanner(self.bigdata_api, self.prices)
+        plan = planner.plan(
+            "cnpj", ["00.000.000/0001-91", "00000000000191",
+                     "11.222.333/0001-81", "11.222.333/0001-80"],
+            ["basic_data", "kyc"])
+        summary = plan.summary()
+        self.assertEqual(summary["duplicates"], 1)
+        self.assertEqual(plan.invalid, ["11.222.333/0001-80"])
+        self.assertEqual(summary["cached"], 1)
+        self.assertEqual(summary["queries_by_dataset"],
+                         {"kyc": 2, "basic_data": 1})
+        self.assertAlmostEqual(summary["estimated_cost"], 2.05)
+
+    def test__budget(self):
+        planner = QueryPlanner(self.bigdata_api, self.prices)
+        report = planner.run(
+            "cnpj", ["00000000000191", "11222333000181", "11444777000161"],
+            ["kyc"], budget=2.5, max_workers=1)
+        self.assertEqual(len(report["ran"]), 2)
+        self.assertEqual(report["skipped"], [("11444777000161", "kyc")])
+        self.assertEqual(report["spent"], 2.0)
+        self.assertEqual(len(self.transport.requests), 2)
+        self.assertEqual(len(report["results"]), 2)
+        self.assertEqual(report["plan"]["estimated_cost"], 3.0)
+
+        # Second run only reads the cache and costs nothing
+        report = planner.run(
+            "cnpj", ["00000000000191"], ["kyc"], budget=0)
+        self.assertEqual(report["cached"], [("00000000000191", "kyc")])
+        self.assertEqual(len(self.transport.requests), 2)
+
+    def test__cache_expired_after_plan(self):
+        cache = MemoryResponseCache(dataset_ttls={"kyc": 0.2})
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=self.transport,
+            memory_cache=cache)
+        bigdata_api.get_cnpj_dataset(cnpj="00000000000191", dataset="kyc")
+        planner = QueryPlanner(bigdata_api, self.prices)
+        plan = planner.plan("cnpj", ["00000000000191"], ["kyc"])
+        self.assertEqual(plan.cached, [("00000000000191", "kyc")])
+        # Planning does not change cache statistics
+        self.assertEqual(cache.stats()["hits"], 0)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+        time.sleep(0.3)
+        report = planner.execute(plan, budget=0.0)
+        self.assertEqual(report["cached"], [])
+        self.assertEqual(report["skipped"], [("00000000000191", "kyc")])
+        self.assertEqual(len(self.transport.requests), 1)
+
+        report = planner.execute(plan, budget=1.0)
+        self.assertEqual(report["ran"], [("00000000000191", "kyc")])
+        self.assertEqual(report["spent"], 1.0)
+        self.assertEqual(len(self.transport.requests), 2)
+
+    def test__client_deadline(self):
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=self.transport,
+            deadline=5.0)
+        planner = QueryPlanner(bigdata_api, self.prices)
+        with mock.patch.object(
+                bigdata_api, "_fetch_datasets",
+                wraps=bigdata_api._fetch_datasets) as fetch:
+            report = planner.run("cnpj", ["00000000000191"], ["kyc"])
+        self.assertEqual(report["ran"], [("00000000000191", "kyc")])
+        self.assertEqual(fetch.call_args.kwargs["deadline"].timeout, 5.0)
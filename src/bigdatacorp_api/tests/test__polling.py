@@ -0,0 +1,145 @@
+"""Test asynchronous queries with the polling scheduler."""
+import unittest
+from bigdatacorp_api.data import BigDataCorpAPI
+from bigdatacorp_api.retry import RetryPolicy
+from bigdatacorp_api.cache import MemoryResponseCache
+from bigdatacorp_api.polling import PollingScheduler
+from bigdatacorp_api.mock_server import MockBigDataServer, ASYNC_STATUS_PATH
+from bigdatacorp_api.exceptions import (
+    BigDataCorpAPIInvalidDocumentException,
+    BigDataCorpAPIOnDemandQueriesException,
+    BigDataCorpAPIMonitoringAPIException,
+    BigDataCorpAPITimeoutException, BigDataCorpAPIRequestException)
+
+
+CPFS = ["52998224725", "11144477735", "39053344705"]
+
+
+class TestPollingScheduler(unittest.TestCase):
+    """Test submit, batch polling and errors of asynchronous jobs."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockBigDataServer(
+            async_delay=0.1, dataset_latency={"processes": 0.2}).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.clear_errors()
+        self.server.request_counts.clear()
+        self.bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", registry=self.server.registry(),
+            retry_policy=RetryPolicy(max_attempts=3, backoff_base=0),
+            memory_cache=MemoryResponseCache())
+        self.contract = self.server.async_contract()
+
+    def tearDown(self):
+        self.bigdata_api.close()
+
+    def test__run(self):
+        scheduler = PollingScheduler(
+            self.bigdata_api, self.contract, poll_interval=0.1,
+            poll_backoff=1.0)
+        results = list(scheduler.run(
+            "cpf", CPFS, ["basic_data", "processes"], single_request=False))
+        self.assertEqual(len(results), 6)
+        for cpf, dataset, result in results:
+            self.assertIn(cpf, CPFS)
+            self.assertEqual(result["Status"][dataset][0]["Code"], 0)
+
+        # Slow datasets finish last and all jobs share the polls
+        self.assertEqual(
+            [dataset for _, dataset, _ in results[-3:]], ["processes"] * 3)
+        self.assertLessEqual(
+            self.server.request_counts[ASYNC_STATUS_PATH], 8)
+        self.assertEqual(scheduler.stats["done"], 6)
+        self.assertEqual(scheduler.pending, 0)
+
+        # Results are stored on the client cache
+        n_requests = sum(self.server.request_counts.values())
+        self.bigdata_api.get_cpf_dataset(CPFS[0], "processes")
+        self.assertEqual(sum(self.server.request_counts.values()), n_requests)
+
+    def test__batches(self):
+        scheduler = PollingScheduler(
+            self.bigdata_api, self.contract, poll_interval=0.05,
+            batch_size=2, max_pending=2)
+        results = list(scheduler.run("cpf", CPFS * 2, ["basic_data"]))
+        self.assertEqual(len(results), 6)
+        self.assertGreaterEqual(scheduler.stats["polls"], 3)
+
+    def test__errors(self):
+        self.server.add_error(code=-1200, datasets=["processes"], count=1)
+        self.server.add_error(
+            http_status=503, paths=[ASYNC_STATUS_PATH], count=1)
+        scheduler = PollingScheduler(
+            self.bigdata_api, self.contract, poll_interval=0.05)
+        jobs = scheduler.submit(
+            "cpf", CPFS[0], ["basic_data", "processes"])
+        jobs += scheduler.submit("cpf", "52998224726", ["basic_data"])
+        self.assertEqual(scheduler.pending, 1)
+        self.assertEqual(jobs[0].datasets, ["basic_data"])
+
+        results = {
+            (cpf, dataset): result
+            for cpf, dataset, result in scheduler.iter_results()}
+        self.assertIsInstance(
+            results[(CPFS[0], "processes")],
+            BigDataCorpAPIOnDemandQueriesException)
+        self.assertIsInstance(
+            results[("52998224726", "basic_data")],
+            BigDataCorpAPIInvalidDocumentException)
+        self.assertIn(
+            "BasicData", results[(CPFS[0], "basic_data")]["Result"][0])
+
+    def test__invalid_documents_streamed(self):
+        consumed = []
+
+        def documents():
+            while True:
+                consumed.append(1)
+                yield "52998224726"
+
+        scheduler = PollingScheduler(
+            self.bigdata_api, self.contract, poll_interval=0.05,
+            max_pending=2)
+        results = scheduler.run("cpf", documents(), ["basic_data"])
+        for _ in range(5):
+            _, _, result = next(results)
+            self.assertIsInstance(
+                result, BigDataCorpAPIInvalidDocumentException)
+        self.assertLessEqual(len(consumed), 7)
+
+    def test__not_found_and_timeout(self):
+        scheduler = PollingScheduler(
+            self.bigdata_api, self.contract, poll_interval=0.05,
+            job_timeout=0.1)
+        job, = scheduler.submit("cpf", CPFS[0], ["processes"])
+        _, result = next(scheduler.iter_results())[1:]
+        self.assertIsInstance(result, BigDataCorpAPITimeoutException)
+        self.assertEqual(result.payload["query_id"], job.query_id)
+
+        job, = scheduler.submit("cpf", CPFS[1], ["basic_data"])
+        del self.server.async_jobs[job.query_id]
+        _, _, result = next(scheduler.iter_results())
+        self.assertIsInstance(result, BigDataCorpAPIMonitoringAPIException)
+
+    def test__poll_error_raised(self):
+        self.server.add_error(
+            http_status=400, paths=[ASYNC_STATUS_PATH], count=1)
+        scheduler = PollingScheduler(
+            self.bigdata_api, self.contract, poll_interval=0.05)
+        scheduler.submit("cpf", CPFS[0], ["basic_data"])
+        # Errors that are not transient are raised, jobs are kept
+        with self.assertRaises(BigDataCorpAPIRequestException):
+            scheduler.poll()
+        self.assertEqual(scheduler.pending, 1)
+        _, _, result = next(scheduler.iter_results())
+        self.assertIn("BasicData", result["Result"][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
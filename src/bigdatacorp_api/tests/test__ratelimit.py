@@ -0,0 +1,46 @@
+"""Test rate limiters."""
+import os
+import tempfile
+import unittest
+from bigdatacorp_api.ratelimit import (
+    TokenBucketRateLimiter, SQLiteTokenBucketRateLimiter,
+    EndpointRateLimiter)
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test token buckets."""
+
+    def test__token_bucket(self):
+        limiter = TokenBucketRateLimiter(rate=10, capacity=2)
+        self.assertEqual(limiter.reserve(), 0.0)
+        self.assertEqual(limiter.reserve(), 0.0)
+        self.assertAlmostEqual(limiter.reserve(), 0.1, delta=0.02)
+        self.assertAlmostEqual(limiter.reserve(), 0.2, delta=0.02)
+
+    def test__max_wait(self):
+        limiter = TokenBucketRateLimiter(rate=10, capacity=1)
+        self.assertEqual(limiter.reserve(max_wait=1.0), 0.0)
+        # Tokens are not taken when the wait is too long
+        self.assertIsNone(limiter.reserve(max_wait=0.05))
+        self.assertIsNone(limiter.reserve(max_wait=0.05))
+        self.assertAlmostEqual(limiter.reserve(), 0.1, delta=0.02)
+
+    def test__sqlite_shared(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "ratelimit.db")
+            limiter_a = SQLiteTokenBucketRateLimiter(
+                path, rate=10, capacity=1, name="peoplev2")
+            limiter_b = SQLiteTokenBucketRateLimiter(
+                path, rate=10, capacity=1, name="peoplev2")
+            self.assertEqual(limiter_a.reserve(), 0.0)
+            self.assertIsNone(limiter_b.reserve(max_wait=0.05))
+            self.assertAlmostEqual(limiter_b.reserve(), 0.1, delta=0.02)
+            limiter_a.close()
+            limiter_b.close()
+
+    def test__endpoint(self):
+        limiter = EndpointRateLimiter(
+            limiters={"people": TokenBucketRateLimiter(rate=1)})
+        self.assertEqual(limiter.reserve("people"), 0.0)
+        self.assertGreater(limiter.reserve("people"), 0.0)
+        self.assertEqual(limiter.reserve("companies"), 0.0)
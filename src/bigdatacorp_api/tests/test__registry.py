@@ -0,0 +1,57 @@
+"""Test dataset registry routing."""
+import unittest
+from bigdatacorp_api.data import BigDataCorpAPI
+from bigdatacorp_api.registry import DatasetRegistry
+from bigdatacorp_api.exceptions import BigDataCorpAPIException
+from bigdatacorp_api.tests.test__datasets import FakeTransport
+
+
+class TestDatasetRegistry(unittest.TestCase):
+    """Test lookups and runtime registration."""
+
+    def test__default_routing(self):
+        registry = BigDataCorpAPI.registry
+        self.assertEqual(
+            registry.get_url("cnpj", "partner_murabei_credit_score_company"),
+            BigDataCorpAPI.MARKETPLACE_URL)
+        self.assertEqual(
+            registry.get_url("cnpj", "basic_data"),
+            BigDataCorpAPI.COMPANIES_URL)
+        # basic_data is on three entities with different routes
+        self.assertEqual(
+            registry.get_url("process", "basic_data"),
+            BigDataCorpAPI.PROCESS_URL)
+        self.assertEqual(
+            registry.get("process", "basic_data").format_query("123"),
+            "processnumber{123}")
+        self.assertEqual(
+            registry.datasets("cpf"), BigDataCorpAPI.CPF_DATABASES)
+        with self.assertRaises(BigDataCorpAPIException):
+            registry.get("cpf", "cade_processes_data")
+
+    def test__register(self):
+        registry = BigDataCorpAPI.registry.copy()
+        registry.set_endpoint("vehicles", "https://example.com/vehicles")
+        registry.register(
+            "plate", "vehicle_data", endpoint="vehicles",
+            query_prefix="plate", price_tier="premium")
+        registry.register("cpf", "new_dataset")
+        with self.assertRaises(BigDataCorpAPIException):
+            registry.register("plate", "other")
+        self.assertFalse(BigDataCorpAPI.registry.has("cpf", "new_dataset"))
+
+        transport = FakeTransport()
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport,
+            registry=registry)
+        bigdata_api.get_cpf_datasets(
+            cpf="52998224725", datasets=["new_dataset", "basic_data"],
+            single_request=True)
+        self.assertEqual(
+            transport.requests[0][1]["Datasets"], "new_dataset,basic_data")
+        results = bigdata_api._fetch_datasets(
+            entity="plate", document="ABC1234", datasets=["vehicle_data"])
+        self.assertIn("vehicle_data", results)
+        self.assertEqual(transport.requests[1][0],
+                         "https://example.com/vehicles")
+        self.assertEqual(transport.requests[1][1]["q"], "plate{ABC1234}")
@@ -0,0 +1,76 @@
+"""Test lazy dataset results."""
+import unittest
+from bigdatacorp_api.data import BigDataCorpAPI
+from bigdatacorp_api.cache import MemoryResponseCache
+from bigdatacorp_api.result import DatasetResult
+from bigdatacorp_api.tests.test__datasets import FakeTransport
+
+
+RESPONSE = {
+    "Result": [{
+        "MatchKeys": "doc{52998224725}",
+        "BasicData": {"Name": "FULANO"},
+        "Processes": {"TotalLawsuits": 1, "Lawsuits": [{"Number": "1"}]}}],
+    "QueryId": "query-id",
+    "ElapsedMilliseconds": 10,
+    "Status": {"basic_data": [{"Code": 0, "Message": "OK"}]}}
+
+
+class TestDatasetResult(unittest.TestCase):
+    """Test lazy decoding of sections."""
+
+    def test__lazy_sections(self):
+        result = DatasetResult.from_response("basic_data", RESPONSE)
+        self.assertEqual(result.sections, ["BasicData", "Processes"])
+        self.assertIsNone(result._decoded)
+        self.assertEqual(result.basic_data, {"Name": "FULANO"})
+        self.assertEqual(list(result._decoded.keys()), ["BasicData"])
+        self.assertIs(result.basic_data, result.basic_data)
+        self.assertEqual(result.lawsuits, [{"Number": "1"}])
+        self.assertEqual(result.addresses, [])
+        self.assertIsNone(result.section("ExtendedPhones"))
+        self.assertFalse(hasattr(result, "__dict__"))
+
+    def test__to_dict(self):
+        result = DatasetResult.from_response("basic_data", RESPONSE)
+        self.assertEqual(result.to_dict(), RESPONSE)
+        self.assertEqual(result["Status"], RESPONSE["Status"])
+        self.assertEqual(result["Result"], RESPONSE["Result"])
+        with self.assertRaises(KeyError):
+            result["Unknown"]
+
+        empty = DatasetResult.from_response(
+            "basic_data", {"Result": [], "Status": {}})
+        self.assertTrue(empty.is_empty)
+        self.assertEqual(empty["Result"], [])
+
+    def test__client(self):
+        transport = FakeTransport()
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport,
+            memory_cache=MemoryResponseCache(), lazy_results=True)
+        for _ in range(2):
+            result = bigdata_api.get_cpf_dataset(
+                cpf="52998224725", dataset="basic_data")
+            self.assertIsInstance(result, DatasetResult)
+            self.assertEqual(result.basic_data["Name"], "FULANO")
+        self.assertEqual(len(transport.requests), 1)
+
+        result, raw = bigdata_api.get_cnpj_dataset(
+            cnpj="00000000000191", dataset="processes", return_raw=True)
+        self.assertIsInstance(result, DatasetResult)
+        self.assertIsInstance(raw, bytes)
+
+    def test__shared_sections(self):
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=FakeTransport(),
+            lazy_results=True)
+        results = bigdata_api.get_cpf_datasets(
+            cpf="52998224725", datasets=["basic_data", "processes"],
+            single_request=True)
+        # Sections of the shared result are encoded once
+        self.assertIs(
+            results["basic_data"]._sections["BasicData"],
+            results["processes"]._sections["BasicData"])
+        self.assertEqual(
+            results["processes"].basic_data["Name"], "FULANO")
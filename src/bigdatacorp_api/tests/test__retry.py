@@ -0,0 +1,87 @@
+"""Test RetryPolicy."""
+import unittest
+from unittest import mock
+import requests
+from bigdatacorp_api.data import BigDataCorpAPI
+from bigdatacorp_api.retry import RetryPolicy
+from bigdatacorp_api.exceptions import (
+    BigDataCorpAPIProblemAPIException, BigDataCorpAPIRequestException,
+    BigDataCorpAPIMaxRetryException)
+from bigdatacorp_api.tests.test__datasets import FakeTransport
+
+
+def http_error(status_code: int, headers: dict = {}):
+    """Build a requests HTTPError with a status code."""
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers)
+    return requests.HTTPError(response=response)
+
+
+class FlakyTransport(FakeTransport):
+    """Raise errors on first requests."""
+
+    def __init__(self, errors: list, codes: dict = {}):
+        super().__init__(codes=codes)
+        self.errors = list(errors)
+
+    def post(self, url, json=None, headers=None, **kwargs):
+        if self.errors:
+            self.requests.append((url, json))
+            raise self.errors.pop(0)
+        return super().post(url, json=json, headers=headers, **kwargs)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """Test classification of errors and backoff."""
+
+    def test__is_retryable(self):
+        policy = RetryPolicy()
+        self.assertTrue(policy.is_retryable(requests.ConnectionError()))
+        self.assertTrue(policy.is_retryable(http_error(503)))
+        self.assertFalse(policy.is_retryable(http_error(403)))
+        self.assertFalse(policy.is_retryable(ValueError("invalid json")))
+        self.assertFalse(policy.is_retryable(
+            BigDataCorpAPIProblemAPIException("problem")))
+        self.assertTrue(RetryPolicy(retry_problem_api=True).is_retryable(
+            BigDataCorpAPIProblemAPIException("problem")))
+
+    def test__delay(self):
+        policy = RetryPolicy(backoff_base=1, backoff_max=5, jitter=False)
+        self.assertEqual(
+            [policy.get_delay(i) for i in range(4)], [1, 2, 4, 5])
+        self.assertEqual(policy.get_delay(
+            0, http_error(429, {"Retry-After": "3"})), 3)
+        jitter_policy = RetryPolicy(backoff_base=1)
+        self.assertLessEqual(jitter_policy.get_delay(2), 4)
+
+    def test__client_retry(self):
+        transport = FlakyTransport(
+            errors=[requests.ConnectionError(), http_error(500)])
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport,
+            retry_policy=RetryPolicy(backoff_base=0))
+        bigdata_api.get_cpf_dataset(cpf="52998224725", dataset="basic_data")
+        self.assertEqual(len(transport.requests), 3)
+
+    def test__client_permanent(self):
+        transport = FlakyTransport(errors=[http_error(401)])
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport)
+        with self.assertRaises(BigDataCorpAPIRequestException) as context:
+            bigdata_api.get_cpf_dataset(
+                cpf="52998224725", dataset="basic_data")
+        self.assertEqual(context.exception.payload["status_code"], 401)
+        self.assertEqual(len(transport.requests), 1)
+
+    def test__client_problem_api(self):
+        transport = FakeTransport(codes={"basic_data": -2000})
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport,
+            retry_policy=RetryPolicy(
+                max_attempts=3, backoff_base=0, retry_problem_api=True))
+        with mock.patch("builtins.print"):
+            with self.assertRaises(BigDataCorpAPIMaxRetryException):
+                bigdata_api.get_cpf_dataset(
+                    cpf="52998224725", dataset="basic_data")
+        self.assertEqual(len(transport.requests), 3)
@@ -0,0 +1,150 @@
+"""Test incremental parsing of large list datasets."""
+import json
+import unittest
+from bigdatacorp_api.data import BigDataCorpAPI
+from bigdatacorp_api.retry import RetryPolicy
+from bigdatacorp_api.streaming import ijson, parse_stream
+from bigdatacorp_api.mock_server import MockBigDataServer
+from bigdatacorp_api.instrumentation import Instrumentation
+from bigdatacorp_api.exceptions import (
+    BigDataCorpAPIException, BigDataCorpAPIOnDemandQueriesException)
+
+
+BODY = {
+    "Result": [{
+        "MatchKeys": "doc{00000000000191}",
+        "BasicData": {"Name": "EMPRESA", "Values": [1.5, -2e3, None]},
+        "Processes": {
+            "Lawsuits": [
+                {"Number": str(i), "Parties": [{"Name": "ÇÃO \"x\""}]}
+                for i in range(50)],
+            "TotalLawsuits": 50}}],
+    "QueryId": "query-id",
+    "Status": {"processes": [{"Code": 0, "Message": "OK"}]}}
+
+
+def split(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestParseStream(unittest.TestCase):
+    """Test parsers with bodies split in chunks."""
+
+    def check_parser(self, use_ijson: bool):
+        raw = json.dumps(BODY, ensure_ascii=False, indent=1).encode()
+        for size in (1, 7, 4096):
+            events = list(parse_stream(
+                split(raw, size), ("Processes", "Lawsuits"),
+                use_ijson=use_ijson))
+            self.assertEqual(
+                [value for kind, value in events if kind == "record"],
+                BODY["Result"][0]["Processes"]["Lawsuits"])
+            self.assertEqual(events[-1], ("status", BODY["Status"]))
+
+    def test__python(self):
+        self.check_parser(use_ijson=False)
+
+    @unittest.skipIf(ijson is None, "ijson not installed")
+    def test__ijson(self):
+        self.check_parser(use_ijson=True)
+
+    def test__incremental(self):
+        raw = json.dumps(BODY).encode()
+        chunks = split(raw, 64)
+        read = []
+
+        def body():
+            for chunk in chunks:
+                read.append(chunk)
+                yield chunk
+
+        records = parse_stream(
+            body(), ("Processes", "Lawsuits"), use_ijson=False)
+        next(records)
+        self.assertLess(len(read), len(chunks) / 4)
+
+    def test__invalid(self):
+        parsers = [False] if ijson is None else [False, True]
+        for use_ijson in parsers:
+            with self.assertRaises(BigDataCorpAPIException):
+                list(parse_stream(
+                    [b'{"Result": [{"Processes": {"Lawsuits": [{"a": 1}'],
+                    ("Processes", "Lawsuits"), use_ijson=use_ijson))
+            with self.assertRaises(BigDataCorpAPIException):
+                list(parse_stream(
+                    [b'{"Status": {"a": 1]}'], ("Processes", "Lawsuits"),
+                    use_ijson=use_ijson))
+        with self.assertRaises(BigDataCorpAPIException):
+            list(parse_stream(
+                [b'{"Status": {}} {}'], ("Processes", "Lawsuits"),
+                use_ijson=False))
+
+
+class TestStreamDataset(unittest.TestCase):
+    """Test streamed datasets against the mock server."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockBigDataServer(payload_items=500).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.clear_errors()
+        self.bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", registry=self.server.registry(),
+            retry_policy=RetryPolicy(max_attempts=3, backoff_base=0))
+
+    def tearDown(self):
+        self.bigdata_api.close()
+
+    def test__records(self):
+        lawsuits = self.bigdata_api.get_cnpj_dataset(
+            "00000000000191", "owners_lawsuits")[
+                "Result"][0]["OwnersLawsuits"]["Lawsuits"]
+        records = list(self.bigdata_api.stream_cnpj_dataset(
+            "00.000.000/0001-91", "owners_lawsuits", chunk_size=1024))
+        self.assertEqual(len(records), 500)
+        self.assertEqual(records, lawsuits)
+
+        records = self.bigdata_api.stream_cpf_dataset(
+            "52998224725", "related_people")
+        self.assertIn("RelatedEntityName", next(records))
+        records.close()
+
+    def test__errors(self):
+        self.server.add_error(http_status=503, count=1)
+        self.assertEqual(len(list(self.bigdata_api.stream_cpf_dataset(
+            "52998224725", "processes"))), 500)
+
+        self.server.add_error(code=-1200, count=1)
+        with self.assertRaises(BigDataCorpAPIOnDemandQueriesException):
+            list(self.bigdata_api.stream_cpf_dataset(
+                "52998224725", "processes"))
+
+        with self.assertRaises(BigDataCorpAPIException):
+            list(self.bigdata_api.stream_cpf_dataset(
+                "52998224725", "basic_data"))
+
+    def test__instrumentation(self):
+        calls = []
+
+        class Recorder(Instrumentation):
+            def on_request(self, **kwargs):
+                calls.append(kwargs)
+
+        self.server.add_error(http_status=503, count=1)
+        self.bigdata_api._instrumentation = Recorder()
+        list(self.bigdata_api.stream_cpf_dataset(
+            "52998224725", "processes"))
+        self.assertEqual([call["attempt"] for call in calls], [1, 2])
+        self.assertIsNotNone(calls[0]["exception"])
+        self.assertEqual(calls[1]["status_codes"], {"processes": 0})
+        self.assertGreater(calls[1]["bytes_received"], 0)
+        self.assertIsNone(calls[1]["exception"])
+
+
+if __name__ == '__main__':
+    unittest.main()
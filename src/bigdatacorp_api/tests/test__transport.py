@@ -0,0 +1,53 @@
+"""Test HTTPTransport."""
+import gc
+import threading
+import unittest
+from bigdatacorp_api.data import BigDataCorpAPI
+from bigdatacorp_api.transport import HTTPTransport
+
+
+class TestHTTPTransport(unittest.TestCase):
+    """Test connection pool sharing and lifecycle."""
+
+    def test__sessions_share_adapter(self):
+        transport = HTTPTransport(pool_maxsize=2)
+        sessions = []
+
+        def get_session():
+            sessions.append(transport._get_session())
+
+        threads = [threading.Thread(target=get_session) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(map(id, sessions))), 3)
+        adapters = {id(s.get_adapter("https://bigboost.bigdatacorp.com.br"))
+                    for s in sessions}
+        self.assertEqual(adapters, {id(transport._adapter)})
+        transport.close()
+
+    def test__sessions_released(self):
+        transport = HTTPTransport()
+        for _ in range(5):
+            thread = threading.Thread(target=transport._get_session)
+            thread.start()
+            thread.join()
+        gc.collect()
+        self.assertEqual(len(transport._sessions), 0)
+        transport.close()
+
+    def test__close(self):
+        with BigDataCorpAPI(bigdata_auth_token="token") as bigdata_api:
+            transport = bigdata_api._transport
+        with self.assertRaises(RuntimeError):
+            transport.post("https://bigboost.bigdatacorp.com.br/peoplev2")
+
+    def test__shared_transport_not_closed(self):
+        transport = HTTPTransport()
+        with BigDataCorpAPI(bigdata_auth_token="token",
+                            transport=transport):
+            pass
+        self.assertFalse(transport._closed)
+        transport.close()
@@ -0,0 +1,80 @@
+"""Test BigDataCorpAPI usage."""
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from bigdatacorp_api.data import BigDataCorpAPI
+from bigdatacorp_api.usage import UsageStore
+from bigdatacorp_api.registry import DatasetRegistry
+from bigdatacorp_api.decode import json_dumps
+
+
+class UsageTransport:
+    """Answer `/usage` with one charged query per day."""
+
+    def __init__(self, fail_dataset: str = None):
+        self.fail_dataset = fail_dataset
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def post(self, url, json=None, headers=None, **kwargs):
+        with self._lock:
+            self.requests.append(dict(json))
+        response = mock.Mock()
+        if json["Datasets"] == self.fail_dataset:
+            response.status_code = 400
+            body = {"Status": {"Message": "invalid dataset"}}
+        else:
+            response.status_code = 200
+            body = {"UsageData": {
+                "TotalSuccessfulRequests": 1,
+                "TotalRequestsWithError": 0,
+                "TotalQueriesCharged": 1,
+                "TotalQueriesNotCharged": 0,
+                "TotalEstimatedPrice": 0.5}}
+        response.content = json_dumps(body)
+        return response
+
+
+class TestGetUsage(unittest.TestCase):
+    """Test concurrent and incremental usage."""
+
+    def test__errors_reported(self):
+        transport = UsageTransport(fail_dataset="basic_data")
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport)
+        results = bigdata_api.get_usage("2024-01-01", "2024-01-31")
+
+        n_datasets = len(BigDataCorpAPI.CPF_DATABASES) + \
+            len(BigDataCorpAPI.CNPJ_DATABASES)
+        self.assertEqual(len(results), n_datasets)
+        errors = [r for r in results if "error" in r]
+        self.assertEqual(
+            {r["end_point"] for r in errors}, {"basic_data"})
+        self.assertEqual(results[0]["end_point"],
+                         BigDataCorpAPI.CPF_DATABASES[0])
+
+    def test__incremental(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = UsageStore(os.path.join(tmp_dir, "usage.db"))
+            transport = UsageTransport()
+            bigdata_api = BigDataCorpAPI(
+                bigdata_auth_token="token", transport=transport,
+                registry=DatasetRegistry.from_lists(
+                    cpf_datasets=["basic_data"], cnpj_datasets=[],
+                    process_datasets=[]))
+
+            results = bigdata_api.get_usage(
+                "2024-01-01", "2024-01-03", usage_store=store)
+            self.assertEqual(len(transport.requests), 3)
+            self.assertEqual(results[0]["queries_charged"], 3)
+
+            results = bigdata_api.get_usage(
+                "2024-01-02", "2024-01-04", usage_store=store)
+            self.assertEqual(len(transport.requests), 4)
+            self.assertEqual(
+                transport.requests[-1]["InitialReferenceDate"],
+                "2024-01-04")
+            self.assertEqual(results[0]["estimated_price"], 1.5)
+            store.close()
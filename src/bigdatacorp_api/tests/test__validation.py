@@ -0,0 +1,113 @@
+"""Test local validation of documents."""
+import unittest
+from bigdatacorp_api.data import BigDataCorpAPI
+from bigdatacorp_api.validation import (
+    np, normalize_document, is_valid_document, validate_document,
+    validate_documents, screen_documents)
+from bigdatacorp_api.exceptions import BigDataCorpAPIInvalidDocumentException
+from bigdatacorp_api.tests.test__datasets import FakeTransport
+
+
+PROCESS = "0001234-47.2019.8.26.0100"
+CADE_PROCESS = "08700.001234/2020-12"
+
+
+class TestValidation(unittest.TestCase):
+    """Test normalization and check digits."""
+
+    def test__normalize(self):
+        self.assertEqual(
+            normalize_document("cpf", "529.982.247-25"), "52998224725")
+        self.assertEqual(normalize_document("cpf", 1144477735), "01144477735")
+        self.assertEqual(
+            normalize_document("cnpj", "00.000.000/0001-91"),
+            "00000000000191")
+        self.assertEqual(
+            normalize_document("process", PROCESS), "00012344720198260100")
+        self.assertEqual(
+            normalize_document("process", PROCESS[3:]),
+            "00012344720198260100")
+        self.assertEqual(
+            normalize_document("process", CADE_PROCESS), "08700001234202012")
+
+    def test__check_digits(self):
+        self.assertTrue(is_valid_document("cpf", "529.982.247-25"))
+        self.assertFalse(is_valid_document("cpf", "529.982.247-26"))
+        self.assertFalse(is_valid_document("cpf", "111.111.111-11"))
+        self.assertFalse(is_valid_document("cpf", "5299822472"))
+        self.assertFalse(is_valid_document("cpf", "529982247250"))
+        self.assertTrue(is_valid_document("cnpj", "11.222.333/0001-81"))
+        self.assertFalse(is_valid_document("cnpj", "11.222.333/0001-80"))
+        self.assertTrue(is_valid_document("process", PROCESS))
+        self.assertFalse(is_valid_document(
+            "process", PROCESS.replace("0100", "0101")))
+        self.assertTrue(is_valid_document("process", CADE_PROCESS))
+        self.assertFalse(is_valid_document("process", "8700.ABC/2020"))
+
+        with self.assertRaises(
+                BigDataCorpAPIInvalidDocumentException) as context:
+            validate_document("cpf", "529.982.247-26")
+        self.assertEqual(context.exception.message, "cpf is invalid")
+
+    def test__validate_documents(self):
+        documents = [
+            "529.982.247-25", "52998224726", "abc", "", "5299822472５",
+            11144477735, "39053344705"]
+        expected = [True, False, False, False, False, True, True]
+        normalized, valid = validate_documents(
+            "cpf", documents, use_numpy=False)
+        self.assertEqual(valid, expected)
+        self.assertEqual(normalized[0], "52998224725")
+        if np is not None:
+            self.assertEqual(
+                validate_documents("cpf", documents, use_numpy=True),
+                (normalized, valid))
+
+        screened = list(screen_documents("cpf", documents, chunk_size=3))
+        self.assertEqual([s[2] for s in screened], expected)
+        self.assertEqual(screened[5][:2], (11144477735, "11144477735"))
+
+    @unittest.skipIf(np is None, "numpy not installed")
+    def test__numpy(self):
+        for entity, documents in (
+                ("cnpj", ["00000000000191", "11222333000181",
+                          "11222333000180", "00000000000000"]),
+                ("process", [PROCESS, "00012344720198260101", "1",
+                             CADE_PROCESS, "8700.ABC/2020"])):
+            self.assertEqual(
+                validate_documents(entity, documents, use_numpy=True),
+                validate_documents(entity, documents, use_numpy=False))
+
+    def test__client(self):
+        transport = FakeTransport()
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport)
+        with self.assertRaises(BigDataCorpAPIInvalidDocumentException):
+            bigdata_api.get_cpf_dataset(
+                cpf="529.982.247-26", dataset="basic_data")
+        results = bigdata_api.get_cnpj_datasets(
+            cnpj="11.222.333/0001-80", datasets=["basic_data", "kyc"],
+            raise_errors=False)
+        self.assertIsInstance(
+            results["kyc"], BigDataCorpAPIInvalidDocumentException)
+        self.assertEqual(transport.requests, [])
+
+        bigdata_api.get_cpf_dataset(
+            cpf="529.982.247-25", dataset="basic_data")
+        self.assertEqual(transport.requests[0][1]["q"], "doc{52998224725}")
+
+        bigdata_api.get_process_dataset(
+            process=CADE_PROCESS, dataset="cade_processes_data")
+        self.assertEqual(
+            transport.requests[1][1]["q"], "processnumber{08700001234202012}")
+
+        bigdata_api = BigDataCorpAPI(
+            bigdata_auth_token="token", transport=transport,
+            validate_documents=False)
+        bigdata_api.get_cpf_dataset(
+            cpf="529.982.247-26", dataset="basic_data")
+        self.assertEqual(len(transport.requests), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
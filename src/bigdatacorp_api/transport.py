@@ -0,0 +1,262 @@
+"""HTTP transport with pooled keep-alive connections for BigDataCorpAPI."""
+import os
+import json
+import weakref
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from bigdatacorp_api.exceptions import BigDataCorpAPIRequestException
+
+
+class HTTPTransport:
+    """
+    Connection pool shared by all BigDataCorpAPI calls.
+
+    A single `HTTPAdapter` (and therefore a single urllib3 pool manager)
+    is mounted on one `requests.Session` per thread, so TCP/TLS connections
+    to bigboost and plataforma hosts are reused across dataset calls while
+    each thread keeps its own session state (cookies, headers). Sessions
+    are released when their thread exits.
+    """
+
+    def __init__(self, pool_connections: int = 4, pool_maxsize: int = 10,
+                 pool_block: bool = False, keep_alive: bool = True):
+        """
+        __init__.
+
+        Kwargs:
+            pool_connections [int]: Number of host pools to keep cached, one
+                for each BigDataCorp host that is used.
+            pool_maxsize [int]: Maximum number of connections kept alive for
+                each host.
+            pool_block [bool]: If set true, threads will wait for a free
+                connection when `pool_maxsize` is reached instead of opening
+                extra connections that are discarded after use.
+            keep_alive [bool]: If set false, connections are closed after
+                each request.
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+            pool_block=pool_block, max_retries=0)
+        self._local = threading.local()
+        self._sessions = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _get_session(self) -> requests.Session:
+        """Return the session of the current thread, creating if needed."""
+        if self._closed:
+            raise RuntimeError("HTTPTransport is closed")
+        session = getattr(self._local, "session", None)
+        if session is None:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("HTTPTransport is closed")
+                session = requests.Session()
+                session.mount("https://", self._adapter)
+                session.mount("http://", self._adapter)
+                if not self.keep_alive:
+                    session.headers["Connection"] = "close"
+                self._sessions.add(session)
+            self._local.session = session
+        return session
+
+    def post(self, url: str, json: dict = None, headers: dict = None,
+             **kwargs) -> requests.Response:
+        """
+        Send a POST request using the pooled connections.
+
+        Args:
+            url [str]: Request url.
+        Kwargs:
+            json [dict]: Payload to be sent as JSON.
+            headers [dict]: Request headers.
+            **kwargs: Other arguments passed to `requests.Session.post`.
+        Return [requests.Response]:
+            Response of the request.
+        """
+        return self._get_session().post(
+            url, json=json, headers=headers, **kwargs)
+
+    def close(self):
+        """Close all sessions and pooled connections."""
+        with self._lock:
+            self._closed = True
+            sessions = list(self._sessions)
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+        self._adapter.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class CassetteResponse:
+    """Response replayed from a cassette, mimic `requests.Response`."""
+
+    def __init__(self, url: str, status_code: int, content: bytes,
+                 headers: dict = None):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = CaseInsensitiveDict(headers or {})
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(
+                "{} Error for url: {}".format(self.status_code, self.url),
+                response=self)
+
+    def iter_content(self, chunk_size: int = 1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+def _interaction_key(url: str, payload: dict) -> str:
+    """Return the key used to match a request on a cassette."""
+    return url + " " + json.dumps(payload, sort_keys=True)
+
+
+class RecordingTransport:
+    """
+    Transport that records responses of another transport to a cassette.
+
+    Cassettes are JSON files with the url, payload, status code and body of
+    each request. Request headers are not recorded so the access token is
+    not written to the file.
+    """
+
+    _RECORDED_HEADERS = ("Content-Type", "Retry-After")
+
+    def __init__(self, path: str, transport: HTTPTransport = None):
+        """
+        __init__.
+
+        Args:
+            path [str]: Cassette file, written on `save` and `close`.
+        Kwargs:
+            transport [HTTPTransport]: Transport used on requests, default
+                to a new `HTTPTransport`.
+        """
+        self.path = path
+        self._owns_transport = transport is None
+        self.transport = transport or HTTPTransport()
+        self._interactions = []
+        self._lock = threading.Lock()
+
+    def post(self, url: str, json: dict = None, headers: dict = None,
+             **kwargs):
+        """Send the request with the wrapped transport and record it."""
+        response = self.transport.post(
+            url, json=json, headers=headers, **kwargs)
+        interaction = {
+            "url": url,
+            "payload": json,
+            "status_code": response.status_code,
+            "headers": {
+                name: response.headers[name]
+                for name in self._RECORDED_HEADERS
+                if name in response.headers},
+            "body": response.content.decode("utf-8")}
+        with self._lock:
+            self._interactions.append(interaction)
+        return response
+
+    def save(self):
+        """Write recorded interactions to the cassette file."""
+        with self._lock:
+            cassette = {"version": 1, "interactions": self._interactions}
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(cassette, file, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+
+    def close(self):
+        """Save the cassette and close the wrapped transport."""
+        self.save()
+        if self._owns_transport:
+            self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ReplayTransport:
+    """
+    Transport that answers requests from a cassette without network.
+
+    Requests are matched by url and payload. Repeated requests receive the
+    recorded responses in order, the last one is repeated when they run
+    out.
+    """
+
+    def __init__(self, path: str):
+        """
+        __init__.
+
+        Args:
+            path [str]: Cassette file written by `RecordingTransport`.
+        """
+        self.path = path
+        with open(path, encoding="utf-8") as file:
+            cassette = json.load(file)
+        self._interactions = {}
+        for interaction in cassette["interactions"]:
+            key = _interaction_key(
+                interaction["url"], interaction["payload"])
+            self._interactions.setdefault(key, []).append(interaction)
+        self._played = {}
+        self._lock = threading.Lock()
+
+    def post(self, url: str, json: dict = None, headers: dict = None,
+             **kwargs) -> CassetteResponse:
+        """
+        Return the recorded response of a request.
+
+        Raise:
+            BigDataCorpAPIRequestException: If the request is not on the
+                cassette.
+        """
+        key = _interaction_key(url, json)
+        interactions = self._interactions.get(key)
+        if interactions is None:
+            raise BigDataCorpAPIRequestException(
+                message="request not recorded on cassette [{}]".format(
+                    self.path),
+                payload={"url": url, "payload": json})
+        with self._lock:
+            i = self._played.get(key, 0)
+            self._played[key] = i + 1
+        interaction = interactions[min(i, len(interactions) - 1)]
+        return CassetteResponse(
+            url=url, status_code=interaction["status_code"],
+            content=interaction["body"].encode("utf-8"),
+            headers=interaction["headers"])
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
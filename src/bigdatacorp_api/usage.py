@@ -0,0 +1,128 @@
+"""Local storage of BigData per-day usage."""
+import sqlite3
+import datetime
+import threading
+
+
+USAGE_FIELDS = [
+    "successful_requests", "requests_with_error", "queries_charged",
+    "queries_not_charged", "estimated_price"]
+
+
+def date_range(initial_date: str, final_date: str) -> list:
+    """
+    Return all days between two dates, both included.
+
+    Args:
+        initial_date [str]: Initial date in the format 'yyyy-MM-dd'.
+        final_date [str]: Final date in the format 'yyyy-MM-dd'.
+    Return [list[str]]:
+        Days in the format 'yyyy-MM-dd'.
+    """
+    initial = datetime.datetime.strptime(initial_date, "%Y-%m-%d").date()
+    final = datetime.datetime.strptime(final_date, "%Y-%m-%d").date()
+    n_days = (final - initial).days + 1
+    return [
+        (initial + datetime.timedelta(days=i)).isoformat()
+        for i in range(max(n_days, 0))]
+
+
+def sum_usage(api_type: str, end_point: str, usages: list) -> dict:
+    """
+    Sum per-day usage results of a dataset.
+
+    Args:
+        api_type [str]: The type of API ('people' or 'companies').
+        end_point [str]: Dataset name.
+        usages [list[dict]]: Usage results, see `BigDataCorpAPI.get_usage`.
+    Return [dict]:
+        Usage result with the sum of all fields.
+    """
+    result = {'api_type': api_type, 'end_point': end_point}
+    for field in USAGE_FIELDS:
+        result[field] = sum(usage[field] for usage in usages)
+    return result
+
+
+class UsageStore:
+    """
+    Per-day usage of each dataset stored on SQLite.
+
+    Used by `BigDataCorpAPI.get_usage` incremental mode, only closed days
+    (before today) are stored since usage of the current day still changes.
+    """
+
+    def __init__(self, path: str):
+        """
+        __init__.
+
+        Args:
+            path [str]: Path of the SQLite database file.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None,
+            timeout=30)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bigdata_usage ("
+            " api_type TEXT NOT NULL,"
+            " end_point TEXT NOT NULL,"
+            " day TEXT NOT NULL,"
+            " successful_requests INTEGER NOT NULL,"
+            " requests_with_error INTEGER NOT NULL,"
+            " queries_charged INTEGER NOT NULL,"
+            " queries_not_charged INTEGER NOT NULL,"
+            " estimated_price REAL NOT NULL,"
+            " PRIMARY KEY (api_type, end_point, day))")
+
+    def get(self, api_type: str, end_point: str, days: list) -> dict:
+        """
+        Return stored usage of a dataset.
+
+        Args:
+            api_type [str]: The type of API ('people' or 'companies').
+            end_point [str]: Dataset name.
+            days [list[str]]: Days in the format 'yyyy-MM-dd'.
+        Return [dict]:
+            Dictionary with days as keys and usage results as values, days
+            not stored are not returned.
+        """
+        if not days:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT day, " + ", ".join(USAGE_FIELDS) + " "
+                "FROM bigdata_usage "
+                "WHERE api_type = ? AND end_point = ? "
+                "AND day >= ? AND day <= ?",
+                (api_type, end_point, min(days), max(days))).fetchall()
+        days = set(days)
+        usage = {}
+        for row in rows:
+            if row[0] in days:
+                result = {'api_type': api_type, 'end_point': end_point}
+                result.update(zip(USAGE_FIELDS, row[1:]))
+                usage[row[0]] = result
+        return usage
+
+    def set(self, day: str, usage: dict):
+        """
+        Store usage of a dataset on a day.
+
+        Args:
+            day [str]: Day in the format 'yyyy-MM-dd'.
+            usage [dict]: Usage result, see `BigDataCorpAPI.get_usage`.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO bigdata_usage "
+                "(api_type, end_point, day, " + ", ".join(USAGE_FIELDS) +
+                ") VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [usage['api_type'], usage['end_point'], day] +
+                [usage[field] for field in USAGE_FIELDS])
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,221 @@
+"""Normalization and check digit validation of CPF, CNPJ and processes."""
+import re
+from bigdatacorp_api.exceptions import BigDataCorpAPIInvalidDocumentException
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+# Number of digits of each entity document, shorter documents are padded
+# with leading zeros (ex.: CPFs read as integers). Only CNJ process numbers
+# have 20 digits, other numberings (ex.: 17 digits SEI numbers of CADE)
+# are not padded nor checked
+DOCUMENT_SIZES = {"cpf": 11, "cnpj": 14, "process": 20}
+
+_PUNCTUATION = str.maketrans("", "", ".-/ \t")
+
+# Weights of the first and second check digits, both use the modulo 11
+# digit `sum * 10 % 11 % 10`
+_CHECK_WEIGHTS = {
+    "cpf": (
+        tuple(range(10, 1, -1)),
+        tuple(range(11, 1, -1))),
+    "cnpj": (
+        (5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2),
+        (6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2))}
+
+# CNJ process number NNNNNNN-DD.AAAA.J.TR.OOOO is valid if the number
+# NNNNNNNAAAAJTROOOODD modulo 97 is 1 (ISO 7064 MOD 97-10)
+_CNJ_ORDER = tuple(range(7)) + tuple(range(9, 20)) + (7, 8)
+_CNJ_WEIGHTS = tuple(pow(10, 19 - i, 97) for i in range(20))
+_CNJ_FORMAT = re.compile(r"\d{1,7}-\d{2}\.\d{4}\.\d\.\d{2}\.\d{4}")
+
+
+def normalize_document(entity: str, document) -> str:
+    """
+    Remove punctuation and pad a document with leading zeros.
+
+    Process numbers are padded only on CNJ format, ex.:
+    `1234-47.2019.8.26.0100`, other numberings keep their size.
+
+    Args:
+        entity [str]: One of `cpf`, `cnpj` or `process`, other entities
+            only have punctuation removed.
+        document [str | int]: Document as received, ex.:
+            `529.982.247-25`.
+    Return [str]:
+        Normalized document, ex.: `52998224725`. It is not validated.
+    """
+    normalized = document if isinstance(document, str) else str(document)
+    size = DOCUMENT_SIZES.get(entity)
+    if entity == "process" and not _CNJ_FORMAT.fullmatch(normalized):
+        size = None
+    if not normalized.isdecimal():
+        normalized = normalized.translate(_PUNCTUATION)
+    if size is not None and len(normalized) < size and \
+            normalized.isdecimal():
+        normalized = normalized.zfill(size)
+    return normalized
+
+
+def _is_valid(entity: str, normalized: str) -> bool:
+    """Check digits of a normalized document."""
+    size = DOCUMENT_SIZES.get(entity)
+    if size is None:
+        return True
+    if not normalized.isascii() or not normalized.isdecimal():
+        return False
+    if len(normalized) != size:
+        # Process numbers other than CNJ have no known check digits
+        return entity == "process"
+
+    digits = [ord(c) - 48 for c in normalized]
+    if entity == "process":
+        total = sum(
+            digits[i] * w for i, w in zip(_CNJ_ORDER, _CNJ_WEIGHTS))
+        return total % 97 == 1
+
+    if digits.count(digits[0]) == size:
+        return False
+    for position, weights in zip((size - 2, size - 1),
+                                 _CHECK_WEIGHTS[entity]):
+        total = sum(d * w for d, w in zip(digits, weights))
+        if total * 10 % 11 % 10 != digits[position]:
+            return False
+    return True
+
+
+def is_valid_document(entity: str, document) -> bool:
+    """
+    Check if a document has valid check digits.
+
+    CPF and CNPJ with all digits equal are invalid. Process numbers are
+    checked only if they have the 20 digits of CNJ numbers, other process
+    numbers are valid if they have only digits. Documents of entities
+    other than `cpf`, `cnpj` and `process` are always valid.
+
+    Args:
+        entity [str]: One of `cpf`, `cnpj` or `process`.
+        document [str | int]: Document, with or without punctuation.
+    Return [bool]:
+        True if the document is valid.
+    """
+    return _is_valid(entity, normalize_document(entity, document))
+
+
+def validate_document(entity: str, document) -> str:
+    """
+    Normalize a document and raise if its check digits are invalid.
+
+    Args:
+        entity [str]: One of `cpf`, `cnpj` or `process`.
+        document [str | int]: Document, with or without punctuation.
+    Return [str]:
+        Normalized document.
+    Raise:
+        BigDataCorpAPIInvalidDocumentException: If the document is
+            invalid.
+    """
+    normalized = normalize_document(entity, document)
+    if not _is_valid(entity, normalized):
+        raise BigDataCorpAPIInvalidDocumentException(
+            message="{} is invalid".format(entity),
+            payload={"entity": entity, "document": str(document)})
+    return normalized
+
+
+def _validate_numpy(entity: str, normalized: list) -> list:
+    """Check digits of normalized documents as a matrix of digits."""
+    size = DOCUMENT_SIZES[entity]
+    n = len(normalized)
+    lengths = np.fromiter(map(len, normalized), dtype=np.int64, count=n)
+    try:
+        codes = np.array(normalized, dtype="S{}".format(size))
+    except UnicodeEncodeError:
+        codes = np.array(
+            [d if d.isascii() else "" for d in normalized],
+            dtype="S{}".format(size))
+    # One byte for each character, shorter strings are padded with zeros
+    # that become values above 9 after the subtraction
+    digits = np.frombuffer(codes.tobytes(), dtype=np.uint8).reshape(
+        n, size) - np.uint8(48)
+    valid = (lengths == size) & (digits <= 9).all(axis=1)
+    digits = digits.astype(np.int32)
+
+    if entity == "process":
+        total = digits[:, _CNJ_ORDER] @ np.array(_CNJ_WEIGHTS, np.int32)
+        valid &= total % 97 == 1
+        valid = valid.tolist()
+        # Process numbers other than CNJ are checked one by one
+        for i in np.flatnonzero(lengths != size).tolist():
+            valid[i] = _is_valid(entity, normalized[i])
+        return valid
+
+    valid &= ~(digits == digits[:, :1]).all(axis=1)
+    for position, weights in zip((size - 2, size - 1),
+                                 _CHECK_WEIGHTS[entity]):
+        total = digits[:, :position] @ np.array(weights, np.int32)
+        valid &= total * 10 % 11 % 10 == digits[:, position]
+    return valid.tolist()
+
+
+def validate_documents(entity: str, documents, use_numpy: bool = None):
+    """
+    Normalize and check many documents at once.
+
+    With NumPy installed check digits are computed on a matrix of digits,
+    screening millions of documents per second before batch enrichment.
+
+    Args:
+        entity [str]: One of `cpf`, `cnpj` or `process`.
+        documents [list[str | int]]: Documents to be checked.
+    Kwargs:
+        use_numpy [bool]: Use the NumPy implementation, default to use it
+            if installed.
+    Return [tuple[list[str], list[bool]]]:
+        Normalized documents and if each one is valid, in input order.
+    Raise:
+        ImportError: If `use_numpy` is set and NumPy is not installed.
+    """
+    normalized = [normalize_document(entity, d) for d in documents]
+    if entity not in DOCUMENT_SIZES:
+        return normalized, [True] * len(normalized)
+
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy:
+        if np is None:
+            raise ImportError(
+                "numpy must be installed to validate with `use_numpy`, "
+                "`pip install numpy`")
+        return normalized, _validate_numpy(entity, normalized)
+    return normalized, [_is_valid(entity, d) for d in normalized]
+
+
+def screen_documents(entity: str, documents, chunk_size: int = 65536):
+    """
+    Validate a stream of documents in chunks.
+
+    Args:
+        entity [str]: One of `cpf`, `cnpj` or `process`.
+        documents [iterable[str | int]]: Documents, consumed lazily.
+    Kwargs:
+        chunk_size [int]: Number of documents validated at once.
+    Return [generator]:
+        Yield `(document, normalized, valid)` in input order.
+    """
+    chunk = []
+    for document in documents:
+        chunk.append(document)
+        if len(chunk) >= chunk_size:
+            yield from _screen_chunk(entity, chunk)
+            chunk = []
+    if chunk:
+        yield from _screen_chunk(entity, chunk)
+
+
+def _screen_chunk(entity: str, chunk: list):
+    normalized, valid = validate_documents(entity, chunk)
+    return zip(chunk, normalized, valid)